@@ -0,0 +1,48 @@
+"""Measures the cost of a tick of the scheduler with a growing number of scheduled jobs."""
+
+import datetime
+import sys
+import time
+from pathlib import Path
+
+PROJECT_DIR = Path(__file__).parent.parent.parent
+sys.path.insert(0, str(PROJECT_DIR))
+
+from myeasyserver.services.scheduler.timed_tasks import Scheduler  # noqa: E402
+
+TICKS = 1000
+DUE_PER_TICK = 10
+
+
+def noop():
+    pass
+
+
+def bench(job_count: int) -> float:
+    """Returns the mean duration of a tick, in microseconds, for `job_count` hourly jobs."""
+    scheduler = Scheduler()
+    for i in range(job_count):
+        scheduler.every(1).hour.do(noop).tag(f"group-{i % 100}")
+    jobs = scheduler.jobs
+    now = datetime.datetime.now()
+    elapsed = 0.0
+    for tick in range(TICKS):
+        # make a few jobs due, as a real tick would find them
+        for job in jobs[(tick * DUE_PER_TICK) % job_count:][:DUE_PER_TICK]:
+            job.next_run = now
+            scheduler._push(job)
+        start = time.perf_counter()
+        scheduler.run_pending()
+        scheduler.idle_seconds
+        elapsed += time.perf_counter() - start
+    return elapsed / TICKS * 1e6
+
+
+def main():
+    print(f"{'jobs':>8} {'us/tick':>10}  ({DUE_PER_TICK} due jobs per tick)")
+    for job_count in (100, 1_000, 10_000, 100_000):
+        print(f"{job_count:>8} {bench(job_count):>10.1f}")
+
+
+if __name__ == "__main__":
+    main()
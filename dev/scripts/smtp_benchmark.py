@@ -0,0 +1,97 @@
+"""Sends emails to a local aiosmtpd server with a new SMTP session per email, then with the pooled queued sender."""
+
+import smtplib
+import sys
+import threading
+import time
+from pathlib import Path
+
+PROJECT_DIR = Path(__file__).parent.parent.parent
+sys.path.insert(0, str(PROJECT_DIR))
+
+from aiosmtpd.controller import Controller  # noqa: E402
+
+from myeasyserver.services.email.email_senders import (  # noqa: E402
+    EmailOptions,
+    Message,
+    QueuedEmailSender,
+    SMTPConnectionPool,
+)
+
+EMAILS = 500
+HTML = "<p>" + "Reset your password. " * 50 + "</p>"
+
+
+class Counter:
+    def __init__(self) -> None:
+        self.messages = 0
+        self.sessions = 0
+        self.done = threading.Event()
+
+    async def handle_EHLO(self, server, session, envelope, hostname, responses):
+        self.sessions += 1
+        session.host_name = hostname
+        return responses
+
+    async def handle_DATA(self, server, session, envelope):
+        self.messages += 1
+        if self.messages >= EMAILS:
+            self.done.set()
+        return "250 OK"
+
+    def reset(self) -> None:
+        self.messages = 0
+        self.sessions = 0
+        self.done.clear()
+
+
+def message(number: int) -> Message:
+    return Message(f"Test {number}", HTML, "Bench", "bench@example.org")
+
+
+def bench_direct(options: EmailOptions, counter: Counter) -> None:
+    counter.reset()
+    start = time.perf_counter()
+    for number in range(EMAILS):
+        with smtplib.SMTP(options.host, options.port) as server:
+            server.send_message(message(number).build("user@example.org"))
+    elapsed = time.perf_counter() - start
+    print(f"{'one session per email':<28}{EMAILS / elapsed:>10,.0f} emails/s, {counter.sessions:>4} sessions")
+
+
+def bench_queued(options: EmailOptions, counter: Counter, workers: int, rate: float) -> None:
+    counter.reset()
+    sender = QueuedEmailSender(SMTPConnectionPool(options, workers, 60, 30), workers, 20, rate, EMAILS)
+    messages = [message(number) for number in range(EMAILS)]
+
+    start = time.perf_counter()
+    for msg in messages:
+        sender.submit(msg.build("user@example.org"))
+    queued = time.perf_counter() - start
+    counter.done.wait(60)
+    elapsed = time.perf_counter() - start
+    sender.stop(5)
+
+    label = f"pool of {workers}" + (f", {rate:g}/s" if rate else "")
+    print(
+        f"{label:<28}{EMAILS / elapsed:>10,.0f} emails/s, {counter.sessions:>4} sessions, "
+        f"{queued / EMAILS * 1e6:.0f} µs to queue an email, {sender.sent} sent"
+    )
+
+
+def main() -> None:
+    counter = Counter()
+    controller = Controller(counter, hostname="127.0.0.1", port=8025)
+    controller.start()
+    try:
+        options = EmailOptions("127.0.0.1", 8025)
+        bench_direct(options, counter)
+        bench_queued(options, counter, 1, 0)
+        bench_queued(options, counter, 2, 0)
+        bench_queued(options, counter, 2, 200)
+    finally:
+        controller.stop()
+
+
+if __name__ == "__main__":
+    main()
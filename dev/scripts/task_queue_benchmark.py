@@ -0,0 +1,108 @@
+"""Measures the throughput of the task queue on a temporary SQLite database, and the cost of its call encoding."""
+
+import base64
+import datetime
+import importlib
+import json
+import pickle
+import sys
+import tempfile
+import time
+import uuid
+from pathlib import Path
+
+PROJECT_DIR = Path(__file__).parent.parent.parent
+sys.path.insert(0, str(PROJECT_DIR))
+
+from sqlalchemy import create_engine  # noqa: E402
+from sqlalchemy.orm import sessionmaker  # noqa: E402
+
+from myeasyserver.database.models.model_base import SqlAlchemyBase  # noqa: E402
+from myeasyserver.database.repositories.repository_factory import AllRepositories  # noqa: E402
+from myeasyserver.schema.server import ServerTaskCreate, ServerTaskStatus  # noqa: E402
+from myeasyserver.services.scheduler.execution_queue import (  # noqa: E402
+    deserialize_call,
+    serialize_call,
+    task_registry,
+)
+
+CALLS = 100_000
+TASKS = 5_000
+DATA = bytes(range(256)) * 16  # 4 KiB argument
+
+
+@task_registry.register
+def store_blob(data: bytes, name: str) -> None:
+    pass
+
+
+def rate(count: int, start: float) -> str:
+    return f"{count / (time.perf_counter() - start):>12,.0f} /s"
+
+
+def bench_encoding() -> None:
+    start = time.perf_counter()
+    for _ in range(CALLS):
+        payload = json.dumps({"args": [base64.b64encode(DATA).decode()], "kwargs": {"name": "x"}})
+        base64.b64decode(json.loads(payload)["args"][0])
+    print(f"{'json + base64 encode/decode':<36}{rate(CALLS, start)}")
+
+    start = time.perf_counter()
+    for _ in range(CALLS):
+        id, payload = serialize_call(store_blob, DATA, name="x")
+        deserialize_call(id, payload)
+    print(f"{'pickle 5 encode/decode + registry':<36}{rate(CALLS, start)}")
+
+
+def bench_resolution() -> None:
+    start = time.perf_counter()
+    for _ in range(CALLS):
+        module_name, function_name = "json.dumps".rsplit(".", 1)
+        getattr(importlib.import_module(module_name), function_name)
+    print(f"{'import_module + getattr':<36}{rate(CALLS, start)}")
+
+    id = task_registry.id_of(store_blob)
+    start = time.perf_counter()
+    for _ in range(CALLS):
+        task_registry.get(id)
+    print(f"{'registry lookup':<36}{rate(CALLS, start)}")
+
+
+def bench_queue(path: str) -> None:
+    engine = create_engine(f"sqlite:///{path}", connect_args={"check_same_thread": False})
+    SqlAlchemyBase.metadata.create_all(engine)
+    session = sessionmaker(bind=engine, autoflush=False)()
+    tasks = AllRepositories(session).server_tasks
+    group_id = uuid.uuid4()
+
+    start = time.perf_counter()
+    for i in range(TASKS):
+        func, payload = serialize_call(store_blob, DATA, name=str(i))
+        tasks.create(ServerTaskCreate(
+            group_id=group_id, status=ServerTaskStatus.queued, func=func, payload=payload, priority=i % 3
+        ))
+    print(f"{'enqueue':<36}{rate(TASKS, start)}")
+
+    start = time.perf_counter()
+    done = 0
+    while True:
+        now = datetime.datetime.now()
+        task = tasks.claim("bench", now, now + datetime.timedelta(seconds=60))
+        if task is None:
+            break
+        deserialize_call(task.func, task.payload)
+        tasks.release(task.id, "bench", ServerTaskStatus.finished, "Finished")
+        done += 1
+    print(f"{'claim + release':<36}{rate(done, start)}")
+    session.close()
+
+
+def main():
+    bench_encoding()
+    bench_resolution()
+    with tempfile.TemporaryDirectory() as directory:
+        bench_queue(str(Path(directory) / "tasks.db"))
+
+
+if __name__ == "__main__":
+    main()
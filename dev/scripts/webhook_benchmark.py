@@ -0,0 +1,93 @@
+"""Measures the time wheel of the webhooks and their delivery rate against a local HTTP stand-in."""
+
+import asyncio
+import datetime
+import random
+import sys
+import time
+import uuid
+from pathlib import Path
+
+PROJECT_DIR = Path(__file__).parent.parent.parent
+sys.path.insert(0, str(PROJECT_DIR))
+
+import httpx  # noqa: E402
+
+from myeasyserver.schema.server import ReadWebhook, WebhookType  # noqa: E402
+from myeasyserver.services.webhook_service import TimeWheel, WebhookService  # noqa: E402
+
+WHEEL_WEBHOOKS = 100_000
+DELIVERIES = 5_000
+FAILURE_RATE = 0.1  # share of the requests answered with a 503 by the stand-in
+
+
+async def handle(reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+    """Minimal HTTP/1.1 server keeping the connections alive, answering 200 or sometimes 503"""
+    try:
+        while True:
+            head = await reader.readuntil(b"\r\n\r\n")
+            length = 0
+            for line in head.split(b"\r\n"):
+                if line.lower().startswith(b"content-length:"):
+                    length = int(line.split(b":")[1])
+            await reader.readexactly(length)
+            status = b"503 Service Unavailable" if random.random() < FAILURE_RATE else b"200 OK"
+            writer.write(b"HTTP/1.1 " + status + b"\r\nContent-Length: 0\r\n\r\n")
+            await writer.drain()
+    except (asyncio.IncompleteReadError, ConnectionError):
+        writer.close()
+
+
+def webhook(port: int, at: datetime.time) -> ReadWebhook:
+    return ReadWebhook(
+        id=uuid.uuid4(),
+        group_id=uuid.uuid4(),
+        enabled=True,
+        name="bench",
+        url=f"http://127.0.0.1:{port}/hook",
+        webhook_type=WebhookType.generic,
+        scheduled_time=at,
+    )
+
+
+def bench_wheel() -> None:
+    wheel = TimeWheel(1)
+    for _ in range(WHEEL_WEBHOOKS):
+        wheel.add(None, datetime.time(random.randrange(24), random.randrange(60), random.randrange(60)))
+    start = time.perf_counter()
+    fired = sum(1 for slot in range(wheel.size) for _ in wheel.due(slot - 1, slot))
+    elapsed = time.perf_counter() - start
+    print(f"wheel: {fired:,} webhooks over {wheel.size:,} ticks, {elapsed / wheel.size * 1e6:.2f} µs per tick")
+
+
+async def bench_delivery(per_host: int) -> None:
+    server = await asyncio.start_server(handle, "127.0.0.1", 0)
+    port = server.sockets[0].getsockname()[1]
+    records = []
+    client = httpx.AsyncClient(limits=httpx.Limits(max_connections=200, max_keepalive_connections=200))
+    service = WebhookService(1, 200, per_host, 3, 0, 500, 5, client=lambda: client, record=records.extend)
+    hooks = [webhook(port, datetime.time()) for _ in range(DELIVERIES)]
+
+    start = time.perf_counter()
+    await asyncio.gather(*(service.deliver(hook) for hook in hooks))
+    await service.flush()
+    elapsed = time.perf_counter() - start
+
+    stats = service.stats()
+    print(
+        f"per host {per_host:>3}: {DELIVERIES / elapsed * 60:>10,.0f} webhooks/min, "
+        f"{stats['succeeded']:,} delivered, {stats['retried']:,} retries, {len(records):,} attempts recorded"
+    )
+    await client.aclose()
+    server.close()
+    await server.wait_closed()
+
+
+def main() -> None:
+    bench_wheel()
+    for per_host in (1, 10, 50):
+        asyncio.run(bench_delivery(per_host))
+
+
+if __name__ == "__main__":
+    main()
@@ -40,6 +40,10 @@ default_config = {
         'default_user': 'admin',
         'default_password': 'changeme',
         'default_hasher': 'argon2', # bcrypt, argon2
+        'argon2_time_cost': 3, # iterations, see `myeasycli calibrate_hasher`
+        'argon2_memory_cost': 65536, # in KiB
+        'argon2_parallelism': 4,
+        'bcrypt_rounds': 12,
         'security_max_login_attempts': 5,
         'token_time': 48, # in hours
         'token_long_time': 24*365*5,  # in hours (5 years)
@@ -3,9 +3,13 @@ from fastapi import APIRouter
 from . import (
     users,
     auth,
+    tasks,
+    reports,
 )
 
 router = APIRouter(prefix="/api")
 
 router.include_router(users.router)
 router.include_router(auth.router)
+router.include_router(tasks.router)
+router.include_router(reports.router)
@@ -25,19 +25,24 @@
 
 from datetime import timedelta
 
+from authlib.jose.errors import JoseError
 from fastapi import APIRouter, Depends, Request, Response, status
 from fastapi.exceptions import HTTPException
 from pydantic import BaseModel
 from sqlalchemy.orm.session import Session
 
 from ..core import UserAPIRouter
-from ..core.deps import get_current_user_refresh
-from ...core.exceptions import UserLockedOut
+from ..core.deps import get_client_ip, get_current_user, get_current_user_refresh, get_token_claims
+from ...backend.config import config
+from ...core.exceptions import HasherSaturated, UserLockedOut
+from ...core.rate_limiter import login_ip_limiter, login_user_limiter
+from ...core.revocation import revocation_store
+from ...core.token_verifier import token_verifier
 from ...core.root_logger import get_logger
 from ...core.security import get_auth_provider, get_access_long_token, get_access_token
 from ...database.db_session import generate_session
-from ...schema.user import CredentialsRequestForm
-from ...schema.user.user import UserModelRefresh
+from ...schema.user import CredentialsRequestForm, RevokeToken
+from ...schema.user.user import UserModel, UserModelRefresh
 
 public_router = APIRouter(tags=["Users: Authentication"])
 user_router = UserAPIRouter(tags=["Users: Authentication"])
@@ -62,13 +67,19 @@ async def get_token(
     data: CredentialsRequestForm = Depends(),
     session: Session = Depends(generate_session),
 ):
-    if "x-forwarded-for" in request.headers:
-        ip = request.headers["x-forwarded-for"]
-        if "," in ip:  # if there are multiple IPs, the first one is canonically the true client
-            ip = str(ip.split(",")[0])
-    else:
-        # request.client should never be null, except sometimes during testing
-        ip = request.client.host if request.client else "unknown"
+    ip = get_client_ip(request)
+    username = data.username.strip().lower()
+
+    if config['rate_limit.login.enabled']:
+        # checked before looking up the user or verifying anything so that a burst costs no hashing
+        retry_after = login_ip_limiter.acquire(ip) or login_user_limiter.acquire(username)
+        if retry_after:
+            logger.error(f"Too many login attempts from {ip}")
+            raise HTTPException(
+                status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+                detail="Too many login attempts",
+                headers={"Retry-After": str(max(1, round(retry_after)))},
+            )
 
     try:
         auth_provider = get_auth_provider(session, request, data)
@@ -76,6 +87,11 @@ async def get_token(
     except UserLockedOut as e:
         logger.error(f"User is locked out from {ip}")
         raise HTTPException(status_code=status.HTTP_423_LOCKED, detail="User is locked out") from e
+    except HasherSaturated as e:
+        logger.warning(f"Login from {ip} rejected, too many pending password verifications")
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE, detail="Server busy", headers={"Retry-After": "1"}
+        ) from e
 
     if not auth:
         logger.error(f"Incorrect username or password from {ip}")
@@ -83,6 +99,8 @@ async def get_token(
             status_code=status.HTTP_401_UNAUTHORIZED,
         )
     access_token, duration = auth
+    if config['rate_limit.login.enabled']:
+        login_user_limiter.reset(username)
 
     expires_in = duration.total_seconds() if duration else None
     response.set_cookie(
@@ -106,6 +124,32 @@ async def refresh_token(response: Response, current_user: UserModelRefresh = Dep
 
 
 @user_router.post("/logout")
-async def logout(response: Response):
+async def logout(
+    response: Response,
+    claims=Depends(get_token_claims),
+    session: Session = Depends(generate_session),
+):
+    """Revokes the token used for the request and deletes the cookie"""
+    if claims is not None:
+        revocation_store.revoke(session, claims)
     response.delete_cookie("myeasyserver.access_token")
     return {"message": "Logged out"}
+
+
+@user_router.post("/revoke")
+async def revoke_token(
+    data: RevokeToken,
+    current_user: UserModel = Depends(get_current_user),
+    session: Session = Depends(generate_session),
+):
+    """Revokes a token of the user, for instance a long lived one"""
+    try:
+        claims = token_verifier.verify(data.token)
+    except JoseError as e:
+        raise HTTPException(status.HTTP_400_BAD_REQUEST, "Invalid token") from e
+
+    if (claims.get("sub") or claims.get("id")) != str(current_user.id):
+        raise HTTPException(status.HTTP_403_FORBIDDEN)
+    if not revocation_store.revoke(session, claims):
+        raise HTTPException(status.HTTP_400_BAD_REQUEST, "Token can't be revoked")
+    return {"message": "Token revoked"}
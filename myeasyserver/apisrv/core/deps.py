@@ -23,16 +23,20 @@
 #   limitations under the License.
 #
 
+import hmac
 from pathlib import Path
 from typing import Optional
 
-from authlib.jose import jwt
-from authlib.jose.errors import BadSignatureError
-from fastapi import Depends, HTTPException, status
+from authlib.jose import JWTClaims
+from authlib.jose.errors import JoseError
+from fastapi import Depends, HTTPException, Request, status
 from fastapi.security import OAuth2PasswordBearer
 from sqlalchemy.orm.session import Session
 
 from myeasyserver.backend.config import config
+from myeasyserver.core.security import api_key_digest, split_access_key
+from myeasyserver.core.token_verifier import token_verifier
+from myeasyserver.core.user_cache import user_cache
 
 from myeasyserver.database.db_session import generate_session
 from myeasyserver.database.repositories.all_repositories import get_repositories
@@ -41,7 +45,26 @@ from myeasyserver.schema.user.user import UserModel, UserModelRefresh
 
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="/api/auth/login_basic")
 oauth2_scheme_soft_fail = OAuth2PasswordBearer(tokenUrl="/api/auth/login_basic", auto_error=False)
-ALGORITHM = "HS256"
+
+
+async def get_token_claims(token: str = Depends(oauth2_scheme)) -> JWTClaims | None:
+    """
+    The get_token_claims function is the dependency verifying the bearer token of the request.
+    FastAPI resolves it once per request, whatever the number of dependencies using it.
+
+    :param token:str=Depends(oauth2_scheme): Used to Get the token from the authorization header.
+    :return: The claims of the token or None if the token is an API key.
+    """
+    if split_access_key(token) is not None:
+        return None
+    try:
+        return token_verifier.verify(token)
+    except JoseError:
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Could not validate credentials",
+            headers={"WWW-Authenticate": "Bearer"},
+        )
 
 
 async def is_logged_in(token: str = Depends(oauth2_scheme_soft_fail), session=Depends(generate_session)) -> bool:
@@ -55,17 +78,11 @@ async def is_logged_in(token: str = Depends(oauth2_scheme_soft_fail), session=De
     :return: True if the user is logged in.
     """
     try:
-        payload = jwt.decode(token, config['application.secret'])
-        username: str = payload.get("sub")
-        long_token: str = payload.get("long_token")
+        if split_access_key(token) is not None:
+            return validate_api_key(session, token) is not None
 
-        if long_token is not None:
-            try:
-                user = validate_long_live_token(session, token, payload.get("id"))
-                if user:
-                    return True
-            except Exception:
-                return False
+        payload = token_verifier.verify(token)
+        username: str = payload.get("sub")
 
         return username is not None
 
@@ -73,12 +90,17 @@ async def is_logged_in(token: str = Depends(oauth2_scheme_soft_fail), session=De
         return False
 
 
-async def get_current_user(token: str = Depends(oauth2_scheme), session=Depends(generate_session)) -> UserModel:
+async def get_current_user(
+    token: str = Depends(oauth2_scheme),
+    claims: JWTClaims | None = Depends(get_token_claims),
+    session=Depends(generate_session),
+) -> UserModel:
     """
     The get_current_user function is a dependency function that is used to validate the user's token.
     It takes in a token and returns the user object associated with that token.
 
     :param token:str=Depends(oauth2_scheme): Used to Get the token from the authorization header.
+    :param claims=Depends(get_token_claims): Used to Get the verified claims of the token.
     :param session=Depends(generate_session): Used to Get the session object from the function generate_session.
     :return: A userindb object.
     """
@@ -87,34 +109,40 @@ async def get_current_user(token: str = Depends(oauth2_scheme), session=Depends(
         detail="Could not validate credentials",
         headers={"WWW-Authenticate": "Bearer"},
     )
-    try:
-        payload = jwt.decode(token, config['application.secret'])
-        user_id: str = payload.get("sub")
-        long_token: str = payload.get("long_token")
+    if claims is None:
+        return validate_api_key(session, token)
 
-        if None is not None:
-            return validate_long_live_token(session, token, payload.get("id"))
+    user_id: str = claims.get("sub")
+    if user_id is None:
+        raise credentials_exception
 
-        if user_id is None:
-            raise credentials_exception
+    token_data = TokenData(user_id=user_id)
 
-        token_data = TokenData(user_id=user_id)
-    except BadSignatureError:
+    user = _load_user(session, token_data.user_id)
+    if user is None:
         raise credentials_exception
+    return user
+
 
+def _load_user(session: Session, user_id) -> UserModel | None:
+    """Returns the user from the cache of the authenticated users or from the database"""
     repos = get_repositories(session)
 
-    user = repos.users.get_one(token_data.user_id, "id", any_case=False)
+    user = user_cache.get(user_id, lambda: repos.users.get_cache_key(user_id))
+    if user is not None:
+        return user
+
+    user = repos.users.get_one(user_id, "id", any_case=False)
 
     # If we don't commit here, lazy-loads from user relationships will leave some table lock in postgres
     # which can cause quite a bit of pain further down the line
     session.commit()
-    if user is None:
-        raise credentials_exception
+    if user is not None:
+        user_cache.set(user)
     return user
 
-async def get_current_user_refresh(token: str = Depends(oauth2_scheme), current_user=Depends(get_current_user)) -> UserModelRefresh:
-    payload = jwt.decode(token, config['application.secret'])
+async def get_current_user_refresh(claims: JWTClaims | None = Depends(get_token_claims), current_user=Depends(get_current_user)) -> UserModelRefresh:
+    payload = claims or {}
     remember = bool(payload.get("remb"))
     long_token= payload.get("long_token")
     user_refresh= UserModelRefresh(user_id = current_user.id, long_token = long_token, remember = remember)
@@ -134,25 +162,35 @@ async def get_admin_user(current_user=Depends(get_current_user)) -> UserModel:
     return current_user
 
 
-def validate_long_live_token(session: Session, client_token: str, user_id: int) -> UserModel:
+def validate_api_key(session: Session, client_key: str) -> UserModel:
     """
-    The validate_long_live_token function is used to validate a long-lived token.
-    It takes in the session, client_token and id as parameters. It then checks if the token is valid by querying the database for all tokens with that parent ID. If it finds one, it returns a UserInDB object containing information about that user.
+    The validate_api_key function is used to validate an API key.
+    Keys are given as `prefix.secret`: the row is located by its indexed prefix and the digest of the secret is
+    compared in constant time with the stored one. If they match, it returns the user owning the key.
 
     :param session:Session: Used to Interact with the database.
-    :param client_token:str: Used to Validate the token.
-    :param id:int: Used to Get the user from the database.
-    :return: The userindb object that the token belongs to.
+    :param client_key:str: Used to Validate the key.
+    :return: The user the key belongs to.
     """
+    credentials_exception = HTTPException(
+        status_code=status.HTTP_401_UNAUTHORIZED,
+        detail="Could not validate credentials",
+        headers={"WWW-Authenticate": "Bearer"},
+    )
+    parts = split_access_key(client_key)
+    if parts is None:
+        raise credentials_exception
+    prefix, secret = parts
 
     repos = get_repositories(session)
+    key = repos.api_keys.get_one(prefix, "prefix", schema=False)
+    if key is None or not hmac.compare_digest(key.key, api_key_digest(secret)):
+        raise credentials_exception
 
-    tokens = repos.api_tokens.multi_query({"token": client_token, "user_id": user_id})
-
-    try:
-        return tokens[0].user
-    except IndexError as e:
-        raise HTTPException(status.HTTP_401_UNAUTHORIZED) from e
+    user = _load_user(session, key.user_id)
+    if user is None:
+        raise credentials_exception
+    return user
 
 
 
@@ -174,14 +212,27 @@ def validate_file_token(token: Optional[str] = None) -> Path:
         return None
 
     try:
-        payload = jwt.decode(token, config['application.secret'])
+        payload = token_verifier.verify(token)
         file_path = Path(payload.get("file"))
-    except BadSignatureError:
+    except JoseError:
         raise credentials_exception
 
     return file_path
 
 
+def get_client_ip(request: Request) -> str:
+    """
+    Returns the IP address of the client, as given by the reverse proxy if any.
+    """
+    if "x-forwarded-for" in request.headers:
+        ip = request.headers["x-forwarded-for"]
+        if "," in ip:  # if there are multiple IPs, the first one is canonically the true client
+            ip = str(ip.split(",")[0])
+        return ip.strip()
+    # request.client should never be null, except sometimes during testing
+    return request.client.host if request.client else "unknown"
+
+
 async def temporary_zip_path() -> Path:
     config.path.TEMP_DIR.mkdir(exist_ok=True, parents=True)
     temp_path = config.path.TEMP_DIR.joinpath("tmp_zip.zip")
@@ -0,0 +1,200 @@
+#  Copyright (c) 2024.  stef.
+#
+#      ______                 _____
+#     / ____/___ ________  __/ ___/___  ______   _____  _____
+#    / __/ / __ `/ ___/ / / /\__ \/ _ \/ ___/ | / / _ \/ ___/
+#   / /___/ /_/ (__  ) /_/ /___/ /  __/ /   | |/ /  __/ /
+#  /_____/\__,_/____/\__, //____/\___/_/    |___/\___/_/
+#                   /____/
+#
+#  Apache License
+#  ================
+#
+#   Licensed under the Apache License, Version 2.0 (the "License");
+#   you may not use this file except in compliance with the License.
+#   You may obtain a copy of the License at
+#
+#   http://www.apache.org/licenses/LICENSE-2.0
+#
+#   Unless required by applicable law or agreed to in writing, software
+#   distributed under the License is distributed on an "AS IS" BASIS,
+#   WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#   See the License for the specific language governing permissions and
+#   limitations under the License.
+#
+
+import json
+import time
+from dataclasses import dataclass
+from urllib.parse import urlencode
+
+from fastapi import Request, Response
+from sqlalchemy import select
+
+from ...backend.config import config
+from ...core.shared_store import get_shared_store, shared_store_enabled
+from ...core.token_verifier import token_verifier
+from ...database.db_session import session_context
+from ...database.models.users import User
+from ...database.table_versions import table_versions
+from ...helper.lru_cache import LRUCache
+from ...helper.shared_sqlite import SharedSqlite
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS response_cache (
+    key TEXT PRIMARY KEY,
+    versions TEXT NOT NULL,
+    status INTEGER NOT NULL,
+    headers TEXT NOT NULL,
+    body BLOB NOT NULL,
+    expires REAL NOT NULL
+);
+"""
+
+
+@dataclass(slots=True, frozen=True)
+class CacheRule:
+    """Tables a cached endpoint depends on and who its responses are shared with"""
+
+    tables: tuple[str, ...]
+    scope: str = "user"  # user, group, public
+
+
+@dataclass(slots=True)
+class CachedResponse:
+    versions: tuple[int, ...]
+    status_code: int
+    headers: list[tuple[bytes, bytes]]
+    body: bytes
+
+    def to_response(self) -> Response:
+        response = Response(content=self.body, status_code=self.status_code)
+        response.raw_headers = [*self.headers, (b"x-cache", b"HIT")]
+        return response
+
+
+def cached_response(*tables: str, scope: str = "user"):
+    """
+    Marks a GET endpoint as cacheable by `CachedRoute`.
+
+    :param tables: name of the tables the response is computed from. A write on one of
+        them through the repositories invalidates the cached responses.
+    :param scope: `user` responses are cached per user, `group` responses are shared by
+        the users of a group and `public` responses are shared by everyone.
+    """
+    if scope != "public":
+        tables = (*tables, User.__tablename__)
+
+    def decorator(func):
+        func.__response_cache__ = CacheRule(tuple(sorted(set(tables))), scope)
+        return func
+
+    return decorator
+
+
+class ResponseCache:
+    """
+    Cache of the responses of the GET endpoints marked with `cached_response`.
+
+    Responses are keyed by path, identity (user or group) and normalized query parameters
+    and stored with the versions of the tables they depend on. They are kept in an in-process
+    LRU and, when the shared store is enabled, in a SQLite table shared by all workers.
+
+    Without the shared store the table versions do not see the writes of the other workers,
+    so the in-process entries are kept no longer than `cache.versions_ttl`.
+
+    `key_for`, `get` and `store` may query the databases and are called from the thread pool.
+    """
+
+    def __init__(self, max_entries: int, ttl: float, shared: SharedSqlite | None = None) -> None:
+        self.ttl = ttl
+        local_ttl = ttl if table_versions.shared else min(ttl, table_versions.ttl)
+        self._local: LRUCache[CachedResponse] = LRUCache(max_entries, local_ttl)
+        groups_ttl = None if table_versions.shared else local_ttl
+        self._groups: LRUCache[tuple[tuple[int, ...], str]] = LRUCache(max_entries, groups_ttl)
+        self._shared = shared
+        self._stores = 0
+        if shared is not None:
+            shared.ensure_schema(SCHEMA)
+
+    def key_for(self, request: Request, rule: CacheRule) -> str | None:
+        """Returns the cache key of the request or None if the request can't be cached"""
+        params = urlencode(sorted(request.query_params.multi_items()))
+        if rule.scope == "public":
+            return f"{request.url.path}|public|{params}"
+
+        user_id = self._user_of(request)
+        if user_id is None:
+            return None
+        if rule.scope == "group":
+            group_id = self._group_of(user_id)
+            if group_id is None:
+                return None
+            return f"{request.url.path}|g:{group_id}|{params}"
+        return f"{request.url.path}|u:{user_id}|{params}"
+
+    @staticmethod
+    def _user_of(request: Request) -> str | None:
+        scheme, _, token = request.headers.get("authorization", "").partition(" ")
+        if scheme.lower() != "bearer" or not token:
+            return None
+        try:
+            claims = token_verifier.verify(token)
+        except Exception:
+            return None
+        return claims.get("sub")
+
+    def _group_of(self, user_id: str) -> str | None:
+        versions = table_versions.get(User.__tablename__)
+        cached = self._groups.get(user_id)
+        if cached is not None and cached[0] == versions:
+            return cached[1]
+
+        with session_context() as session:
+            group_id = session.execute(select(User.group_id).where(User.id == user_id)).scalar_one_or_none()
+        if group_id is None:
+            return None
+        self._groups.set(user_id, (versions, str(group_id)))
+        return str(group_id)
+
+    def get(self, key: str, versions: tuple[int, ...]) -> CachedResponse | None:
+        entry = self._local.get(key)
+        if entry is None and self._shared is not None:
+            row = self._shared.execute(
+                "SELECT versions, status, headers, body FROM response_cache WHERE key = ? AND expires > ?",
+                (key, time.time()),
+            ).fetchone()
+            if row is not None:
+                headers = [(k.encode("latin-1"), v.encode("latin-1")) for k, v in json.loads(row[2])]
+                entry = CachedResponse(tuple(json.loads(row[0])), row[1], headers, row[3])
+                self._local.set(key, entry)
+
+        if entry is None or entry.versions != versions:
+            return None
+        return entry
+
+    def store(self, key: str, versions: tuple[int, ...], response: Response) -> None:
+        if response.status_code != 200 or not isinstance(getattr(response, "body", None), bytes):
+            return
+        if "set-cookie" in response.headers:
+            return
+
+        entry = CachedResponse(versions, response.status_code, list(response.raw_headers), response.body)
+        self._local.set(key, entry)
+        if self._shared is not None:
+            headers = [(k.decode("latin-1"), v.decode("latin-1")) for k, v in entry.headers]
+            self._shared.execute(
+                "INSERT OR REPLACE INTO response_cache (key, versions, status, headers, body, expires) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                (key, json.dumps(versions), entry.status_code, json.dumps(headers), entry.body, time.time() + self.ttl),
+            )
+            self._stores += 1
+            if self._stores % 100 == 0:
+                self._shared.execute("DELETE FROM response_cache WHERE expires <= ?", (time.time(),))
+
+
+response_cache = ResponseCache(
+    config['cache.response.max_entries'],
+    config['cache.response.ttl'],
+    get_shared_store() if shared_store_enabled() else None,
+)
@@ -30,7 +30,11 @@ from json import JSONDecodeError
 
 from fastapi import APIRouter, Depends, Request, Response
 from fastapi.routing import APIRoute
+from starlette.concurrency import run_in_threadpool
 from .deps import get_admin_user, get_current_user
+from .response_cache import CachedResponse, response_cache
+from ...backend.config import config
+from ...database.table_versions import table_versions
 
 from typing import List, Optional
 
@@ -86,3 +90,42 @@ class CrudRoute(APIRoute):
             return response
 
         return custom_route_handler
+
+
+class CachedRoute(APIRoute):
+    """
+    Route class serving the GET endpoints marked with `cached_response` from the response cache.
+
+    The cached response is only returned when the tables the endpoint depends on were not
+    written since it was computed, so readers never see data older than the last write.
+    """
+
+    def get_route_handler(self) -> Callable:
+        original_route_handler = super().get_route_handler()
+        rule = getattr(self.endpoint, "__response_cache__", None)
+        if rule is None or not config['cache.response.enabled']:
+            return original_route_handler
+
+        def lookup(request: Request) -> tuple[str | None, tuple[int, ...], CachedResponse | None]:
+            key = response_cache.key_for(request, rule)
+            if key is None:
+                return None, (), None
+            versions = table_versions.get(*rule.tables)
+            return key, versions, response_cache.get(key, versions)
+
+        async def custom_route_handler(request: Request) -> Response:
+            if request.method != "GET":
+                return await original_route_handler(request)
+
+            # the group of the user, the shared versions and the shared entries are read from the databases
+            key, versions, cached = await run_in_threadpool(lookup, request)
+            if key is None:
+                return await original_route_handler(request)
+            if cached is not None:
+                return cached.to_response()
+
+            response = await original_route_handler(request)
+            await run_in_threadpool(response_cache.store, key, versions, response)
+            return response
+
+        return custom_route_handler
@@ -22,20 +22,12 @@
 #   See the License for the specific language governing permissions and
 #   limitations under the License.
 #
-from sqlalchemy import Column, Integer, String
+from fastapi import APIRouter
 
-from database.models.model_base import SqlAlchemyBase, BaseMixins
+from . import reports
 
 
-class Jobs_in_base(SqlAlchemyBase, BaseMixins):
-    __tablename__ = 'jobs'
-    id = Column(Integer, primary_key=True)
-    job = Column(String)
-    interval = Column(Integer)
-    latest = Column(Integer)
-    unit = Column(String)
-    timezone = Column(String)
-    startday = Column(String)
-    cancel_after = Column(String)
-    tags = Column(String)
+router = APIRouter()
 
+# the prefix is given here as the list of the reports is served on the prefix itself
+router.include_router(reports.router, prefix="/reports", tags=["Reports"])
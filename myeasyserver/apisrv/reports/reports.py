@@ -0,0 +1,85 @@
+#  Copyright (c) 2024.  stef.
+#
+#      ______                 _____
+#     / ____/___ ________  __/ ___/___  ______   _____  _____
+#    / __/ / __ `/ ___/ / / /\__ \/ _ \/ ___/ | / / _ \/ ___/
+#   / /___/ /_/ (__  ) /_/ /___/ /  __/ /   | |/ /  __/ /
+#  /_____/\__,_/____/\__, //____/\___/_/    |___/\___/_/
+#                   /____/
+#
+#  Apache License
+#  ================
+#
+#   Licensed under the Apache License, Version 2.0 (the "License");
+#   you may not use this file except in compliance with the License.
+#   You may obtain a copy of the License at
+#
+#   http://www.apache.org/licenses/LICENSE-2.0
+#
+#   Unless required by applicable law or agreed to in writing, software
+#   distributed under the License is distributed on an "AS IS" BASIS,
+#   WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#   See the License for the specific language governing permissions and
+#   limitations under the License.
+#
+
+from fastapi import HTTPException, Query, status
+from fastapi.param_functions import Depends
+from pydantic import UUID4
+from sqlalchemy.orm.session import Session
+
+from ..core import UserAPIRouter, get_current_user
+from ...database.db_session import generate_session
+from ...database.repositories.all_repositories import get_repositories
+from ...database.repositories.response import PaginationBase, PaginationQuery
+from ...schema.reports import ReportEntryPage, ReportSummary
+from ...schema.user import UserModel
+
+router = UserAPIRouter()
+
+
+@router.get("", response_model=PaginationBase[ReportSummary, ReportSummary])
+async def list_reports(
+    q: PaginationQuery = Depends(PaginationQuery),
+    current_user: UserModel = Depends(get_current_user),
+    session: Session = Depends(generate_session),
+):
+    """
+    Lists the reports of the group of the user, with the counts of their entries.
+    """
+    db = get_repositories(session)
+    return db.reports.by_group(current_user.group_id).page_summaries(q)
+
+
+@router.get("/{report_id}", response_model=ReportSummary)
+async def get_report(
+    report_id: UUID4,
+    current_user: UserModel = Depends(get_current_user),
+    session: Session = Depends(generate_session),
+):
+    db = get_repositories(session)
+    report = db.reports.by_group(current_user.group_id).get_summary(report_id)
+    if report is None:
+        raise HTTPException(status.HTTP_404_NOT_FOUND, f"Could not locate report with id '{report_id}' in database")
+    return report
+
+
+@router.get("/{report_id}/entries", response_model=ReportEntryPage)
+async def list_report_entries(
+    report_id: UUID4,
+    cursor: str | None = None,
+    limit: int = Query(100, ge=1, le=1000),
+    current_user: UserModel = Depends(get_current_user),
+    session: Session = Depends(generate_session),
+):
+    """
+    Lists the entries of a report by pages of `limit` entries. The `next` value of a page is
+    the cursor to pass to get the following one.
+    """
+    db = get_repositories(session)
+    if db.reports.by_group(current_user.group_id).get_one(report_id) is None:
+        raise HTTPException(status.HTTP_404_NOT_FOUND, f"Could not locate report with id '{report_id}' in database")
+    try:
+        return db.report_entries.page_after(report_id, cursor, limit)
+    except ValueError:
+        raise HTTPException(status.HTTP_400_BAD_REQUEST, "Invalid cursor")
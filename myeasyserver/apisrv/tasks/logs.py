@@ -0,0 +1,110 @@
+#  Copyright (c) 2024.  stef.
+#
+#      ______                 _____
+#     / ____/___ ________  __/ ___/___  ______   _____  _____
+#    / __/ / __ `/ ___/ / / /\__ \/ _ \/ ___/ | / / _ \/ ___/
+#   / /___/ /_/ (__  ) /_/ /___/ /  __/ /   | |/ /  __/ /
+#  /_____/\__,_/____/\__, //____/\___/_/    |___/\___/_/
+#                   /____/
+#
+#  Apache License
+#  ================
+#
+#   Licensed under the Apache License, Version 2.0 (the "License");
+#   you may not use this file except in compliance with the License.
+#   You may obtain a copy of the License at
+#
+#   http://www.apache.org/licenses/LICENSE-2.0
+#
+#   Unless required by applicable law or agreed to in writing, software
+#   distributed under the License is distributed on an "AS IS" BASIS,
+#   WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#   See the License for the specific language governing permissions and
+#   limitations under the License.
+#
+
+import asyncio
+from collections.abc import AsyncGenerator
+
+from fastapi import Header, HTTPException, Request, status
+from fastapi.param_functions import Depends
+from fastapi.responses import StreamingResponse
+from starlette.concurrency import run_in_threadpool
+
+from ..core import UserAPIRouter, get_current_user
+from ...backend.config import config
+from ...database.db_session import session_context
+from ...database.repositories.all_repositories import get_repositories
+from ...schema.server import ServerTaskLogLine, ServerTaskStatus
+from ...schema.user import UserModel
+from ...services.scheduler.task_log import task_log_writer
+
+router = UserAPIRouter()
+
+LINES_PER_READ = 500
+
+
+def _read_log(task_id: int, offset: int) -> tuple[list[ServerTaskLogLine], ServerTaskStatus | None]:
+    with session_context() as session:
+        db = get_repositories(session)
+        return db.server_task_log_lines.get_lines(task_id, offset, LINES_PER_READ), db.server_tasks.get_status(task_id)
+
+
+def _task_group(task_id: int):
+    with session_context() as session:
+        task = get_repositories(session).server_tasks.get_one(task_id)
+        return None if task is None else task.group_id
+
+
+async def _tail_log(request: Request, task_id: int, offset: int) -> AsyncGenerator[str, None]:
+    wakeup = task_log_writer.subscribe()
+    try:
+        while True:
+            lines, task_status = await run_in_threadpool(_read_log, task_id, offset)
+            for line in lines:
+                offset = line.seq
+                yield f"id: {line.seq}\ndata: {line.model_dump_json()}\n\n"
+            if len(lines) == LINES_PER_READ:
+                continue
+            if task_status not in (ServerTaskStatus.queued, ServerTaskStatus.running):
+                yield f"event: end\ndata: {task_status.value if task_status else ''}\n\n"
+                return
+            if await request.is_disconnected():
+                return
+            try:
+                # woken up by the batches of this process, the lines of the others are polled
+                await asyncio.wait_for(wakeup.wait(), config['tasks.log_poll'])
+            except asyncio.TimeoutError:
+                yield ": keep-alive\n\n"
+            wakeup.clear()
+    finally:
+        task_log_writer.unsubscribe(wakeup)
+
+
+@router.get("/{task_id}/log")
+async def stream_task_log(
+    task_id: int,
+    request: Request,
+    offset: int = 0,
+    last_event_id: str | None = Header(None),
+    current_user: UserModel = Depends(get_current_user),
+):
+    """
+    Streams the log of a task as server-sent events, from the line after `offset`.
+
+    Each event holds a line and has its position as id, so that a reconnecting client resumes
+    after the last line it received. The stream ends with an `end` event once the task is done.
+    """
+    group_id = await run_in_threadpool(_task_group, task_id)
+    if group_id is None:
+        raise HTTPException(status.HTTP_404_NOT_FOUND, f"Could not locate task with id '{task_id}' in database")
+    if group_id != current_user.group_id and not current_user.admin:
+        raise HTTPException(status.HTTP_403_FORBIDDEN)
+
+    if last_event_id is not None and last_event_id.isdigit():
+        offset = max(offset, int(last_event_id))
+    return StreamingResponse(
+        _tail_log(request, task_id, offset),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
@@ -30,13 +30,14 @@ from fastapi.param_functions import Depends
 from pydantic import UUID4
 from sqlalchemy.orm.session import Session
 
-from ...core.security import get_access_key, hash_password
-from ..core import UserAPIRouter, get_current_user
+from ...core.security import api_key_digest, get_access_key, split_access_key
+from ..core import CachedRoute, UserAPIRouter, get_current_user
+from ..core.response_cache import cached_response
 from ...database.db_session import generate_session
 from ...database.repositories.all_repositories import get_repositories
 from ...schema.user import UserKeyIn, UserModel, Createkey, UserKeyInDB, UserKeyOut
 
-router = UserAPIRouter()
+router = UserAPIRouter(route_class=CachedRoute)
 
 @router.post("/api-keys", status_code=status.HTTP_201_CREATED)
 async def create_api_key(
@@ -54,10 +55,12 @@ async def create_api_key(
     """
 
     key = get_access_key()
+    prefix, secret = split_access_key(key)
 
     key_model = Createkey(
         name=key_name.name,
-        key=hash_password(key),
+        prefix=prefix,
+        key=api_key_digest(secret),
         user_id=current_user.id,
     )
 
@@ -69,6 +72,7 @@ async def create_api_key(
 
 
 @router.get("/api-keys", status_code=status.HTTP_200_OK)
+@cached_response("user_keys")
 async def list_api_key(
     current_user: UserModel = Depends(get_current_user),
     session: Session = Depends(generate_session),
@@ -28,7 +28,6 @@ class RegistrationController(BasePublicController):
         self.event_bus.dispatch(
             integration_id="registration",
             group_id=result.group_id,
-            household_id=result.household_id,
             event_type=EventTypes.user_signup,
             document_data=EventUserSignupData(username=result.username, email=result.email),
         )
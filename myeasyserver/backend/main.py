@@ -47,12 +47,144 @@ class backend_application(app_class):
             'api_redoc': '/redoc',
             'forwarded_allow_ips': ['*'],
             'secret': '',
+            'workers': 1, # processes serving the application, always 1 in debug mode
+            'login_date_batch': 100, # login dates buffered before writing them
+            'login_date_interval': 60, # in seconds, the buffered login dates are written that often
         },
         'auth': {
             'ldap': {
-                'enabled': False
+                'enabled': False,
+                'server_url': '',
+                'tls_insecure': False,
+                'tls_cacertfile': '',
+                'enable_starttls': False,
+                'base_dn': '',
+                'query_bind': '',
+                'query_password': '',
+                'user_filter': '',
+                'admin_filter': '',
+                'id_attribute': 'uid',
+                'name_attribute': 'name',
+                'mail_attribute': 'mail',
+                'pool_size': 4, # connections per pool (searches and user binds)
+                'timeout': 5, # in seconds, to connect or to wait for a free connection
+                'check_after': 60, # in seconds, idle connections are checked before being reused
+                'cache_ttl': 60, # in seconds, for the user entries and the admin filter results
+                'cache_max_entries': 1024,
+            },
+            'oidc': {
+                'ready': False,
+                'configuration_url': '',
+                'tls_cacertfile': '',
+                'signing_algorithm': 'RS256',
+                'user_claim': 'email',
+                'groups_claim': 'groups',
+                'user_group': '',
+                'admin_group': '',
+                'signup_enabled': True,
+                'remember_me': False,
+                'jwks_ttl': 3600, # in seconds, signing keys are refreshed in the background after that
+                'jwks_min_refetch': 30, # in seconds, min delay between two fetches on an unknown key id
+            },
+        },
+        'cache': {
+            'backend': 'auto', # memory, sqlite (shared between workers), auto: sqlite with several workers
+            'shared_path': '',
+            'versions_ttl': 5, # in seconds, with the memory backend table data is read again after that
+            'response': {
+                'enabled': True,
+                'max_entries': 1024,
+                'ttl': 300, # in seconds
+            },
+            'query': {
+                'enabled': True,
+                'max_entries': 2048,
+            },
+            'token': {
+                'max_entries': 4096, # verified access tokens
+                'max_age': 3600, # in seconds, tokens are verified again after that even if not expired
+            },
+            'user': {
+                'enabled': True,
+                'max_entries': 1024,
+                'ttl': 30, # in seconds, before checking the cache key of the user again
+                'max_age': 600, # in seconds
+            },
+        },
+        'rate_limit': {
+            'max_entries': 10000, # buckets kept in memory per limiter
+            'login': { # token buckets checked before any password verification
+                'enabled': True,
+                'ip_capacity': 20,
+                'ip_rate': 0.2, # tokens per second
+                'user_capacity': 5,
+                'user_rate': 0.02,
             },
         },
+        'scheduler': {
+            'max_sleep': 60, # in seconds, the scheduler loop checks the clock at least that often
+            'horizon': 3600, # in seconds, stored jobs due within that delay are loaded in memory
+            'misfire_policy': 'run_once', # runs missed while stopped: skip, run_once, catch_up
+            'misfire_grace': 60, # in seconds, a run later than that is missed
+            'leader': 'lock', # how the workers elect the one running the jobs: lock (one host), lease (database), none
+            'lock_file': '', # for the lock election, defaults to a file of the data directory
+            'lease_ttl': 30, # in seconds, for the lease election, renewed every third of it
+            'max_concurrent': 4, # jobs running at the same time
+            'thread_workers': 4, # threads running the jobs of the thread executor
+            'default_executor': 'inline', # executor of the jobs without one: inline, thread, process, async
+            'job_timeout': 0, # in seconds, runs lasting longer are cancelled, 0 for no limit
+            'shutdown_grace': 10, # in seconds, periodic tasks running at shutdown are cancelled after that
+        },
+        'tasks': {
+            'workers': 2, # tasks of the queue running at the same time in each process
+            'lease': 60, # in seconds, a task left by a stopped process is taken over after that
+            'retry_delay': 10, # in seconds, doubled on each failed attempt
+            'max_retry_delay': 3600,
+            'poll': 30, # in seconds, the queue is checked that often for tasks enqueued by other processes
+            'modules': [], # modules defining task functions, imported at startup to register them
+            'log_batch': 50, # log lines of the tasks written in one batch
+            'log_interval': 1, # in seconds, the pending log lines are written at least that often
+            'log_backlog': 10000, # log lines kept while the database cannot store them, the oldest are dropped beyond
+            'log_poll': 2, # in seconds, a log stream checks that often for lines written by other processes
+        },
+        'events': {
+            'queue_size': 1000, # events waiting for delivery, beyond which they are dropped
+            'batch': 100, # events taken at once, the events of a notifier are sent in one notification
+            'batch_delay': 1, # in seconds, waited after the first event of a batch for the next ones
+            'concurrency': 4, # notifications sent at the same time
+        },
+        'webhooks': {
+            'resolution': 1, # in seconds, webhooks scheduled within the same slot are fired together
+            'concurrency': 100, # webhooks being delivered at the same time
+            'per_host': 10, # webhooks being delivered at the same time to the same host
+            'timeout': 10, # in seconds, for each attempt
+            'max_attempts': 3, # network errors, 429 and 5xx answers are retried
+            'retry_delay': 5, # in seconds, doubled on each attempt
+            'record_batch': 200, # delivery attempts recorded in one batch
+            'record_interval': 5, # in seconds, the attempts are recorded at least that often
+        },
+        'smtp': {
+            'enabled': False,
+            'host': '',
+            'port': 587,
+            'auth_strategy': 'TLS', # TLS (STARTTLS), SSL or NONE
+            'user': '',
+            'password': '',
+            'from_name': '',
+            'from_email': '',
+            'timeout': 10, # in seconds, to connect and for each command
+            'pool_size': 2, # sessions kept open, each used by a sending thread
+            'idle_timeout': 120, # in seconds, idle sessions are closed after that
+            'keepalive': 30, # in seconds, idle sessions are checked with a NOOP that often
+            'batch': 20, # queued emails sent through a session in a row
+            'rate': 5, # emails per second, 0 for no limit
+            'queue_size': 1000, # emails waiting to be sent, beyond which they are dropped
+            'shutdown_grace': 10, # in seconds, the queued emails are sent for at most that long at shutdown
+        },
+        'hashing': {
+            'max_workers': 2, # processes hashing the passwords, 0 to hash in the calling thread
+            'max_pending': 16, # hashes running or waiting, beyond which they are rejected
+        },
         'cors' : {
             'allow_origins': ['*'],
             'allow_headers': ['*'],
@@ -64,6 +196,7 @@ class backend_application(app_class):
     params_link = {
         'application.pid_file': ['pid_file', __SOFTWARE__ + '_PID_FILE', 'PID_FILE'],
         'application.secret': [None, __SOFTWARE__ + '_SECRET', 'SECRET'],
+        'smtp.password': [None, __SOFTWARE__ + '_SMTP_PASSWORD', 'SMTP_PASSWORD'],
     }
 
     @staticmethod
@@ -107,7 +240,7 @@ class backend_application(app_class):
         else: # production configuration here
             serverconf = {
                 'log_level': 'debug' if config['application.verbose'] else 'error',
-                'workers': 1
+                'workers': config['application.workers']
             }
             if config['application.socket'] is not None:
                 serverconf['uds']= config['application.socket']
@@ -22,13 +22,15 @@
 #   See the License for the specific language governing permissions and
 #   limitations under the License.
 #
+import asyncio
 from collections.abc import AsyncGenerator
 from contextlib import asynccontextmanager
 
 from debug_toolbar.middleware import DebugToolbarMiddleware
 from starlette.middleware.gzip import GZipMiddleware
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi import FastAPI
+from fastapi import FastAPI, Request, status
+from fastapi.responses import JSONResponse
 
 import services
 from ..version import __version__, __software__, __description__
@@ -53,6 +55,17 @@ def api_middleware(app):
 
     #register_admin(app)
 
+def exception_handlers(app):
+    from ..core.exceptions import HasherSaturated, LDAPPoolExhausted
+
+    async def server_busy(_: Request, __: HasherSaturated | LDAPPoolExhausted) -> JSONResponse:
+        return JSONResponse(
+            {"detail": "Server busy"}, status_code=status.HTTP_503_SERVICE_UNAVAILABLE, headers={"Retry-After": "1"}
+        )
+
+    app.add_exception_handler(HasherSaturated, server_busy)
+    app.add_exception_handler(LDAPPoolExhausted, server_busy)
+
 def routers(app):
     from ..apisrv import router
     app.include_router(router)
@@ -69,8 +82,21 @@ def build_app():
         main()
         logger.info("end: database initialization")
 
+        from ..core.hashing_service import hashing_service
+        # made before the first login of an unknown user, which is verified against it
+        await hashing_service.dummy_hash()
+        from ..core.revocation import revocation_store
+        # reloaded in the background afterwards, token checks only look it up
+        revocation_store.refresh()
+
         # from .services.events import create_general_event
-        import myeasyserver.services.scheduler.execution_queue
+        from ..services.scheduler.execution_queue import get_task_queue, task_registry
+        task_registry.import_modules(config['tasks.modules'])
+        get_task_queue().start()
+        from ..services.scheduler.worker import periodic_runner
+        periodic_runner.start()
+        from ..services.event_bus_service import get_event_bus
+        get_event_bus().start()
 
         logger.info("-----SYSTEM STARTUP----- \n")
         logger.info("------APP SETTINGS------")
@@ -81,6 +107,20 @@ def build_app():
             config.path.json(indent=4)
         )
 
+        if config['auth.oidc.ready'] and config['auth.oidc.configuration_url']:
+            from ..core.providers.jwks_manager import get_jwks_manager
+            get_jwks_manager().start()
+
+        from ..services.scheduler.job_store import get_job_store
+        from ..services.scheduler.driver import get_scheduler_driver
+        from ..services.scheduler.executors import get_job_runner
+        get_job_runner()
+        # the stored jobs are loaded by the worker elected to run the jobs
+        get_scheduler_driver().on_elected(get_job_store().start)
+        get_scheduler_driver().start()
+        from ..services.webhook_service import get_webhook_service
+        get_webhook_service().start()
+
         #create_general_event("Application Startup", f"API started on port {settings['application.port']}")
         #redis = aioredis.from_url(
         #    settings.REDIS_URL,
@@ -91,6 +131,39 @@ def build_app():
 
         logger.info("-----SYSTEM SHUTDOWN----- \n")
 
+        from ..services.scheduler.driver import get_scheduler_driver
+        from ..services.scheduler.executors import get_job_runner
+        await get_scheduler_driver().stop()
+        await get_job_runner().shutdown()
+        from ..services.scheduler.execution_queue import get_task_queue
+        await get_task_queue().stop()
+        from ..services.scheduler.worker import periodic_runner
+        await periodic_runner.stop(config['scheduler.shutdown_grace'])
+        from ..services.scheduler.task_log import task_log_writer
+        task_log_writer.flush()
+        from ..services.event_bus_service import get_event_bus
+        await get_event_bus().stop()
+        from ..services.webhook_service import get_webhook_service
+        await get_webhook_service().stop()
+        from ..services.email.email_senders import get_email_sender
+        if get_email_sender.cache_info().currsize:
+            # only when an email was sent, creating the sender checks the smtp settings
+            await asyncio.to_thread(get_email_sender().stop, config['smtp.shutdown_grace'])
+
+        from ..core.hashing_service import hashing_service
+        from ..database.login_dates import login_dates
+        hashing_service.shutdown()
+        login_dates.flush()
+        if config['auth.ldap.enabled']:
+            from ..core.providers.ldap_pool import get_ldap_pools
+            for pool in get_ldap_pools():
+                pool.close()
+        if config['auth.oidc.ready'] and config['auth.oidc.configuration_url']:
+            from ..core.providers.jwks_manager import get_jwks_manager
+            await get_jwks_manager().stop()
+        from ..helper.http_client import close_http_clients
+        await close_http_clients()
+
 
     server = FastAPI(
         debug = config['internal.debug'],
@@ -107,6 +180,7 @@ def build_app():
 
 
     api_middleware(server)
+    exception_handlers(server)
     routers(server)
     return server
 
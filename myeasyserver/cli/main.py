@@ -28,12 +28,14 @@ import json
 import os
 
 from myeasyserver.app import app_class
+from ..services.hasher_calibration import calibrate_hasher
 from ..services.remote_execute import remote_execute
 from ..version import __software__
 
 __SOFTWARE__ = __software__.upper()
 commands = {
     "install_docker": [ remote_execute, 'install_docker', {}, 'Install docker system' ],
+    "calibrate_hasher": [ calibrate_hasher, 'calibrate_hasher', {'target_ms': 500, 'dry_run': False}, 'Tune the password hash costs for this host (target_ms=500 dry_run=false)' ],
 }
 
 class cli_application(app_class):
@@ -64,6 +66,17 @@ class cli_application(app_class):
     def test_name(name):
         return name == 'myeasycli'
     def run(self, config):
-        return 0
+        name = config.args.command[0]
+        if name not in commands:
+            print("Unknown command %s" % name)
+            return 1
+
+        function, command, arguments, _ = commands[name]
+        arguments = arguments.copy()
+        for parameter in config.args.parameters:
+            key, _, value = parameter.partition('=')
+            arguments[key] = value
+        ret = function(command, arguments, config)
+        return 0 if ret is None else ret
 
 
@@ -41,3 +41,19 @@ def registered_exceptions() -> dict:
 
 
 class UserLockedOut(Exception): ...
+
+
+class HasherSaturated(Exception):
+    """
+    This exception is raised when too many password hashes are already pending.
+    """
+
+    pass
+
+
+class LDAPPoolExhausted(Exception):
+    """
+    This exception is raised when no LDAP connection of a pool became free in time.
+    """
+
+    pass
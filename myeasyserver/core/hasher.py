@@ -28,6 +28,7 @@ from typing import Protocol
 
 import bcrypt
 from argon2 import PasswordHasher
+from argon2.exceptions import InvalidHashError, VerificationError
 
 from myeasyserver.backend.config import config
 
@@ -47,30 +48,47 @@ class FakeHasher:
 
 
 class BcryptHasher:
+    def __init__(self, rounds: int = 12) -> None:
+        self.rounds = rounds
+
     def hash(self, password: str) -> str:
         password_bytes = password.encode("utf-8")
-        hashed = bcrypt.hashpw(password_bytes, bcrypt.gensalt())
+        hashed = bcrypt.hashpw(password_bytes, bcrypt.gensalt(self.rounds))
         return hashed.decode("utf-8")
 
     def verify(self, password: str, hashed: str) -> (bool, str):
         password_bytes = password.encode("utf-8")
         hashed_bytes = hashed.encode("utf-8")
-        return bcrypt.checkpw(password_bytes, hashed_bytes), None
+        if not bcrypt.checkpw(password_bytes, hashed_bytes):
+            return False, None
+        # "$2b$<rounds>$...": hashes made with other rounds are upgraded
+        if hashed.split("$")[2] != "%02d" % self.rounds:
+            return True, self.hash(password)
+        return True, None
 
 class Argon2Hasher:
+    def __init__(self, time_cost: int = 3, memory_cost: int = 65536, parallelism: int = 4) -> None:
+        self.time_cost = time_cost
+        self.memory_cost = memory_cost
+        self.parallelism = parallelism
+
+    def _hasher(self) -> PasswordHasher:
+        return PasswordHasher(time_cost=self.time_cost, memory_cost=self.memory_cost, parallelism=self.parallelism)
+
     def hash(self, password: str) -> str:
-        ph = PasswordHasher()
+        ph = self._hasher()
         hashed = ph.hash(password)
         return hashed
 
     def verify(self, password: str, hashed: str) -> (bool, str):
-        ph = PasswordHasher()
-        check = ph.verify(hashed, password)
-        if check:
-            if ph.check_needs_rehash(hashed):
-                return True, ph.hash(password)
-            return True, None
-        return False, None
+        ph = self._hasher()
+        try:
+            ph.verify(hashed, password)
+        except (VerificationError, InvalidHashError):
+            return False, None
+        if ph.check_needs_rehash(hashed):
+            return True, ph.hash(password)
+        return True, None
 
 @lru_cache(maxsize=1)
 def get_hasher() -> Hasher:
@@ -78,5 +96,9 @@ def get_hasher() -> Hasher:
         return FakeHasher()
 
     if config['application.default_hasher'] == 'bcrypt':
-        return BcryptHasher()
-    return Argon2Hasher()
+        return BcryptHasher(config['application.bcrypt_rounds'])
+    return Argon2Hasher(
+        config['application.argon2_time_cost'],
+        config['application.argon2_memory_cost'],
+        config['application.argon2_parallelism'],
+    )
@@ -0,0 +1,163 @@
+#  Copyright (c) 2024.  stef.
+#
+#      ______                 _____
+#     / ____/___ ________  __/ ___/___  ______   _____  _____
+#    / __/ / __ `/ ___/ / / /\__ \/ _ \/ ___/ | / / _ \/ ___/
+#   / /___/ /_/ (__  ) /_/ /___/ /  __/ /   | |/ /  __/ /
+#  /_____/\__,_/____/\__, //____/\___/_/    |___/\___/_/
+#                   /____/
+#
+#  Apache License
+#  ================
+#
+#   Licensed under the Apache License, Version 2.0 (the "License");
+#   you may not use this file except in compliance with the License.
+#   You may obtain a copy of the License at
+#
+#   http://www.apache.org/licenses/LICENSE-2.0
+#
+#   Unless required by applicable law or agreed to in writing, software
+#   distributed under the License is distributed on an "AS IS" BASIS,
+#   WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#   See the License for the specific language governing permissions and
+#   limitations under the License.
+#
+
+import asyncio
+import multiprocessing
+import secrets
+import threading
+from concurrent.futures import Future, ProcessPoolExecutor
+from typing import Any, Callable
+
+from .exceptions import HasherSaturated
+from .hasher import FakeHasher, Hasher, get_hasher
+from ..backend.config import config
+
+
+def _call(func: Callable, *args) -> Future:
+    future: Future = Future()
+    try:
+        future.set_result(func(*args))
+    except Exception as e:
+        future.set_exception(e)
+    return future
+
+
+class HashingService:
+    """
+    Runs the password hashes and verifications in a bounded pool of processes so that they
+    neither block the event loop nor compete with the request threads for the GIL.
+
+    At most `max_pending` operations are accepted at once (running or waiting for a worker),
+    others are rejected immediately with `HasherSaturated` instead of queuing without limit.
+    """
+
+    def __init__(self, max_workers: int, max_pending: int) -> None:
+        self.max_workers = max_workers
+        self.max_pending = max(max_pending, max_workers)
+        self._executor: ProcessPoolExecutor | None = None
+        self._lock = threading.Lock()
+        self._dummy_hash: str | None = None
+        self.in_flight = 0
+        self.peak_in_flight = 0
+        self.completed = 0
+        self.rejected = 0
+
+    def _get_executor(self) -> ProcessPoolExecutor:
+        with self._lock:
+            if self._executor is None:
+                # the server process runs threads by then, forking it could leave the workers on locks
+                # held at fork time: they are forked from a single threaded forkserver, or spawned
+                methods = multiprocessing.get_all_start_methods()
+                context = multiprocessing.get_context("forkserver" if "forkserver" in methods else "spawn")
+                if context.get_start_method() == "forkserver":
+                    context.set_forkserver_preload([__name__])
+                self._executor = ProcessPoolExecutor(
+                    max_workers=self.max_workers, mp_context=context, initializer=_init_worker
+                )
+            return self._executor
+
+    def _done(self, _: Future) -> None:
+        with self._lock:
+            self.in_flight -= 1
+            self.completed += 1
+
+    def _submit(self, func: Callable, *args) -> Future:
+        hasher = get_hasher()
+        if self.max_workers <= 0 or isinstance(hasher, FakeHasher):
+            return _call(func, hasher, *args)
+
+        with self._lock:
+            if self.in_flight >= self.max_pending:
+                self.rejected += 1
+                raise HasherSaturated()
+            self.in_flight += 1
+            self.peak_in_flight = max(self.peak_in_flight, self.in_flight)
+
+        try:
+            future = self._get_executor().submit(func, hasher, *args)
+        except Exception:
+            with self._lock:
+                self.in_flight -= 1
+            raise
+        future.add_done_callback(self._done)
+        return future
+
+    async def hash(self, password: str) -> str:
+        return await asyncio.wrap_future(self._submit(_hash, password))
+
+    async def verify(self, password: str, hashed: str) -> tuple[bool, str | None]:
+        """Returns if the password matches and the new hash to store when the hash needs to be upgraded"""
+        return await asyncio.wrap_future(self._submit(_verify, password, hashed))
+
+    async def dummy_hash(self) -> str:
+        """
+        Returns the hash of a random password made once with the configured hasher. The login of
+        an unknown user verifies against it, so that it takes as long as the login of a known one.
+        """
+        if self._dummy_hash is None:
+            self._dummy_hash = await self.hash(secrets.token_urlsafe())
+        return self._dummy_hash
+
+    def hash_sync(self, password: str) -> str:
+        """Same as `hash` for the code not running in the event loop (threads of the sync endpoints, seeders)"""
+        return self._submit(_hash, password).result()
+
+    def verify_sync(self, password: str, hashed: str) -> tuple[bool, str | None]:
+        return self._submit(_verify, password, hashed).result()
+
+    def stats(self) -> dict[str, Any]:
+        with self._lock:
+            return {
+                "workers": self.max_workers,
+                "max_pending": self.max_pending,
+                "in_flight": self.in_flight,
+                "queued": max(0, self.in_flight - self.max_workers),
+                "peak_in_flight": self.peak_in_flight,
+                "completed": self.completed,
+                "rejected": self.rejected,
+            }
+
+    def shutdown(self) -> None:
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=False, cancel_futures=True)
+
+
+def _init_worker() -> None:
+    # the configuration is loaded again from the environment of the server when this module is imported,
+    # the hasher is built before the first request
+    get_hasher()
+
+
+def _hash(hasher: Hasher, password: str) -> str:
+    return hasher.hash(password)
+
+
+def _verify(hasher: Hasher, password: str, hashed: str) -> tuple[bool, str | None]:
+    return hasher.verify(password, hashed)
+
+
+hashing_service = HashingService(config['hashing.max_workers'], config['hashing.max_pending'])
@@ -8,6 +8,7 @@ from sqlalchemy.orm.session import Session
 from ..security import get_access_token
 from ...database.repositories.all_repositories import get_repositories
 from ...schema.user import UserModel
+from ...services.event_bus_service import EventTypes, EventUserSignupData, get_event_bus
 
 T = TypeVar("T")
 
@@ -42,6 +43,16 @@ class AuthProvider(Generic[T], metaclass=abc.ABCMeta):
         self.user = user
         return user
 
+    @staticmethod
+    def signed_up(integration_id: str, user: UserModel) -> None:
+        """Notifies the group of a user account created at its first login"""
+        get_event_bus().dispatch(
+            integration_id=integration_id,
+            group_id=user.group_id,
+            event_type=EventTypes.user_signup,
+            document_data=EventUserSignupData(username=user.username, email=user.email),
+        )
+
     @abc.abstractmethod
     async def authenticate(self) -> tuple[str, timedelta] | None:
         """Attempt to authenticate a user"""
@@ -23,18 +23,18 @@
 #   limitations under the License.
 #
 
-from datetime import timedelta, datetime
+from datetime import timedelta
 
 from sqlalchemy.orm.session import Session
 
 from .. import root_logger
 from ..exceptions import UserLockedOut
-from ..hasher import get_hasher
+from ..hashing_service import hashing_service
 from ...backend.config import config
+from ...database.login_dates import login_dates
 from ...database.repositories.all_repositories import get_repositories
 from ...schema.user import CredentialsRequest
 from .auth_provider import AuthProvider
-from ...services.user_services.user_service import UserService
 
 
 class CredentialsProvider(AuthProvider[CredentialsRequest]):
@@ -53,30 +53,27 @@ class CredentialsProvider(AuthProvider[CredentialsRequest]):
         if not user:
             # To prevent user enumeration we perform the verify_password computation to ensure
             # server side time is relatively constant and not vulnerable to timing attacks.
-            CredentialsProvider.verify_password(
-                "mydeliciouscoffee", "$2b$12$JdHtJOlkPFwyxdjdygEzPOtYmdQF5/R5tHxw5Tq8pxjubyLqdIX5i"
-            )
+            await CredentialsProvider.verify_password(self.data.password, await hashing_service.dummy_hash())
             return None
 
         if user.login_attemps >= config['application.security_max_login_attempts'] or user.is_locked:
             raise UserLockedOut()
 
-        if not CredentialsProvider.verify_password(self.data.password, user.password):
-            user.login_attemps += 1
-            db.users.update(user.id, user)
-
-            if user.login_attemps >= config['application.security_max_login_attempts']:
-                user_service = UserService(db)
-                user_service.lock_user(user)
-
+        valid, new_hash = await CredentialsProvider.verify_password(self.data.password, user.password)
+        if not valid:
+            # counts the failure and locks the user when it is the last allowed one
+            db.users.record_login_failure(user.id)
             return None
 
-        user.login_attemps = 0
-        user.login_date = datetime.now()
-        db.users.update(user.id, user)
+        if new_hash is not None:
+            # the hash was made with other costs than the configured ones, it is upgraded transparently
+            db.users.update_password(user.id, new_hash)
+        if user.login_attemps:
+            db.users.reset_login_attempts(user.id)
+        login_dates.record(user.id)
         return self.get_access_token(self.data.remember_me)  # type: ignore
 
     @staticmethod
-    def verify_password(plain_password: str, hashed_password: str) -> bool:
-        """Compares a plain string to a hashed password"""
-        return get_hasher().verify(plain_password, hashed_password)
+    async def verify_password(plain_password: str, hashed_password: str) -> tuple[bool, str | None]:
+        """Compares a plain string to a hashed password, returns the new hash if it has to be upgraded"""
+        return await hashing_service.verify(plain_password, hashed_password)
@@ -23,7 +23,7 @@
 #   limitations under the License.
 #
 
-from datetime import timedelta, datetime
+from datetime import timedelta
 
 from sqlalchemy.orm.session import Session
 
@@ -31,6 +31,7 @@ from .. import root_logger
 from ..exceptions import UserLockedOut
 from ..hasher import get_hasher
 from ...backend.config import config
+from ...database.login_dates import login_dates
 from ...database.repositories.all_repositories import get_repositories
 from ...schema.user import CredentialsRequest
 from .auth_provider import AuthProvider
@@ -53,7 +54,7 @@ class FakeProvider(AuthProvider[CredentialsRequest]):
         if not user:
             return None
 
-        user.login_attemps = 0
-        user.login_date = datetime.now()
-        db.users.update(user.id, user)
+        if user.login_attemps:
+            db.users.reset_login_attempts(user.id)
+        login_dates.record(user.id)
         return self.get_access_token(self.data.remember_me)  # type: ignore
@@ -0,0 +1,165 @@
+#  Copyright (c) 2024.  stef.
+#
+#      ______                 _____
+#     / ____/___ ________  __/ ___/___  ______   _____  _____
+#    / __/ / __ `/ ___/ / / /\__ \/ _ \/ ___/ | / / _ \/ ___/
+#   / /___/ /_/ (__  ) /_/ /___/ /  __/ /   | |/ /  __/ /
+#  /_____/\__,_/____/\__, //____/\___/_/    |___/\___/_/
+#                   /____/
+#
+#  Apache License
+#  ================
+#
+#   Licensed under the Apache License, Version 2.0 (the "License");
+#   you may not use this file except in compliance with the License.
+#   You may obtain a copy of the License at
+#
+#   http://www.apache.org/licenses/LICENSE-2.0
+#
+#   Unless required by applicable law or agreed to in writing, software
+#   distributed under the License is distributed on an "AS IS" BASIS,
+#   WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#   See the License for the specific language governing permissions and
+#   limitations under the License.
+#
+
+import asyncio
+import base64
+import json
+import time
+from functools import lru_cache
+from typing import Callable
+
+import httpx
+from authlib.jose import JsonWebKey, KeySet
+
+from ..root_logger import get_logger
+from ...backend.config import config
+from ...helper.http_client import get_http_client
+
+logger = get_logger("jwks_manager")
+
+
+def token_kid(token: str) -> str | None:
+    """Returns the `kid` of the header of a JWT, without verifying anything"""
+    try:
+        header = token.split(".", 1)[0]
+        return json.loads(base64.urlsafe_b64decode(header + "=" * (-len(header) % 4))).get("kid")
+    except (ValueError, AttributeError):
+        return None
+
+
+class JWKSManager:
+    """
+    Keeps the signing keys of an OpenID provider.
+
+    Keys are fetched from the `jwks_uri` of the discovery document and kept `ttl` seconds.
+    Past that they are still served while a refresh runs in the background, and a
+    background task can refresh them periodically. A token signed with an unknown `kid`
+    (the provider rotated its keys) triggers a refetch, at most once every
+    `min_refetch_interval` seconds. Concurrent refreshes are merged into one request.
+    """
+
+    def __init__(self, configuration_url: str, client: Callable[[], httpx.AsyncClient], ttl: float = 3600,
+                 min_refetch_interval: float = 30) -> None:
+        self.configuration_url = configuration_url
+        self.client = client
+        self.ttl = ttl
+        self.min_refetch_interval = min_refetch_interval
+        self._jwks_uri: str | None = None
+        self._keys: KeySet | None = None
+        self._kids: set[str] = set()
+        self._fetched_at = 0.0
+        self._attempted_at = float("-inf")
+        self._refreshing: asyncio.Task | None = None
+        self._background: asyncio.Task | None = None
+
+    async def _fetch_jwks_uri(self) -> str | None:
+        response = await self.client().get(self.configuration_url)
+        response.raise_for_status()
+        jwks_uri = (response.json() or {}).get("jwks_uri")
+        if not jwks_uri:
+            logger.warning("[OIDC] Unable to find the jwks_uri from the OIDC_CONFIGURATION_URL")
+        return jwks_uri
+
+    async def _fetch(self) -> KeySet | None:
+        self._attempted_at = time.monotonic()
+        try:
+            if self._jwks_uri is None:
+                self._jwks_uri = await self._fetch_jwks_uri()
+                if self._jwks_uri is None:
+                    return self._keys
+            response = await self.client().get(self._jwks_uri)
+            response.raise_for_status()
+            jwks = response.json()
+        except (httpx.HTTPError, ValueError) as e:
+            logger.error(f"[OIDC] Unable to fetch the signing keys: {e}")
+            # the provider may have moved its keys, read the discovery document again next time
+            self._jwks_uri = None
+            return self._keys
+
+        self._keys = JsonWebKey.import_key_set(jwks)
+        self._kids = {key.get("kid") for key in jwks.get("keys", []) if key.get("kid")}
+        self._fetched_at = time.monotonic()
+        return self._keys
+
+    async def refresh(self) -> KeySet | None:
+        """Fetches the keys, joining the refresh already running if any"""
+        if self._refreshing is None or self._refreshing.done():
+            self._refreshing = asyncio.ensure_future(self._fetch())
+        return await asyncio.shield(self._refreshing)
+
+    def _stale(self) -> bool:
+        return time.monotonic() - self._fetched_at > self.ttl
+
+    def _may_refetch(self) -> bool:
+        # a fetch in progress is joined whatever the interval
+        pending = self._refreshing is not None and not self._refreshing.done()
+        return pending or time.monotonic() - self._attempted_at > self.min_refetch_interval
+
+    async def get_keys(self, kid: str | None = None) -> KeySet | None:
+        """Returns the keys able to verify a token signed with `kid`"""
+        if self._keys is None:
+            return await self.refresh() if self._may_refetch() else None
+
+        if kid is not None and kid not in self._kids and self._may_refetch():
+            logger.info(f"[OIDC] Unknown key '{kid}', fetching the keys of the provider again")
+            return await self.refresh()
+
+        if self._stale() and (self._refreshing is None or self._refreshing.done()):
+            # serve the keys we have, the next logins get the new ones
+            self._refreshing = asyncio.ensure_future(self._fetch())
+        return self._keys
+
+    async def _refresh_periodically(self) -> None:
+        while True:
+            try:
+                await self.refresh()
+            except Exception as e:
+                logger.error(f"[OIDC] Invalid signing keys: {e}")
+            await asyncio.sleep(self.ttl * 0.8)
+
+    def start(self) -> None:
+        """Refreshes the keys in the background until `stop`"""
+        if self._background is None or self._background.done():
+            self._background = asyncio.ensure_future(self._refresh_periodically())
+
+    async def stop(self) -> None:
+        if self._background is not None:
+            self._background.cancel()
+            try:
+                await self._background
+            except asyncio.CancelledError:
+                pass
+            self._background = None
+
+
+@lru_cache(maxsize=1)
+def get_jwks_manager() -> JWKSManager:
+    verify = config["auth.oidc.tls_cacertfile"] or True
+    return JWKSManager(
+        config["auth.oidc.configuration_url"],
+        lambda: get_http_client(verify, 5),
+        config["auth.oidc.jwks_ttl"],
+        config["auth.oidc.jwks_min_refetch"],
+    )
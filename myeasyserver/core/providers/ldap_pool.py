@@ -0,0 +1,168 @@
+#  Copyright (c) 2024.  stef.
+#
+#      ______                 _____
+#     / ____/___ ________  __/ ___/___  ______   _____  _____
+#    / __/ / __ `/ ___/ / / /\__ \/ _ \/ ___/ | / / _ \/ ___/
+#   / /___/ /_/ (__  ) /_/ /___/ /  __/ /   | |/ /  __/ /
+#  /_____/\__,_/____/\__, //____/\___/_/    |___/\___/_/
+#                   /____/
+#
+#  Apache License
+#  ================
+#
+#   Licensed under the Apache License, Version 2.0 (the "License");
+#   you may not use this file except in compliance with the License.
+#   You may obtain a copy of the License at
+#
+#   http://www.apache.org/licenses/LICENSE-2.0
+#
+#   Unless required by applicable law or agreed to in writing, software
+#   distributed under the License is distributed on an "AS IS" BASIS,
+#   WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#   See the License for the specific language governing permissions and
+#   limitations under the License.
+#
+
+import threading
+import time
+from functools import lru_cache
+from typing import Callable, TypeVar
+
+import ldap
+from ldap.ldapobject import LDAPObject
+
+from ..exceptions import LDAPPoolExhausted
+from ..root_logger import get_logger
+from ...backend.config import config
+
+T = TypeVar("T")
+
+logger = get_logger("ldap_pool")
+
+
+class LDAPConnectionPool:
+    """
+    Bounded pool of connections to the LDAP server.
+
+    Connections are opened (and bound, for the service pool) once by `factory` and reused
+    across logins, which saves the TCP and TLS handshakes of each attempt. A connection idle
+    for more than `check_after` seconds is checked with a `whoami` before being reused, and a
+    connection failing with a server error is dropped and replaced.
+    """
+
+    def __init__(self, name: str, factory: Callable[[], LDAPObject], size: int, timeout: float, check_after: float) -> None:
+        self.name = name
+        self.factory = factory
+        self.timeout = timeout
+        self.check_after = check_after
+        self._slots = threading.BoundedSemaphore(size)
+        self._idle: list[tuple[LDAPObject, float]] = []
+        self._lock = threading.Lock()
+
+    def _acquire(self) -> LDAPObject:
+        while True:
+            with self._lock:
+                if not self._idle:
+                    break
+                conn, released_at = self._idle.pop()
+            if time.monotonic() - released_at < self.check_after or self._healthy(conn):
+                return conn
+            self._discard(conn)
+        return self.factory()
+
+    @staticmethod
+    def _healthy(conn: LDAPObject) -> bool:
+        try:
+            conn.whoami_s()
+            return True
+        except ldap.LDAPError:
+            return False
+
+    @staticmethod
+    def _discard(conn: LDAPObject) -> None:
+        try:
+            conn.unbind_s()
+        except ldap.LDAPError:
+            pass
+
+    def _release(self, conn: LDAPObject) -> None:
+        with self._lock:
+            self._idle.append((conn, time.monotonic()))
+
+    def run(self, operation: Callable[[LDAPObject], T]) -> T:
+        """
+        Runs `operation` with a connection of the pool. When the server closed the connection,
+        the operation is retried once with a new one. Raises `LDAPPoolExhausted` when no
+        connection became free within `timeout` seconds.
+        """
+        if not self._slots.acquire(timeout=self.timeout):
+            raise LDAPPoolExhausted(f"no {self.name} LDAP connection available")
+        try:
+            for attempt in range(2):
+                conn = self._acquire()
+                try:
+                    result = operation(conn)
+                except (ldap.SERVER_DOWN, ldap.CONNECT_ERROR, ldap.TIMEOUT):
+                    self._discard(conn)
+                    if attempt:
+                        raise
+                    logger.warning(f"[LDAP] {self.name} connection lost, reconnecting")
+                    continue
+                except (ldap.INVALID_CREDENTIALS, ldap.NO_SUCH_OBJECT, ldap.FILTER_ERROR):
+                    # answers of the server, the connection itself is fine
+                    self._release(conn)
+                    raise
+                except Exception:
+                    # the state of the connection is unknown, do not hand it to someone else
+                    self._discard(conn)
+                    raise
+                self._release(conn)
+                return result
+        finally:
+            self._slots.release()
+
+    def close(self) -> None:
+        with self._lock:
+            idle, self._idle = self._idle, []
+        for conn, _ in idle:
+            self._discard(conn)
+
+
+def _connect(bind: bool) -> LDAPObject:
+    if config["auth.ldap.tls_insecure"]:
+        ldap.set_option(ldap.OPT_X_TLS_REQUIRE_CERT, ldap.OPT_X_TLS_NEVER)
+
+    conn = ldap.initialize(config["auth.ldap.server_url"])
+    conn.set_option(ldap.OPT_PROTOCOL_VERSION, 3)
+    conn.set_option(ldap.OPT_REFERRALS, 0)
+    conn.set_option(ldap.OPT_NETWORK_TIMEOUT, config["auth.ldap.timeout"])
+
+    if config["auth.ldap.tls_cacertfile"]:
+        conn.set_option(ldap.OPT_X_TLS_CACERTFILE, config["auth.ldap.tls_cacertfile"])
+        conn.set_option(ldap.OPT_X_TLS_NEWCTX, 0)
+
+    if config["auth.ldap.enable_starttls"]:
+        conn.start_tls_s()
+
+    if bind:
+        conn.simple_bind_s(config["auth.ldap.query_bind"], config["auth.ldap.query_password"])
+    return conn
+
+
+def _pool(name: str, bind: bool) -> LDAPConnectionPool:
+    return LDAPConnectionPool(
+        name,
+        lambda: _connect(bind),
+        config["auth.ldap.pool_size"],
+        config["auth.ldap.timeout"],
+        config["auth.ldap.check_after"],
+    )
+
+
+@lru_cache(maxsize=1)
+def get_ldap_pools() -> tuple[LDAPConnectionPool, LDAPConnectionPool]:
+    """
+    Returns the pool of connections bound with the query account, used for the searches, and
+    the pool of connections used to check the credentials of the users with a bind.
+    """
+    return _pool("service", True), _pool("user", False)
@@ -1,14 +1,18 @@
-from datetime import timedelta, datetime
+import asyncio
+from datetime import timedelta
 
 import ldap
 from ldap.ldapobject import LDAPObject
 from sqlalchemy.orm.session import Session
 
 from .credentials_provider import CredentialsProvider
+from .ldap_pool import get_ldap_pools
 from ..root_logger import get_logger
 from ...backend.config import config
+from ...database.login_dates import login_dates
 from ...database.models.users import AuthMethod
 from ...database.repositories.all_repositories import get_repositories
+from ...helper.lru_cache import LRUCache
 from ...schema.user import CredentialsRequest, UserModel
 
 
@@ -19,19 +23,19 @@ class LDAPProvider(CredentialsProvider):
 
     def __init__(self, session: Session, data: CredentialsRequest) -> None:
         super().__init__(session, data)
-        self.conn = None
 
     async def authenticate(self) -> tuple[str, timedelta] | None:
         """Attempt to authenticate a user given a username and password"""
         user = self.try_get_user(self.data.username)
         if not user or user.password == "LDAP" or user.auth_method == AuthMethod.LDAP:
-            user = self.get_user()
+            # the LDAP calls and the wait for a connection block, they are kept off the event loop
+            user = await asyncio.to_thread(self.get_user)
             if user:
-                user.login_attemps = 0
-                user.login_date = datetime.now()
-                db = get_repositories(self.session)
-                db.users.update(user.id, user)
-                return self.get_access_token(user, self.data.remember_me)
+                if user.login_attemps:
+                    get_repositories(self.session).users.reset_login_attempts(user.id)
+                login_dates.record(user.id)
+                self.user = user
+                return self.get_access_token(self.data.remember_me)
 
         return await super().authenticate()
 
@@ -44,17 +48,17 @@ class LDAPProvider(CredentialsProvider):
             return None
 
         user_filter = ""
-        if config["application.ldap_user_filter"]:
+        if config["auth.ldap.user_filter"]:
             # fill in the template provided by the user to maintain backwards compatibility
-            user_filter = config["application.ldap_user_filter"].format(
-                id_attribute=config["application.ldap_id_attribute"],
-                mail_attribute=config["application.ldap_mail_attribute"],
+            user_filter = config["auth.ldap.user_filter"].format(
+                id_attribute=config["auth.ldap.id_attribute"],
+                mail_attribute=config["auth.ldap.mail_attribute"],
                 input=self.data.username,
             )
         # Don't assume the provided search filter has (|({id_attribute}={input})({mail_attribute}={input}))
         search_filter = "(&(|({id_attribute}={input})({mail_attribute}={input})){filter})".format(
-            id_attribute=config["application.ldap_id_attribute"],
-            mail_attribute=config["application.ldap_mail_attribute"],
+            id_attribute=config["auth.ldap.id_attribute"],
+            mail_attribute=config["auth.ldap.mail_attribute"],
             input=self.data.username,
             filter=user_filter,
         )
@@ -63,16 +67,15 @@ class LDAPProvider(CredentialsProvider):
         try:
             self._logger.debug(f"[LDAP] Starting search with filter: {search_filter}")
             user_entry = conn.search_s(
-                config["application.ldap_base_dn"],
+                config["auth.ldap.base_dn"],
                 ldap.SCOPE_SUBTREE,
                 search_filter,
-                [config["application.ldap_id_attribute"], config["application.ldap_name_attribute"], config["application.ldap_mail_attribute"]],
+                [config["auth.ldap.id_attribute"], config["auth.ldap.name_attribute"], config["auth.ldap.mail_attribute"]],
             )
         except ldap.FILTER_ERROR:
             self._logger.error("[LDAP] Bad user search filter")
 
         if not user_entry:
-            conn.unbind_s()
             self._logger.error("[LDAP] No user was found with the provided user filter")
             return None
 
@@ -82,11 +85,32 @@ class LDAPProvider(CredentialsProvider):
         if len(user_entry) > 1:
             self._logger.warning("[LDAP] Multiple users found with the provided user filter")
             self._logger.debug(f"[LDAP] The following entries were returned: {user_entry}")
-            conn.unbind_s()
             return None
 
         return user_entry
 
+    def find_user(self) -> list[tuple[str, dict[str, list[bytes]]]] | None:
+        """Returns the entry of the user, from the cache of the recent lookups or with a search"""
+        user_entry = _user_entries.get(self.data.username)
+        if user_entry is None:
+            service_pool, _ = get_ldap_pools()
+            user_entry = service_pool.run(self.search_user)
+            if user_entry:
+                _user_entries.set(self.data.username, user_entry)
+        return user_entry
+
+    @staticmethod
+    def is_admin(user_dn: str) -> bool:
+        """Checks if the entry of the user matches LDAP_ADMIN_FILTER, the result is cached for a short time"""
+        should_be_admin = _admin_results.get(user_dn)
+        if should_be_admin is None:
+            service_pool, _ = get_ldap_pools()
+            should_be_admin = service_pool.run(
+                lambda conn: len(conn.search_s(user_dn, ldap.SCOPE_BASE, config["auth.ldap.admin_filter"], [])) > 0
+            )
+            _admin_results.set(user_dn, should_be_admin)
+        return should_be_admin
+
     def get_user(self) -> UserModel | None:
         """Given a username and password, tries to authenticate by BINDing to an
         LDAP server
@@ -101,39 +125,30 @@ class LDAPProvider(CredentialsProvider):
             return None
         data = self.data
 
-        if config["application.ldap_tls_insecure"]:
-            ldap.set_option(ldap.OPT_X_TLS_REQUIRE_CERT, ldap.OPT_X_TLS_NEVER)
-
-        conn = ldap.initialize(config["application.ldap_server_url"])
-        conn.set_option(ldap.OPT_PROTOCOL_VERSION, 3)
-        conn.set_option(ldap.OPT_REFERRALS, 0)
-
-        if config["application.ldap_tls_cacertfile"]:
-            conn.set_option(ldap.OPT_X_TLS_CACERTFILE, config["application.ldap_tls_cacertfile"])
-            conn.set_option(ldap.OPT_X_TLS_NEWCTX, 0)
-
-        if config["application.ldap_enable_starttls"]:
-            conn.start_tls_s()
-
         try:
-            conn.simple_bind_s(config["application.ldap_query_bind"], config["application.ldap_query_password"])
+            user_entry = self.find_user()
         except (ldap.INVALID_CREDENTIALS, ldap.NO_SUCH_OBJECT):
             self._logger.error("[LDAP] Unable to bind to with provided user/password")
-            conn.unbind_s()
             return None
-
-        user_entry = self.search_user(conn)
+        except ldap.SERVER_DOWN:
+            self._logger.error("[LDAP] Unable to reach the server")
+            return None
         if not user_entry:
             return None
         user_dn, user_attr = user_entry[0]
 
         # Check the credentials of the user
+        _, user_pool = get_ldap_pools()
         try:
             self._logger.debug(f"[LDAP] Attempting to bind with '{user_dn}' using the provided password")
-            conn.simple_bind_s(user_dn, data.password)
+            user_pool.run(lambda conn: conn.simple_bind_s(user_dn, data.password))
         except (ldap.INVALID_CREDENTIALS, ldap.NO_SUCH_OBJECT):
             self._logger.error("[LDAP] Bind failed")
-            conn.unbind_s()
+            # the entry may be outdated, look it up again next time
+            _user_entries.pop(data.username)
+            return None
+        except ldap.SERVER_DOWN:
+            self._logger.error("[LDAP] Unable to reach the server")
             return None
 
         user = self.try_get_user(data.username)
@@ -142,9 +157,9 @@ class LDAPProvider(CredentialsProvider):
             self._logger.debug("[LDAP] User is not in myeasyserver. Creating a new account")
 
             attribute_keys = {
-                config["application.ldap_id_attribute"]: "username",
-                config["application.ldap_name_attribute"]: "name",
-                config["application.ldap_mail_attribute"]: "mail",
+                config["auth.ldap.id_attribute"]: "username",
+                config["auth.ldap.name_attribute"]: "name",
+                config["auth.ldap.mail_attribute"]: "mail",
             }
             attributes = {}
             for attribute_key, attribute_name in attribute_keys.items():
@@ -153,27 +168,33 @@ class LDAPProvider(CredentialsProvider):
                         f"[LDAP] Unable to create user due to missing '{attribute_name}' ('{attribute_key}') attribute"
                     )
                     self._logger.debug(f"[LDAP] User has the following attributes: {user_attr}")
-                    conn.unbind_s()
                     return None
                 attributes[attribute_key] = user_attr[attribute_key][0].decode("utf-8")
 
             user = db.users.create(
                 {
-                    "username": attributes[config["application.ldap_id_attribute"]],
+                    "username": attributes[config["auth.ldap.id_attribute"]],
                     "password": "LDAP",
-                    "full_name": attributes[config["application.ldap_name_attribute"]],
-                    "email": attributes[config["application.ldap_mail_attribute"]],
+                    "full_name": attributes[config["auth.ldap.name_attribute"]],
+                    "email": attributes[config["auth.ldap.mail_attribute"]],
                     "admin": False,
                     "auth_method": AuthMethod.LDAP,
                 },
             )
+            self.signed_up("ldap", user)
 
-        if config["application.ldap_admin_filter"]:
-            should_be_admin = len(conn.search_s(user_dn, ldap.SCOPE_BASE, config["application.ldap_admin_filter"], [])) > 0
+        if config["auth.ldap.admin_filter"]:
+            should_be_admin = self.is_admin(user_dn)
             if user.admin != should_be_admin:
                 self._logger.debug(f"[LDAP] {'Setting' if should_be_admin else 'Removing'} user as admin")
                 user.admin = should_be_admin
                 db.users.update(user.id, user)
 
-        conn.unbind_s()
         return user
+
+
+# short lived caches of the directory answers, the credentials themselves are always checked with a bind
+_user_entries: LRUCache[list[tuple[str, dict[str, list[bytes]]]]] = LRUCache(
+    config["auth.ldap.cache_max_entries"], ttl=config["auth.ldap.cache_ttl"]
+)
+_admin_results: LRUCache[bool] = LRUCache(config["auth.ldap.cache_max_entries"], ttl=config["auth.ldap.cache_ttl"])
@@ -0,0 +1,134 @@
+#  Copyright (c) 2024.  stef.
+#
+#      ______                 _____
+#     / ____/___ ________  __/ ___/___  ______   _____  _____
+#    / __/ / __ `/ ___/ / / /\__ \/ _ \/ ___/ | / / _ \/ ___/
+#   / /___/ /_/ (__  ) /_/ /___/ /  __/ /   | |/ /  __/ /
+#  /_____/\__,_/____/\__, //____/\___/_/    |___/\___/_/
+#                   /____/
+#
+#  Apache License
+#  ================
+#
+#   Licensed under the Apache License, Version 2.0 (the "License");
+#   you may not use this file except in compliance with the License.
+#   You may obtain a copy of the License at
+#
+#   http://www.apache.org/licenses/LICENSE-2.0
+#
+#   Unless required by applicable law or agreed to in writing, software
+#   distributed under the License is distributed on an "AS IS" BASIS,
+#   WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#   See the License for the specific language governing permissions and
+#   limitations under the License.
+#
+
+import threading
+import time
+
+from .shared_store import get_shared_store, shared_store_enabled
+from ..backend.config import config
+from ..helper.lru_cache import LRUCache
+from ..helper.shared_sqlite import SharedSqlite
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS rate_limits (
+    key TEXT PRIMARY KEY,
+    tokens REAL NOT NULL,
+    updated REAL NOT NULL
+);
+"""
+# number of buckets created between two purges of the full buckets in the shared store
+PURGE_EVERY = 100
+
+
+class TokenBucketLimiter:
+    """
+    Token bucket rate limiter.
+
+    Each key owns a bucket of `capacity` tokens refilled at `rate` tokens per second; an
+    attempt takes one token and is refused when the bucket is empty. Buckets are kept in
+    memory, or in the shared SQLite store so that all the workers share the same budget.
+    """
+
+    def __init__(self, name: str, capacity: float, rate: float, max_entries: int = 10000,
+                 shared: SharedSqlite | None = None) -> None:
+        self.name = name
+        self.capacity = capacity
+        self.rate = rate
+        # a bucket left alone for this long is full again, the same as no bucket at all
+        refill_time = capacity / rate if rate > 0 else None
+        self._buckets: LRUCache[tuple[float, float]] = LRUCache(max_entries, ttl=refill_time)
+        self._lock = threading.Lock()
+        self._shared = shared
+        self._new_keys = 0
+        if shared is not None:
+            shared.ensure_schema(SCHEMA)
+
+    def _refill(self, tokens: float, updated: float, now: float) -> float:
+        return min(self.capacity, tokens + (now - updated) * self.rate)
+
+    def _retry_after(self, tokens: float) -> float:
+        return (1 - tokens) / self.rate if self.rate > 0 else float("inf")
+
+    def acquire(self, key: str) -> float:
+        """Takes a token for the key. Returns 0 when allowed, else the number of seconds to wait"""
+        if self._shared is not None:
+            return self._acquire_shared(f"{self.name}:{key}")
+
+        now = time.monotonic()
+        with self._lock:
+            tokens, updated = self._buckets.get(key, (self.capacity, now))
+            tokens = self._refill(tokens, updated, now)
+            if tokens < 1:
+                self._buckets.set(key, (tokens, now))
+                return self._retry_after(tokens)
+            self._buckets.set(key, (tokens - 1, now))
+            return 0
+
+    def _acquire_shared(self, key: str) -> float:
+        now = time.time()
+        conn = self._shared.connection()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            row = conn.execute("SELECT tokens, updated FROM rate_limits WHERE key = ?", (key,)).fetchone()
+            tokens = self.capacity if row is None else self._refill(row[0], row[1], now)
+            allowed = tokens >= 1
+            conn.execute(
+                "INSERT INTO rate_limits (key, tokens, updated) VALUES (?, ?, ?) "
+                "ON CONFLICT(key) DO UPDATE SET tokens = excluded.tokens, updated = excluded.updated",
+                (key, tokens - 1 if allowed else tokens, now),
+            )
+            if row is None:
+                self._new_keys += 1
+            if row is None and self.rate > 0 and self._new_keys % PURGE_EVERY == 0:
+                # the keys are attacker controlled: drop the buckets which are full again
+                conn.execute(
+                    "DELETE FROM rate_limits WHERE key LIKE ? AND updated < ?",
+                    (f"{self.name}:%", now - self.capacity / self.rate),
+                )
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+        return 0 if allowed else self._retry_after(tokens)
+
+    def reset(self, key: str) -> None:
+        if self._shared is not None:
+            self._shared.execute("DELETE FROM rate_limits WHERE key = ?", (f"{self.name}:{key}",))
+        else:
+            self._buckets.pop(key)
+
+
+def _login_limiter(kind: str) -> TokenBucketLimiter:
+    return TokenBucketLimiter(
+        f"login_{kind}",
+        config[f'rate_limit.login.{kind}_capacity'],
+        config[f'rate_limit.login.{kind}_rate'],
+        config['rate_limit.max_entries'],
+        get_shared_store() if shared_store_enabled() else None,
+    )
+
+
+login_ip_limiter = _login_limiter("ip")
+login_user_limiter = _login_limiter("user")
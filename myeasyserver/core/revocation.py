@@ -0,0 +1,142 @@
+#  Copyright (c) 2024.  stef.
+#
+#      ______                 _____
+#     / ____/___ ________  __/ ___/___  ______   _____  _____
+#    / __/ / __ `/ ___/ / / /\__ \/ _ \/ ___/ | / / _ \/ ___/
+#   / /___/ /_/ (__  ) /_/ /___/ /  __/ /   | |/ /  __/ /
+#  /_____/\__,_/____/\__, //____/\___/_/    |___/\___/_/
+#                   /____/
+#
+#  Apache License
+#  ================
+#
+#   Licensed under the Apache License, Version 2.0 (the "License");
+#   you may not use this file except in compliance with the License.
+#   You may obtain a copy of the License at
+#
+#   http://www.apache.org/licenses/LICENSE-2.0
+#
+#   Unless required by applicable law or agreed to in writing, software
+#   distributed under the License is distributed on an "AS IS" BASIS,
+#   WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#   See the License for the specific language governing permissions and
+#   limitations under the License.
+#
+
+import threading
+import time
+from datetime import datetime, timezone
+
+from sqlalchemy import delete, select
+from sqlalchemy.orm.session import Session
+
+from .root_logger import get_logger
+from ..backend.config import config
+from ..database.db_session import session_context
+from ..database.models.users import RevokedTokenModel
+from ..database.repositories.all_repositories import get_repositories
+from ..database.table_versions import table_versions
+from ..schema.user import RevokedToken
+from ..services.scheduler.worker import threaded_loop
+
+logger = get_logger("revocation")
+
+# expired revocations are deleted from the database every this many revocations
+PURGE_EVERY = 100
+# in seconds, with shared versions the revocations of the other workers are checked for this often
+SHARED_REFRESH_INTERVAL = 1
+
+
+def _utc(timestamp: float) -> datetime:
+    return datetime.fromtimestamp(timestamp, timezone.utc).replace(tzinfo=None)
+
+
+class RevocationStore:
+    """
+    Revoked tokens, identified by their `jti` claim.
+
+    Revocations are stored in the `revoked_tokens` table and mirrored in memory, so checking a
+    token is a dictionary lookup. The revocations of this worker are added to the mirror at once.
+    The mirror is reloaded in the background by `refresh`: when the version of the table changes,
+    checked every `SHARED_REFRESH_INTERVAL` seconds when the versions are shared, and every
+    `cache.versions_ttl` seconds otherwise, the delay for a revocation made in another worker to
+    apply. Revocations are dropped once the token they target has expired.
+    """
+
+    table = RevokedTokenModel.__tablename__
+
+    def __init__(self) -> None:
+        self._revoked: dict[str, float | None] = {}
+        self._version: tuple[int, ...] | None = None
+        self._loaded_at = 0.0
+        self._lock = threading.Lock()
+        self._revocations = 0
+
+    def refresh(self) -> None:
+        """Reloads the mirror when the table was written, or when it is older than `cache.versions_ttl`"""
+        version = table_versions.get(self.table)
+        if version == self._version and table_versions.is_fresh(self._loaded_at):
+            return
+        with self._lock:
+            if version == self._version and table_versions.is_fresh(self._loaded_at):
+                return
+            loaded_at = time.monotonic()
+            now = _utc(time.time())
+            with session_context() as session:
+                rows = session.execute(
+                    select(RevokedTokenModel.jti, RevokedTokenModel.expires_at).where(
+                        (RevokedTokenModel.expires_at == None) | (RevokedTokenModel.expires_at > now)  # noqa E711
+                    )
+                ).all()
+            self._revoked = {
+                jti: None if expires_at is None else expires_at.replace(tzinfo=timezone.utc).timestamp()
+                for jti, expires_at in rows
+            }
+            self._version = version
+            self._loaded_at = loaded_at
+
+    def is_revoked(self, claims: dict) -> bool:
+        jti = claims.get("jti")
+        if not jti:
+            return False
+        if jti not in self._revoked:
+            return False
+        expires = self._revoked[jti]
+        return expires is None or expires > time.time()
+
+    def revoke(self, session: Session, claims: dict) -> bool:
+        """Revokes the token the claims belong to. Returns False if it has no `jti` and can't be revoked"""
+        jti = claims.get("jti")
+        if not jti or self.is_revoked(claims):
+            return bool(jti)
+
+        expires = claims.get("exp")
+        get_repositories(session).revoked_tokens.create(
+            RevokedToken(
+                jti=jti,
+                expires_at=None if expires is None else _utc(expires),
+                user_id=claims.get("sub") or claims.get("id"),
+            )
+        )
+        with self._lock:
+            self._revoked[jti] = expires
+            self._revocations += 1
+            purge = self._revocations % PURGE_EVERY == 0
+        if purge:
+            self.purge(session)
+        return True
+
+    def purge(self, session: Session) -> None:
+        session.execute(delete(RevokedTokenModel).where(RevokedTokenModel.expires_at < _utc(time.time())))
+        session.commit()
+        table_versions.bump(self.table)
+
+
+revocation_store = RevocationStore()
+threaded_loop(
+    revocation_store.refresh,
+    seconds=SHARED_REFRESH_INTERVAL if table_versions.shared else config['cache.versions_ttl'],
+    mode="delay",
+    wait_first=True,
+    logger=logger,
+)
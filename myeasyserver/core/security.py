@@ -23,6 +23,8 @@
 #   limitations under the License.
 #
 
+import hashlib
+import hmac
 import secrets
 from datetime import datetime, timedelta, timezone
 
@@ -35,7 +37,7 @@ from sqlalchemy.orm.session import Session
 from starlette_admin.auth import AuthProvider
 
 from . import root_logger
-from .hasher import get_hasher
+from .hashing_service import hashing_service
 from ..backend.config import config
 from ..schema.user.auth import CredentialsRequestForm, OIDCRequest, CredentialsRequest
 
@@ -72,6 +74,8 @@ def create_access_token(data: dict, expires_delta: timedelta | None = None) -> s
 
     to_encode["exp"] = expire
     to_encode["iss"] = ISS
+    # identifies the token to revoke it (see `RevocationStore`)
+    to_encode["jti"] = secrets.token_urlsafe(16)
     return (jwt.encode({'alg': ALGORITHM}, to_encode, config['application.secret']), expires_delta)
 
 def get_access_token(user_id, remember_me=False) -> tuple[str, timedelta]:
@@ -89,11 +93,30 @@ def get_access_long_token( user_id: UUID4, long_token: Boolean, remember_me=Fals
     return create_access_token({"id": str(user_id), "long_token": int(long_token), "remb":int(remember_me)}, duration)
 
 def get_access_key() -> str:
-    """Generates a cryptographic token without embedded data. Used for connection keys"""
-    return ''.join(secrets.choice('abcdefghijklmnopqrstuvwxyz0123456789') for _ in range(32))
+    """
+    Generates a connection key as `prefix.secret`. The prefix identifies the key in database,
+    only the digest of the secret is stored (see `api_key_digest`).
+    """
+    prefix = secrets.token_hex(6)
+    secret = ''.join(secrets.choice('abcdefghijklmnopqrstuvwxyz0123456789') for _ in range(32))
+    return f"{prefix}.{secret}"
+
+def split_access_key(key: str) -> tuple[str, str] | None:
+    """Returns the prefix and the secret of a connection key or None if it is not one"""
+    prefix, sep, secret = key.partition(".")
+    if not sep or not prefix or not secret or "." in secret:
+        return None
+    return prefix, secret
+
+def api_key_digest(secret: str) -> str:
+    """
+    Keyed digest of the secret part of a connection key. Keys are random so there is no need
+    for a slow password hash: it is computed on each request authenticated by a key.
+    """
+    return hmac.new(config['application.secret'].encode(), secret.encode(), hashlib.sha256).hexdigest()
 
 def hash_password(password: str) -> str:
-    return get_hasher().hash(password)
+    return hashing_service.hash_sync(password)
 
 def url_safe_token() -> str:
     """Generates a cryptographic token without embedded data. Used for password reset tokens and invitation tokens"""
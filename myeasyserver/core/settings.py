@@ -122,6 +122,9 @@ class AppSettings():
         if type != EnumSettings.System and type != EnumSettings.User:
             dotenv.load_dotenv(Path(self.path.LIB_DIR).parent.joinpath(".env"))
 
+        if isinstance(conf_file, list):
+            # -C is parsed with nargs=1
+            conf_file = conf_file[0]
         if conf_file is not None:
             self.etc_conf = config_file(default_config, conf_file)
             self.local_conf = None
@@ -131,8 +134,10 @@ class AppSettings():
         self.env_list = os.environ.copy()
 
         self.config_calc()
-        self.config.confDir = self.local_conf.confDir
-        self.config.confFile = self.local_conf.confFile
+        # the configuration is written to the file given on the command line, if any
+        written_conf = self.local_conf if self.local_conf is not None else self.etc_conf
+        self.config.confDir = written_conf.confDir
+        self.config.confFile = written_conf.confFile
 
     def __getitem__(self, key):
         return self.config.get(*key.split('.'))
@@ -0,0 +1,46 @@
+#  Copyright (c) 2024.  stef.
+#
+#      ______                 _____
+#     / ____/___ ________  __/ ___/___  ______   _____  _____
+#    / __/ / __ `/ ___/ / / /\__ \/ _ \/ ___/ | / / _ \/ ___/
+#   / /___/ /_/ (__  ) /_/ /___/ /  __/ /   | |/ /  __/ /
+#  /_____/\__,_/____/\__, //____/\___/_/    |___/\___/_/
+#                   /____/
+#
+#  Apache License
+#  ================
+#
+#   Licensed under the Apache License, Version 2.0 (the "License");
+#   you may not use this file except in compliance with the License.
+#   You may obtain a copy of the License at
+#
+#   http://www.apache.org/licenses/LICENSE-2.0
+#
+#   Unless required by applicable law or agreed to in writing, software
+#   distributed under the License is distributed on an "AS IS" BASIS,
+#   WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#   See the License for the specific language governing permissions and
+#   limitations under the License.
+#
+
+import os
+from functools import lru_cache
+
+from ..backend.config import config
+from ..helper.shared_sqlite import SharedSqlite
+from ..version import __software__
+
+
+def shared_store_enabled() -> bool:
+    backend = config['cache.backend']
+    return backend == 'sqlite' or (backend == 'auto' and config['application.workers'] > 1)
+
+
+@lru_cache(maxsize=1)
+def get_shared_store() -> SharedSqlite:
+    """
+    Returns the SQLite store shared by all the workers of the server. The file is
+    located in the temporary directory unless `cache.shared_path` is configured.
+    """
+    path = config['cache.shared_path'] or os.path.join(config.path.TEMP_DIR, __software__ + "_shared.db")
+    return SharedSqlite(path)
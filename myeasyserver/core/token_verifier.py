@@ -0,0 +1,86 @@
+#  Copyright (c) 2024.  stef.
+#
+#      ______                 _____
+#     / ____/___ ________  __/ ___/___  ______   _____  _____
+#    / __/ / __ `/ ___/ / / /\__ \/ _ \/ ___/ | / / _ \/ ___/
+#   / /___/ /_/ (__  ) /_/ /___/ /  __/ /   | |/ /  __/ /
+#  /_____/\__,_/____/\__, //____/\___/_/    |___/\___/_/
+#                   /____/
+#
+#  Apache License
+#  ================
+#
+#   Licensed under the Apache License, Version 2.0 (the "License");
+#   you may not use this file except in compliance with the License.
+#   You may obtain a copy of the License at
+#
+#   http://www.apache.org/licenses/LICENSE-2.0
+#
+#   Unless required by applicable law or agreed to in writing, software
+#   distributed under the License is distributed on an "AS IS" BASIS,
+#   WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#   See the License for the specific language governing permissions and
+#   limitations under the License.
+#
+
+import hashlib
+import time
+
+from authlib.jose import JsonWebToken, JWTClaims, OctKey
+from authlib.jose.errors import ExpiredTokenError, InvalidTokenError
+
+from .revocation import revocation_store
+from ..backend.config import config
+from ..helper.lru_cache import LRUCache
+
+ALGORITHM = "HS256"
+
+
+class TokenVerifier:
+    """
+    Verifies the tokens signed by the application.
+
+    The signing key is imported once and the claims of the verified tokens are kept in a
+    bounded LRU keyed by the digest of the token until they expire, so a token presented
+    again is neither decoded nor checked a second time. Only the revocation of the token is
+    checked on each call.
+    """
+
+    def __init__(self, secret: str, max_entries: int, max_age: float) -> None:
+        self.key = OctKey.import_key(secret)
+        self.max_age = max_age
+        self._jwt = JsonWebToken([ALGORITHM])
+        self._claims: LRUCache[JWTClaims] = LRUCache(max_entries)
+
+    def verify(self, token: str) -> JWTClaims:
+        """
+        Returns the claims of the token.
+        Raises a `JoseError` when it is malformed, badly signed, expired or revoked.
+        """
+        digest = hashlib.sha256(token.encode()).digest()
+        claims = self._claims.get(digest)
+        if claims is not None:
+            if revocation_store.is_revoked(claims):
+                raise InvalidTokenError()
+            return claims
+
+        claims = self._jwt.decode(token, self.key)
+        claims.validate()
+
+        ttl = self.max_age
+        if "exp" in claims:
+            ttl = min(ttl, claims["exp"] - time.time())
+            if ttl <= 0:
+                raise ExpiredTokenError()
+        if revocation_store.is_revoked(claims):
+            raise InvalidTokenError()
+        self._claims.set(digest, claims, ttl=ttl)
+        return claims
+
+    def forget(self, token: str) -> None:
+        self._claims.pop(hashlib.sha256(token.encode()).digest())
+
+
+token_verifier = TokenVerifier(
+    config['application.secret'], config['cache.token.max_entries'], config['cache.token.max_age']
+)
@@ -0,0 +1,105 @@
+#  Copyright (c) 2024.  stef.
+#
+#      ______                 _____
+#     / ____/___ ________  __/ ___/___  ______   _____  _____
+#    / __/ / __ `/ ___/ / / /\__ \/ _ \/ ___/ | / / _ \/ ___/
+#   / /___/ /_/ (__  ) /_/ /___/ /  __/ /   | |/ /  __/ /
+#  /_____/\__,_/____/\__, //____/\___/_/    |___/\___/_/
+#                   /____/
+#
+#  Apache License
+#  ================
+#
+#   Licensed under the Apache License, Version 2.0 (the "License");
+#   you may not use this file except in compliance with the License.
+#   You may obtain a copy of the License at
+#
+#   http://www.apache.org/licenses/LICENSE-2.0
+#
+#   Unless required by applicable law or agreed to in writing, software
+#   distributed under the License is distributed on an "AS IS" BASIS,
+#   WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#   See the License for the specific language governing permissions and
+#   limitations under the License.
+#
+
+import time
+from dataclasses import dataclass
+from typing import Callable
+
+from ..backend.config import config
+from ..database.table_versions import table_versions
+from ..helper.lru_cache import LRUCache
+from ..schema.user.user import UserModel
+
+
+@dataclass
+class _CachedUser:
+    user: UserModel
+    cache_key: str | None
+    checked_at: float
+    versions: tuple[int, ...]
+
+
+class UserCache:
+    """
+    Cache of the authenticated users, keyed by user id.
+
+    An entry is served as is during `ttl` seconds. Once elapsed it is revalidated against the
+    `cache_key` of the user, which is rotated each time the user is updated, and dropped if it
+    changed. Entries are never kept more than `max_age` seconds.
+
+    The group and the keys loaded with the user do not rotate the cache key: entries are also
+    dropped as soon as one of their tables is written.
+    """
+
+    tables = ("groups", "user_keys")
+
+    def __init__(self, max_entries: int, ttl: float, max_age: float, enabled: bool = True) -> None:
+        self.enabled = enabled
+        self.ttl = ttl
+        self._entries: LRUCache[_CachedUser] = LRUCache(max_entries, ttl=max_age)
+
+    def get(self, user_id: str, current_cache_key: Callable[[], str | None]) -> UserModel | None:
+        """
+        Returns a copy of the cached user or None.
+        `current_cache_key` is only called when the entry has to be revalidated.
+        """
+        if not self.enabled:
+            return None
+        entry = self._entries.get(str(user_id))
+        if entry is None:
+            return None
+
+        if table_versions.get(*self.tables) != entry.versions:
+            self._entries.pop(str(user_id))
+            return None
+
+        if time.monotonic() - entry.checked_at > self.ttl:
+            if current_cache_key() != entry.cache_key:
+                self._entries.pop(str(user_id))
+                return None
+            entry.checked_at = time.monotonic()
+
+        return entry.user.model_copy(deep=True)
+
+    def set(self, user: UserModel) -> None:
+        if self.enabled:
+            versions = table_versions.get(*self.tables)
+            self._entries.set(
+                str(user.id), _CachedUser(user.model_copy(deep=True), user.cache_key, time.monotonic(), versions)
+            )
+
+    def invalidate(self, user_id) -> None:
+        self._entries.pop(str(user_id))
+
+    def clear(self) -> None:
+        self._entries.clear()
+
+
+user_cache = UserCache(
+    config['cache.user.max_entries'],
+    config['cache.user.ttl'],
+    config['cache.user.max_age'],
+    config['cache.user.enabled'],
+)
@@ -130,7 +130,7 @@ def main():
     with session_context() as session:
         db = get_repositories(session)
 
-        if len(db.users.get_all()[0]):
+        if len(db.users.get_all()):
             logger.debug("Database exists")
         else:
             logger.info("Database contains no users, initializing...")
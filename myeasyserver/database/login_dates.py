@@ -0,0 +1,88 @@
+#  Copyright (c) 2024.  stef.
+#
+#      ______                 _____
+#     / ____/___ ________  __/ ___/___  ______   _____  _____
+#    / __/ / __ `/ ___/ / / /\__ \/ _ \/ ___/ | / / _ \/ ___/
+#   / /___/ /_/ (__  ) /_/ /___/ /  __/ /   | |/ /  __/ /
+#  /_____/\__,_/____/\__, //____/\___/_/    |___/\___/_/
+#                   /____/
+#
+#  Apache License
+#  ================
+#
+#   Licensed under the Apache License, Version 2.0 (the "License");
+#   you may not use this file except in compliance with the License.
+#   You may obtain a copy of the License at
+#
+#   http://www.apache.org/licenses/LICENSE-2.0
+#
+#   Unless required by applicable law or agreed to in writing, software
+#   distributed under the License is distributed on an "AS IS" BASIS,
+#   WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#   See the License for the specific language governing permissions and
+#   limitations under the License.
+#
+
+import asyncio
+import threading
+from datetime import datetime
+
+from .db_session import session_context
+from .repositories.all_repositories import get_repositories
+from ..backend.config import config
+from ..core.root_logger import get_logger
+from ..services.scheduler.worker import threaded_loop
+
+logger = get_logger("login_dates")
+
+
+class LoginDateBuffer:
+    """
+    Write-behind buffer of the login dates of the users.
+
+    A successful login only records its date in memory; the dates are written in one batch
+    every `interval` seconds, when `max_pending` users are waiting, and when the server stops.
+    Called from the event loop, a login leaves the write to a thread.
+    """
+
+    def __init__(self, max_pending: int, interval: float) -> None:
+        self.max_pending = max_pending
+        self.interval = interval
+        self._pending: dict[str, datetime] = {}
+        self._flush_scheduled = False
+        self._lock = threading.Lock()
+
+    def record(self, user_id, date: datetime | None = None) -> None:
+        with self._lock:
+            self._pending[str(user_id)] = date or datetime.now()
+            due = len(self._pending) >= self.max_pending and not self._flush_scheduled
+            if due:
+                self._flush_scheduled = True
+        if not due:
+            return
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            self.flush()
+        else:
+            loop.run_in_executor(None, self.flush)
+
+    def flush(self) -> None:
+        with self._lock:
+            pending, self._pending = self._pending, {}
+            self._flush_scheduled = False
+        if not pending:
+            return
+
+        try:
+            with session_context() as session:
+                get_repositories(session).users.update_login_dates(pending)
+        except Exception as e:
+            logger.error(f"Failed to store {len(pending)} login dates: {e}")
+            with self._lock:
+                # keep them for the next flush unless the user logged in again meanwhile
+                self._pending = {**pending, **self._pending}
+
+
+login_dates = LoginDateBuffer(config['application.login_date_batch'], config['application.login_date_interval'])
+threaded_loop(login_dates.flush, seconds=config['application.login_date_interval'], mode="delay", logger=logger)
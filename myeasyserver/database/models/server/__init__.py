@@ -28,3 +28,4 @@ from .events import *
 from .exports import *
 from .report import *
 from .webhooks import *
+from .scheduled_jobs import *
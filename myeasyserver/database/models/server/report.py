@@ -27,7 +27,7 @@ from datetime import datetime
 from typing import TYPE_CHECKING
 
 from pydantic import ConfigDict
-from sqlalchemy import ForeignKey, orm
+from sqlalchemy import ForeignKey, Index, orm
 from sqlalchemy.orm import Mapped, mapped_column
 from sqlalchemy.sql.sqltypes import Boolean, DateTime, String
 
@@ -41,6 +41,7 @@ if TYPE_CHECKING:
 
 class ReportEntryModel(SqlAlchemyBase, BaseMixins):
     __tablename__ = "report_entries"
+    __table_args__ = (Index("ix_report_entries_page", "report_id", "timestamp", "id"),)
     id: Mapped[GUID] = mapped_column(GUID, primary_key=True, default=GUID.generate)
 
     success: Mapped[bool | None] = mapped_column(Boolean, default=False)
@@ -48,7 +49,7 @@ class ReportEntryModel(SqlAlchemyBase, BaseMixins):
     exception: Mapped[str] = mapped_column(String, nullable=True)
     timestamp: Mapped[datetime] = mapped_column(DateTime, nullable=False, default=datetime.utcnow)
 
-    report_id: Mapped[GUID] = mapped_column(GUID, ForeignKey("reports.id"), nullable=False, index=True)
+    report_id: Mapped[GUID] = mapped_column(GUID, ForeignKey("reports.id"), nullable=False)
     report: Mapped["ReportModel"] = orm.relationship("ReportModel", back_populates="entries")
 
     @auto_init()
@@ -0,0 +1,70 @@
+#  Copyright (c) 2024.  stef.
+#
+#      ______                 _____
+#     / ____/___ ________  __/ ___/___  ______   _____  _____
+#    / __/ / __ `/ ___/ / / /\__ \/ _ \/ ___/ | / / _ \/ ___/
+#   / /___/ /_/ (__  ) /_/ /___/ /  __/ /   | |/ /  __/ /
+#  /_____/\__,_/____/\__, //____/\___/_/    |___/\___/_/
+#                   /____/
+#
+#  Apache License
+#  ================
+#
+#   Licensed under the Apache License, Version 2.0 (the "License");
+#   you may not use this file except in compliance with the License.
+#   You may obtain a copy of the License at
+#
+#   http://www.apache.org/licenses/LICENSE-2.0
+#
+#   Unless required by applicable law or agreed to in writing, software
+#   distributed under the License is distributed on an "AS IS" BASIS,
+#   WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#   See the License for the specific language governing permissions and
+#   limitations under the License.
+#
+
+from datetime import datetime
+
+from sqlalchemy import DateTime, Float, Integer, String
+from sqlalchemy.orm import Mapped, mapped_column
+
+from ..auto_init import auto_init
+from ..model_base import SqlAlchemyBase, BaseMixins
+
+
+class ScheduledJobModel(SqlAlchemyBase, BaseMixins):
+    __tablename__ = "scheduled_jobs"
+    job_id: Mapped[str] = mapped_column(String, unique=True, nullable=False, index=True)
+    func: Mapped[str] = mapped_column(String, nullable=False)  # dotted path of a module level function
+    arguments: Mapped[str] = mapped_column(String, nullable=False, default="{}")  # json, args and kwargs
+
+    unit: Mapped[str] = mapped_column(String, nullable=False)
+    interval: Mapped[int] = mapped_column(Integer, nullable=False)
+    latest: Mapped[int | None] = mapped_column(Integer, nullable=True)
+    at_time: Mapped[str | None] = mapped_column(String, nullable=True)
+    at_time_zone: Mapped[str | None] = mapped_column(String, nullable=True)
+    start_day: Mapped[str | None] = mapped_column(String, nullable=True)
+    cancel_after: Mapped[datetime | None] = mapped_column(DateTime, nullable=True)
+    tags: Mapped[str] = mapped_column(String, nullable=False, default="[]")  # json
+    misfire_policy: Mapped[str] = mapped_column(String, nullable=False)
+    executor: Mapped[str | None] = mapped_column(String, nullable=True)
+    max_instances: Mapped[int] = mapped_column(Integer, nullable=False, default=1)
+    timeout: Mapped[float | None] = mapped_column(Float, nullable=True)
+
+    next_run: Mapped[datetime | None] = mapped_column(DateTime, nullable=True, index=True)
+    last_run: Mapped[datetime | None] = mapped_column(DateTime, nullable=True)
+
+    @auto_init()
+    def __init__(self, **_) -> None:
+        pass
+
+
+class SchedulerLeaseModel(SqlAlchemyBase, BaseMixins):
+    __tablename__ = "scheduler_leases"
+    name: Mapped[str] = mapped_column(String, unique=True, nullable=False, index=True)
+    holder: Mapped[str] = mapped_column(String, nullable=False)
+    expires_at: Mapped[datetime] = mapped_column(DateTime, nullable=False)
+
+    @auto_init()
+    def __init__(self, **_) -> None:
+        pass
@@ -26,7 +26,7 @@
 from datetime import datetime
 from typing import TYPE_CHECKING
 
-from sqlalchemy import DateTime, ForeignKey, String, orm
+from sqlalchemy import DateTime, ForeignKey, Index, Integer, LargeBinary, String, UniqueConstraint, orm
 from sqlalchemy.orm import Mapped, mapped_column
 
 from myeasyserver.helper.guid import GUID
@@ -39,14 +39,40 @@ if TYPE_CHECKING:
 
 class ServerTaskModel(SqlAlchemyBase, BaseMixins):
     __tablename__ = "server_tasks"
+    # the queued tasks are claimed in priority order
+    __table_args__ = (Index("ix_server_tasks_queue", "status", "priority", "run_after"),)
     name: Mapped[str] = mapped_column(String, nullable=False)
     completed_date: Mapped[datetime] = mapped_column(DateTime, nullable=True)
     status: Mapped[str] = mapped_column(String, nullable=False)
     log: Mapped[str] = mapped_column(String, nullable=True)
 
+    # id of the registered function run by the task queue and its pickled arguments
+    func: Mapped[str | None] = mapped_column(String, nullable=True)
+    payload: Mapped[bytes | None] = mapped_column(LargeBinary, nullable=True)
+    priority: Mapped[int] = mapped_column(Integer, nullable=False, default=0)
+    run_after: Mapped[datetime | None] = mapped_column(DateTime, nullable=True)
+    attempts: Mapped[int] = mapped_column(Integer, nullable=False, default=0)
+    max_attempts: Mapped[int] = mapped_column(Integer, nullable=False, default=3)
+    # worker running the task, which must renew the lease until it is done
+    leased_by: Mapped[str | None] = mapped_column(String, nullable=True)
+    lease_until: Mapped[datetime | None] = mapped_column(DateTime, nullable=True)
+
     group_id: Mapped[GUID] = mapped_column(GUID, ForeignKey("groups.id"), nullable=False, index=True)
     group: Mapped["Group"] = orm.relationship("Group", back_populates="server_tasks")
 
     @auto_init()
     def __init__(self, **_) -> None:
         pass
+
+
+class ServerTaskLogLineModel(SqlAlchemyBase, BaseMixins):
+    """Progress line of a task, appended without rewriting the previous ones"""
+    __tablename__ = "server_task_log_lines"
+    __table_args__ = (UniqueConstraint("task_id", "seq", name="task_id_seq_key"),)
+    task_id: Mapped[int] = mapped_column(Integer, ForeignKey("server_tasks.id", ondelete="CASCADE"), nullable=False, index=True)
+    seq: Mapped[int] = mapped_column(Integer, nullable=False)  # position of the line in the log of the task
+    message: Mapped[str] = mapped_column(String, nullable=False)
+
+    @auto_init()
+    def __init__(self, **_) -> None:
+        pass
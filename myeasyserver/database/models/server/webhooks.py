@@ -49,7 +49,7 @@
 from datetime import datetime, time
 from typing import TYPE_CHECKING, Optional
 
-from sqlalchemy import Boolean, ForeignKey, String, Time, orm
+from sqlalchemy import Boolean, DateTime, Float, ForeignKey, Integer, String, Time, orm
 from sqlalchemy.orm import Mapped, mapped_column
 
 from myeasyserver.helper.guid import GUID
@@ -81,3 +81,19 @@ class WebhooksModel(SqlAlchemyBase, BaseMixins):
 
     @auto_init()
     def __init__(self, **_) -> None: ...
+
+
+class WebhookDeliveryModel(SqlAlchemyBase, BaseMixins):
+    """Attempt to deliver a webhook, recorded by batches"""
+    __tablename__ = "webhook_deliveries"
+    webhook_id: Mapped[GUID] = mapped_column(GUID, ForeignKey("webhook_urls.id", ondelete="CASCADE"), nullable=False, index=True)
+    fired_at: Mapped[datetime] = mapped_column(DateTime, nullable=False)  # planned time of the run the attempt belongs to
+    attempt: Mapped[int] = mapped_column(Integer, nullable=False)
+    success: Mapped[bool] = mapped_column(Boolean, nullable=False)
+    status_code: Mapped[int | None] = mapped_column(Integer)
+    error: Mapped[str | None] = mapped_column(String)
+    duration: Mapped[float] = mapped_column(Float, nullable=False)  # in seconds
+
+    @auto_init()
+    def __init__(self, **_) -> None:
+        pass
@@ -24,4 +24,5 @@
 #
 
 from .password_reset import *
+from .revoked_tokens import *
 from .users import *
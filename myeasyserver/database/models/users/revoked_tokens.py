@@ -0,0 +1,46 @@
+#  Copyright (c) 2024.  stef.
+#
+#      ______                 _____
+#     / ____/___ ________  __/ ___/___  ______   _____  _____
+#    / __/ / __ `/ ___/ / / /\__ \/ _ \/ ___/ | / / _ \/ ___/
+#   / /___/ /_/ (__  ) /_/ /___/ /  __/ /   | |/ /  __/ /
+#  /_____/\__,_/____/\__, //____/\___/_/    |___/\___/_/
+#                   /____/
+#
+#  Apache License
+#  ================
+#
+#   Licensed under the Apache License, Version 2.0 (the "License");
+#   you may not use this file except in compliance with the License.
+#   You may obtain a copy of the License at
+#
+#   http://www.apache.org/licenses/LICENSE-2.0
+#
+#   Unless required by applicable law or agreed to in writing, software
+#   distributed under the License is distributed on an "AS IS" BASIS,
+#   WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#   See the License for the specific language governing permissions and
+#   limitations under the License.
+#
+
+from datetime import datetime
+
+from sqlalchemy import DateTime, String
+from sqlalchemy.orm import Mapped, mapped_column
+
+from myeasyserver.helper.guid import GUID
+from ..model_base import SqlAlchemyBase, BaseMixins
+
+
+class RevokedTokenModel(SqlAlchemyBase, BaseMixins):
+    __tablename__ = "revoked_tokens"
+
+    jti: Mapped[str] = mapped_column(String(64), unique=True, nullable=False, index=True)
+    # the revocation is useless once the token expired, the row is deleted after that
+    expires_at: Mapped[datetime | None] = mapped_column(DateTime, index=True)
+    user_id: Mapped[GUID | None] = mapped_column(GUID, index=True)
+
+    def __init__(self, jti, expires_at=None, user_id=None, **_):
+        self.jti = jti
+        self.expires_at = expires_at
+        self.user_id = user_id
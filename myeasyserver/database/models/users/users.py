@@ -44,14 +44,16 @@ if TYPE_CHECKING:
 class UserKey(SqlAlchemyBase, BaseMixins):
     __tablename__ = "user_keys"
     name: Mapped[str] = mapped_column(String, nullable=False)
-    key: Mapped[str] = mapped_column(String, nullable=False, index=True)
+    prefix: Mapped[str | None] = mapped_column(String, unique=True, index=True)
+    key: Mapped[str] = mapped_column(String, nullable=False)
     id: Mapped[GUID] = mapped_column(GUID, primary_key=True, default=GUID.generate)
 
     user_id: Mapped[GUID | None] = mapped_column(GUID, ForeignKey("users.id"), index=True)
     user: Mapped[Optional["User"]] = orm.relationship("User")
 
-    def __init__(self, name, key, user_id, **_) -> None:
+    def __init__(self, name, prefix, key, user_id, **_) -> None:
         self.name = name
+        self.prefix = prefix
         self.key = key
         self.user_id = user_id
 
@@ -0,0 +1,100 @@
+#  Copyright (c) 2024.  stef.
+#
+#      ______                 _____
+#     / ____/___ ________  __/ ___/___  ______   _____  _____
+#    / __/ / __ `/ ___/ / / /\__ \/ _ \/ ___/ | / / _ \/ ___/
+#   / /___/ /_/ (__  ) /_/ /___/ /  __/ /   | |/ /  __/ /
+#  /_____/\__,_/____/\__, //____/\___/_/    |___/\___/_/
+#                   /____/
+#
+#  Apache License
+#  ================
+#
+#   Licensed under the Apache License, Version 2.0 (the "License");
+#   you may not use this file except in compliance with the License.
+#   You may obtain a copy of the License at
+#
+#   http://www.apache.org/licenses/LICENSE-2.0
+#
+#   Unless required by applicable law or agreed to in writing, software
+#   distributed under the License is distributed on an "AS IS" BASIS,
+#   WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#   See the License for the specific language governing permissions and
+#   limitations under the License.
+#
+
+import time
+from typing import Any
+
+from pydantic import BaseModel
+from sqlalchemy import Dialect, Select
+
+from ..backend.config import config
+from .table_versions import table_versions
+from ..core.root_logger import get_logger
+from ..helper.lru_cache import LRUCache
+
+logger = get_logger("query_cache")
+
+MISSING = object()
+
+
+def _copy(value: Any) -> Any:
+    # cached models are handed out as copies as callers are free to mutate what they get
+    if isinstance(value, BaseModel):
+        return value.model_copy(deep=True)
+    if isinstance(value, list):
+        return [_copy(item) for item in value]
+    return value
+
+
+class QueryCache:
+    """
+    Statement level cache of the results of the repository reads.
+
+    Entries are keyed by the compiled statement, its bound parameters and the schema the
+    rows are validated with. Each entry carries the versions of the tables it was read
+    from (see `TableVersions`) and is ignored as soon as one of them was written.
+
+    With the memory cache backend the versions only count the writes of this worker:
+    a read after a write made by another worker could be served from the cache for up to
+    `cache.versions_ttl` seconds, so the cache is not enabled when several workers serve
+    the application without the sqlite backend sharing the versions.
+    """
+
+    def __init__(self, max_entries: int, enabled: bool = True) -> None:
+        self.enabled = enabled
+        self._entries: LRUCache[tuple[tuple[int, ...], float, Any]] = LRUCache(max_entries)
+
+    @staticmethod
+    def key_for(statement: Select, dialect: Dialect, tag: str = "") -> str:
+        compiled = statement.compile(dialect=dialect)
+        params = sorted((name, repr(value)) for name, value in compiled.params.items())
+        return f"{tag}|{compiled}|{params}"
+
+    def get(self, key: str, versions: tuple[int, ...]) -> Any:
+        entry = self._entries.get(key)
+        if entry is None or entry[0] != versions or not table_versions.is_fresh(entry[1]):
+            return MISSING
+        return _copy(entry[2])
+
+    def set(self, key: str, versions: tuple[int, ...], value: Any, loaded_at: float | None = None) -> None:
+        self._entries.set(key, (versions, time.monotonic() if loaded_at is None else loaded_at, _copy(value)))
+
+    def clear(self) -> None:
+        self._entries.clear()
+
+    def stats(self) -> dict[str, int]:
+        return self._entries.stats()
+
+
+def _query_cache_enabled() -> bool:
+    if not config['cache.query.enabled']:
+        return False
+    if config['application.workers'] > 1 and not table_versions.shared:
+        logger.warning("query cache disabled: the table versions are not shared by the workers (cache.backend)")
+        return False
+    return True
+
+
+query_cache = QueryCache(config['cache.query.max_entries'], _query_cache_enabled())
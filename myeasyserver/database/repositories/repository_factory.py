@@ -28,21 +28,29 @@ from sqlalchemy.orm import Session
 
 from .repository_generic import RepositoryGeneric
 from .repository_group import RepositoryGroup
+from .repository_reports import RepositoryReportEntries, RepositoryReports
+from .repository_scheduled_jobs import RepositoryScheduledJobs, RepositorySchedulerLeases
+from .repository_server_tasks import RepositoryServerTaskLogLines, RepositoryServerTasks
 from .repository_users import RepositoryUsers
+from .repository_webhooks import RepositoryWebhookDeliveries, RepositoryWebhooks
 from ..models.group import Group, GroupInviteToken, GroupPreferencesModel
 from ..models.server import ServerTaskModel, DataExportsModel, ReportModel, ReportEntryModel, EventNotifierModel, \
-    WebhooksModel
-from ..models.users import UserKey, User, PasswordResetModel
+    WebhooksModel, ScheduledJobModel, SchedulerLeaseModel, ServerTaskLogLineModel, WebhookDeliveryModel
+from ..models.users import UserKey, User, PasswordResetModel, RevokedTokenModel
 from ...schema.group import ReadGroupPreferences, ReadInviteToken
-from ...schema.reports import ReportOut, ReportEntryOut
-from ...schema.server import ServerTask, DataExport, ReadWebhook
+from ...schema.reports import ReportEntryOut, ReportSummary
+from ...schema.server import ServerTask, ServerTaskLogLine, DataExport, ReadWebhook, ScheduledJob, SchedulerLease, \
+    WebhookDelivery
 from ...schema.server.events import EventNotifierOut
-from ...schema.user import UserKeyInDB, UserModel, PrivatePasswordResetToken
+from ...schema.user import UserKeyInDB, UserModel, PrivatePasswordResetToken, RevokedToken
 from ...schema.user.user import GroupInDB
 
 PK_ID = "id"
 PK_TOKEN = "token"
 PK_GROUP_ID = "group_id"
+PK_JTI = "jti"
+PK_JOB_ID = "job_id"
+PK_NAME = "name"
 
 class AllRepositories:
     def __init__(self, session: Session) -> None:
@@ -71,8 +79,24 @@ class AllRepositories:
         return RepositoryGeneric(self.session, PK_TOKEN, PasswordResetModel, PrivatePasswordResetToken)
 
     @cached_property
-    def server_tasks(self) -> RepositoryGeneric[ServerTask, ServerTaskModel]:
-        return RepositoryGeneric(self.session, PK_ID, ServerTaskModel, ServerTask)
+    def revoked_tokens(self) -> RepositoryGeneric[RevokedToken, RevokedTokenModel]:
+        return RepositoryGeneric(self.session, PK_JTI, RevokedTokenModel, RevokedToken)
+
+    @cached_property
+    def server_tasks(self) -> RepositoryServerTasks:
+        return RepositoryServerTasks(self.session, PK_ID, ServerTaskModel, ServerTask)
+
+    @cached_property
+    def server_task_log_lines(self) -> RepositoryServerTaskLogLines:
+        return RepositoryServerTaskLogLines(self.session, PK_ID, ServerTaskLogLineModel, ServerTaskLogLine)
+
+    @cached_property
+    def scheduled_jobs(self) -> RepositoryScheduledJobs:
+        return RepositoryScheduledJobs(self.session, PK_JOB_ID, ScheduledJobModel, ScheduledJob)
+
+    @cached_property
+    def scheduler_leases(self) -> RepositorySchedulerLeases:
+        return RepositorySchedulerLeases(self.session, PK_NAME, SchedulerLeaseModel, SchedulerLease)
 
     @cached_property
     def groups(self) -> RepositoryGroup:
@@ -91,16 +115,20 @@ class AllRepositories:
         return RepositoryGeneric(self.session, PK_ID, DataExportsModel, DataExport)
 
     @cached_property
-    def reports(self) -> RepositoryGeneric[ReportOut, ReportModel]:
-        return RepositoryGeneric(self.session, PK_ID, ReportModel, ReportOut)
+    def reports(self) -> RepositoryReports:
+        return RepositoryReports(self.session, PK_ID, ReportModel, ReportSummary)
+
+    @cached_property
+    def report_entries(self) -> RepositoryReportEntries:
+        return RepositoryReportEntries(self.session, PK_ID, ReportEntryModel, ReportEntryOut)
 
     @cached_property
-    def report_entries(self) -> RepositoryGeneric[ReportEntryOut, ReportEntryModel]:
-        return RepositoryGeneric(self.session, PK_ID, ReportEntryModel, ReportEntryOut)
+    def webhooks(self) -> RepositoryWebhooks:
+        return RepositoryWebhooks(self.session, PK_ID, WebhooksModel, ReadWebhook)
 
     @cached_property
-    def webhooks(self) -> RepositoryGeneric[ReadWebhook, WebhooksModel]:
-        return RepositoryGeneric(self.session, PK_ID, WebhooksModel, ReadWebhook)
+    def webhook_deliveries(self) -> RepositoryWebhookDeliveries:
+        return RepositoryWebhookDeliveries(self.session, PK_ID, WebhookDeliveryModel, WebhookDelivery)
 
     @cached_property
     def event_notifier(self) -> RepositoryGeneric[EventNotifierOut, EventNotifierModel]:
@@ -1,9 +1,10 @@
 from __future__ import annotations
 
 import random
+import time
 from collections.abc import Iterable
 from math import ceil
-from typing import Any, Generic, TypeVar
+from typing import Any, Callable, Generic, TypeVar
 
 from fastapi import HTTPException
 from pydantic import UUID4, BaseModel
@@ -13,6 +14,8 @@ from sqlalchemy.orm.session import Session
 from sqlalchemy.sql import sqltypes
 
 from ..models.model_base import SqlAlchemyBase
+from ..query_cache import MISSING, query_cache
+from ..table_versions import related_tables, statement_tables, table_versions
 from ...core.root_logger import get_logger
 from .response import PaginationQuery, OrderDirection, PaginationBase, QueryFilter, SearchFilter, \
     OrderByNullPosition
@@ -51,6 +54,30 @@ class RepositoryGeneric(Generic[Schema, Model]):
         self.group_id = group_id
         return self
 
+    def _bump_table_versions(self) -> None:
+        """Invalidates the cached reads depending on the tables written by this repository"""
+        table_versions.bump(*related_tables(self.model))
+
+    def _cached(self, q: Select, load: Callable[[], Any], tag: str = "") -> Any:
+        """
+        Returns the result of `load` for the statement `q`, served from the query cache when the
+        tables of the repository were not written since it was stored.
+        Only detached results (schemas, counts) must go through here, never session bound models.
+        """
+        if not query_cache.enabled or self.session.new or self.session.dirty or self.session.deleted:
+            # pending changes in the session are not visible to the other sessions
+            return load()
+
+        key = query_cache.key_for(q, self.session.get_bind().dialect, tag)
+        # versions are read before the query so that a concurrent write invalidates what we store
+        versions = table_versions.get(*statement_tables(q))
+        result = query_cache.get(key, versions)
+        if result is MISSING:
+            loaded_at = time.monotonic()
+            result = load()
+            query_cache.set(key, versions, result, loaded_at)
+        return result
+
     def _log_exception(self, e: Exception) -> None:
         self.logger.error(f"Error processing query for Repo model={self.model.__name__} schema={self.schema.__name__}")
         self.logger.error(e)
@@ -120,10 +147,13 @@ class RepositoryGeneric(Generic[Schema, Model]):
                 q = q.order_by(order_attr)
 
         q = q.offset(start).limit(limit)
-        result = self.session.execute(q).unique().scalars().all()
         if schema:
-            result = [eff_schema.model_validate(x) for x in result]
-        return result
+            return self._cached(
+                q,
+                lambda: [eff_schema.model_validate(x) for x in self.session.execute(q).unique().scalars().all()],
+                eff_schema.__qualname__,
+            )
+        return self.session.execute(q).unique().scalars().all()
 
     def _query_one(self, match_value: str | int | UUID4, match_key: str | None = None) -> Model | Schema:
         """
@@ -169,6 +199,7 @@ class RepositoryGeneric(Generic[Schema, Model]):
             self.session.rollback()
             raise
 
+        self._bump_table_versions()
         self.session.refresh(new_document)
 
         if schema:
@@ -184,6 +215,7 @@ class RepositoryGeneric(Generic[Schema, Model]):
 
         self.session.add_all(new_documents)
         self.session.commit()
+        self._bump_table_versions()
 
         for created_document in new_documents:
             self.session.refresh(created_document)
@@ -208,6 +240,7 @@ class RepositoryGeneric(Generic[Schema, Model]):
         entry.update(session=self.session, **new_data)
 
         self.session.commit()
+        self._bump_table_versions()
         if schema:
             return self.schema.model_validate(entry)
         return entry
@@ -229,6 +262,7 @@ class RepositoryGeneric(Generic[Schema, Model]):
             updated_documents.append(document_to_update)
 
         self.session.commit()
+        self._bump_table_versions()
 
         if schema:
             return [self.schema.model_validate(x) for x in updated_documents]
@@ -257,6 +291,8 @@ class RepositoryGeneric(Generic[Schema, Model]):
             self.session.rollback()
             raise e
 
+        self._bump_table_versions()
+
         if schema:
             return results_as_model
         return result
@@ -277,19 +313,22 @@ class RepositoryGeneric(Generic[Schema, Model]):
             self.session.rollback()
             raise e
 
+        self._bump_table_versions()
+
         if Schema:
             return results_as_model  # type: ignore
         return results
 
     def delete_all(self) -> None:
-        delete(self.model)
+        self.session.execute(delete(self.model))
         self.session.commit()
+        self._bump_table_versions()
 
     def count_all(self, match_key=None, match_value=None) -> int:
         q = select(func.count(self.model.id))
         if None not in [match_key, match_value]:
             q = q.filter_by(**{match_key: match_value})
-        return self.session.scalar(q)
+        return self._cached(q, lambda: self.session.scalar(q))
 
     def _count_attribute(
         self,
@@ -303,12 +342,16 @@ class RepositoryGeneric(Generic[Schema, Model]):
 
         if count:
             q = select(func.count(self.model.id)).filter(attribute_name == attr_match)
-            return self.session.scalar(q)
+            return self._cached(q, lambda: self.session.scalar(q))
         else:
             q = self._query(override_schema=eff_schema).filter(attribute_name == attr_match)
 
             if schema:
-                return [eff_schema.model_validate(x) for x in self.session.execute(q).scalars().all()]
+                return self._cached(
+                    q,
+                    lambda: [eff_schema.model_validate(x) for x in self.session.execute(q).scalars().all()],
+                    eff_schema.__qualname__,
+                )
             return self.session.execute(q).scalars().all()
 
     def page_all(self, pagination: PaginationQuery, override_schema: object = None, search: str | None = None, schema = True) -> PaginationBase[Model | Schema]:
@@ -340,13 +383,18 @@ class RepositoryGeneric(Generic[Schema, Model]):
         # Apply options late, so they do not get used for counting
         q = q.options(*eff_schema.loader_options())
         try:
-            data = self.session.execute(q).unique().scalars().all()
+            if schema:
+                data = self._cached(
+                    q,
+                    lambda: [eff_schema.model_validate(s) for s in self.session.execute(q).unique().scalars().all()],
+                    eff_schema.__qualname__,
+                )
+            else:
+                data = self.session.execute(q).unique().scalars().all()
         except Exception as e:
             self._log_exception(e)
             self.session.rollback()
             raise e
-        if schema:
-            data = [eff_schema.model_validate(s) for s in data],
         return PaginationBase(
             page=pagination_result.page,
             per_page=pagination_result.per_page,
@@ -375,7 +423,7 @@ class RepositoryGeneric(Generic[Schema, Model]):
                 raise HTTPException(status_code=400, detail=str(e)) from e
 
         count_query = select(func.count()).select_from(query)
-        count = self.session.scalar(count_query)
+        count = self._cached(count_query, lambda: self.session.scalar(count_query))
         if not count:
             count = 0
 
@@ -0,0 +1,110 @@
+#  Copyright (c) 2024.  stef.
+#
+#      ______                 _____
+#     / ____/___ ________  __/ ___/___  ______   _____  _____
+#    / __/ / __ `/ ___/ / / /\__ \/ _ \/ ___/ | / / _ \/ ___/
+#   / /___/ /_/ (__  ) /_/ /___/ /  __/ /   | |/ /  __/ /
+#  /_____/\__,_/____/\__, //____/\___/_/    |___/\___/_/
+#                   /____/
+#
+#  Apache License
+#  ================
+#
+#   Licensed under the Apache License, Version 2.0 (the "License");
+#   you may not use this file except in compliance with the License.
+#   You may obtain a copy of the License at
+#
+#   http://www.apache.org/licenses/LICENSE-2.0
+#
+#   Unless required by applicable law or agreed to in writing, software
+#   distributed under the License is distributed on an "AS IS" BASIS,
+#   WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#   See the License for the specific language governing permissions and
+#   limitations under the License.
+#
+
+import base64
+import uuid
+from collections.abc import Sequence
+from datetime import datetime
+
+from pydantic import UUID4
+from sqlalchemy import and_, case, func, or_, select
+
+from .repository_generic import RepositoryGeneric
+from .response import PaginationBase, PaginationQuery
+from ..models.server import ReportEntryModel, ReportModel
+from ...schema.reports import ReportEntryOut, ReportEntryPage, ReportSummary
+
+
+class RepositoryReports(RepositoryGeneric[ReportSummary, ReportModel]):
+    def _summarize(self, reports: Sequence[ReportModel]) -> list[ReportSummary]:
+        """
+        Returns the summaries of the reports, the counts of their entries are computed by the database
+        with a single grouped query, the entries themselves are never loaded.
+        """
+        if not reports:
+            return []
+        successes = func.sum(case((ReportEntryModel.success.is_(True), 1), else_=0))
+        stmt = (
+            select(ReportEntryModel.report_id, func.count(), successes, func.max(ReportEntryModel.timestamp))
+            .filter(ReportEntryModel.report_id.in_([report.id for report in reports]))
+            .group_by(ReportEntryModel.report_id)
+        )
+        stats = {row[0]: row[1:] for row in self.session.execute(stmt)}
+
+        summaries = []
+        for report in reports:
+            summary = self.schema.model_validate(report)
+            if report.id in stats:
+                total, success, last_entry = stats[report.id]
+                summary.total_count = total
+                summary.success_count = success or 0
+                summary.failure_count = total - summary.success_count
+                summary.last_entry = last_entry
+            summaries.append(summary)
+        return summaries
+
+    def get_summary(self, id: UUID4) -> ReportSummary | None:
+        report = self.session.scalars(select(ReportModel).filter_by(**self._filter_builder(id=id))).one_or_none()
+        return None if report is None else self._summarize([report])[0]
+
+    def page_summaries(self, pagination: PaginationQuery) -> PaginationBase[ReportSummary, ReportSummary]:
+        page = self.page_all(pagination, schema=False)
+        page.items = self._summarize(page.items)
+        return page
+
+
+def encode_cursor(entry: ReportEntryOut) -> str:
+    return base64.urlsafe_b64encode(f"{entry.timestamp.isoformat()}|{entry.id}".encode()).decode()
+
+
+def decode_cursor(cursor: str) -> tuple[datetime, uuid.UUID]:
+    """Raises ValueError when the cursor was not produced by `encode_cursor`"""
+    timestamp, id = base64.urlsafe_b64decode(cursor.encode()).decode().split("|")
+    return datetime.fromisoformat(timestamp), uuid.UUID(id)
+
+class RepositoryReportEntries(RepositoryGeneric[ReportEntryOut, ReportEntryModel]):
+    def page_after(self, report_id: UUID4, cursor: str | None = None, limit: int = 100) -> ReportEntryPage:
+        """
+        Returns the entries of a report following `cursor`, in the order of their timestamp.
+
+        The page starts where the previous one ended using the index on (report_id, timestamp, id),
+        so the cost of a page does not depend on its position or on the size of the report.
+        """
+        stmt = select(ReportEntryModel).filter(ReportEntryModel.report_id == report_id)
+        if cursor:
+            timestamp, id = decode_cursor(cursor)
+            stmt = stmt.filter(
+                or_(
+                    ReportEntryModel.timestamp > timestamp,
+                    and_(ReportEntryModel.timestamp == timestamp, ReportEntryModel.id > id),
+                )
+            )
+        stmt = stmt.order_by(ReportEntryModel.timestamp, ReportEntryModel.id).limit(limit + 1)
+
+        items = [self.schema.model_validate(x) for x in self.session.scalars(stmt)]
+        if len(items) <= limit:
+            return ReportEntryPage(items=items)
+        items = items[:limit]
+        return ReportEntryPage(items=items, next=encode_cursor(items[-1]))
@@ -0,0 +1,129 @@
+#  Copyright (c) 2024.  stef.
+#
+#      ______                 _____
+#     / ____/___ ________  __/ ___/___  ______   _____  _____
+#    / __/ / __ `/ ___/ / / /\__ \/ _ \/ ___/ | / / _ \/ ___/
+#   / /___/ /_/ (__  ) /_/ /___/ /  __/ /   | |/ /  __/ /
+#  /_____/\__,_/____/\__, //____/\___/_/    |___/\___/_/
+#                   /____/
+#
+#  Apache License
+#  ================
+#
+#   Licensed under the Apache License, Version 2.0 (the "License");
+#   you may not use this file except in compliance with the License.
+#   You may obtain a copy of the License at
+#
+#   http://www.apache.org/licenses/LICENSE-2.0
+#
+#   Unless required by applicable law or agreed to in writing, software
+#   distributed under the License is distributed on an "AS IS" BASIS,
+#   WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#   See the License for the specific language governing permissions and
+#   limitations under the License.
+#
+
+from datetime import datetime
+
+from sqlalchemy import delete, or_, select, update
+from sqlalchemy.exc import IntegrityError
+
+from .repository_generic import RepositoryGeneric
+from ..models.server import ScheduledJobModel, SchedulerLeaseModel
+from ..table_versions import table_versions
+from ...schema.server import ScheduledJob, SchedulerLease
+
+# columns describing when a job runs, a change of one of them resets its next run
+SCHEDULE_COLUMNS = ("func", "arguments", "unit", "interval", "latest", "at_time", "at_time_zone", "start_day")
+
+
+class RepositoryScheduledJobs(RepositoryGeneric[ScheduledJob, ScheduledJobModel]):
+    def _bump(self) -> None:
+        table_versions.bump(ScheduledJobModel.__tablename__)
+
+    def save_definition(self, data: dict) -> ScheduledJob:
+        """
+        Stores the definition of a job. When the job is already stored with the same schedule,
+        its next and last runs are kept so that the schedule carries on across restarts.
+        """
+        entry = self.session.scalars(select(ScheduledJobModel).filter_by(job_id=data["job_id"])).one_or_none()
+        if entry is None:
+            entry = ScheduledJobModel(**data)
+            self.session.add(entry)
+        else:
+            if any(getattr(entry, column) != data[column] for column in SCHEDULE_COLUMNS):
+                entry.next_run = data["next_run"]
+            for column in ("cancel_after", "tags", "misfire_policy", "executor", "max_instances", "timeout", *SCHEDULE_COLUMNS):
+                setattr(entry, column, data[column])
+        self.session.commit()
+        self._bump()
+        return self.schema.model_validate(entry)
+
+    def get_due(self, until: datetime) -> list[ScheduledJob]:
+        """Returns the jobs planned before `until`, using the index on the next run"""
+        stmt = (
+            select(ScheduledJobModel)
+            .filter(ScheduledJobModel.next_run <= until)
+            .order_by(ScheduledJobModel.next_run)
+        )
+        return [self.schema.model_validate(x) for x in self.session.scalars(stmt)]
+
+    def get_next_run(self, job_id: str) -> tuple[bool, datetime | None]:
+        """Returns whether the job is stored and its next run"""
+        row = self.session.execute(
+            select(ScheduledJobModel.next_run).filter(ScheduledJobModel.job_id == job_id)
+        ).one_or_none()
+        return (False, None) if row is None else (True, row.next_run)
+
+    def move_next_run(self, job_id: str, planned: datetime, next_run: datetime, last_run: datetime | None = None) -> bool:
+        """
+        Moves the next run of a job from `planned` to `next_run` in a single statement. Used to claim a
+        run before the job runs: only one process can succeed, so a run is never done twice.
+        """
+        values = {"next_run": next_run} if last_run is None else {"next_run": next_run, "last_run": last_run}
+        stmt = (
+            update(ScheduledJobModel)
+            .where(ScheduledJobModel.job_id == job_id, ScheduledJobModel.next_run == planned)
+            .values(**values)
+            .execution_options(synchronize_session=False)
+        )
+        if self.session.execute(stmt).rowcount:
+            self.session.commit()
+            self._bump()
+            return True
+        self.session.rollback()
+        return False
+
+
+class RepositorySchedulerLeases(RepositoryGeneric[SchedulerLease, SchedulerLeaseModel]):
+    def acquire(self, name: str, holder: str, expires_at: datetime, now: datetime) -> bool:
+        """
+        Takes or renews the lease `name` for `holder` until `expires_at`. The lease is only taken
+        when it is free or expired, in a single statement so that two holders never both get it.
+        """
+        stmt = (
+            update(SchedulerLeaseModel)
+            .where(
+                SchedulerLeaseModel.name == name,
+                or_(SchedulerLeaseModel.holder == holder, SchedulerLeaseModel.expires_at < now),
+            )
+            .values(holder=holder, expires_at=expires_at)
+            .execution_options(synchronize_session=False)
+        )
+        if not self.session.execute(stmt).rowcount:
+            if self.session.scalar(select(SchedulerLeaseModel.id).filter_by(name=name)) is not None:
+                self.session.rollback()
+                return False
+            self.session.add(SchedulerLeaseModel(name=name, holder=holder, expires_at=expires_at))
+        try:
+            self.session.commit()
+        except IntegrityError:
+            # created by another holder meanwhile
+            self.session.rollback()
+            return False
+        return True
+
+    def release(self, name: str, holder: str) -> None:
+        stmt = delete(SchedulerLeaseModel).where(SchedulerLeaseModel.name == name, SchedulerLeaseModel.holder == holder)
+        self.session.execute(stmt)
+        self.session.commit()
@@ -0,0 +1,140 @@
+#  Copyright (c) 2024.  stef.
+#
+#      ______                 _____
+#     / ____/___ ________  __/ ___/___  ______   _____  _____
+#    / __/ / __ `/ ___/ / / /\__ \/ _ \/ ___/ | / / _ \/ ___/
+#   / /___/ /_/ (__  ) /_/ /___/ /  __/ /   | |/ /  __/ /
+#  /_____/\__,_/____/\__, //____/\___/_/    |___/\___/_/
+#                   /____/
+#
+#  Apache License
+#  ================
+#
+#   Licensed under the Apache License, Version 2.0 (the "License");
+#   you may not use this file except in compliance with the License.
+#   You may obtain a copy of the License at
+#
+#   http://www.apache.org/licenses/LICENSE-2.0
+#
+#   Unless required by applicable law or agreed to in writing, software
+#   distributed under the License is distributed on an "AS IS" BASIS,
+#   WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#   See the License for the specific language governing permissions and
+#   limitations under the License.
+#
+
+from datetime import datetime
+
+from sqlalchemy import and_, func, insert, or_, select, update
+
+from .repository_generic import RepositoryGeneric
+from ..models.server import ServerTaskLogLineModel, ServerTaskModel
+from ..table_versions import table_versions
+from ...schema.server import ServerTask, ServerTaskLogLine, ServerTaskStatus
+
+
+class RepositoryServerTasks(RepositoryGeneric[ServerTask, ServerTaskModel]):
+    def _bump(self) -> None:
+        table_versions.bump(ServerTaskModel.__tablename__)
+
+    @staticmethod
+    def _available(now: datetime):
+        # queued tasks which may run, and tasks whose worker stopped renewing its lease
+        return or_(
+            and_(
+                ServerTaskModel.status == ServerTaskStatus.queued.value,
+                or_(ServerTaskModel.run_after.is_(None), ServerTaskModel.run_after <= now),
+            ),
+            and_(ServerTaskModel.status == ServerTaskStatus.running.value, ServerTaskModel.lease_until < now),
+        )
+
+    def claim(self, worker: str, now: datetime, lease_until: datetime, candidates: int = 8) -> ServerTask | None:
+        """
+        Leases the queued task with the highest priority to `worker`. The candidates are locked with
+        SKIP LOCKED where the database supports it, so that concurrent workers pick different tasks;
+        the lease is then taken with a conditional update, which also keeps SQLite safe.
+        """
+        stmt = (
+            select(ServerTaskModel.id)
+            .where(ServerTaskModel.func.is_not(None), self._available(now))
+            .order_by(ServerTaskModel.priority.desc(), ServerTaskModel.id)
+            .limit(candidates)
+            .with_for_update(skip_locked=True)
+        )
+        for id in self.session.scalars(stmt).all():
+            claimed = self.session.execute(
+                update(ServerTaskModel)
+                .where(ServerTaskModel.id == id, self._available(now))
+                .values(
+                    status=ServerTaskStatus.running.value,
+                    leased_by=worker,
+                    lease_until=lease_until,
+                    attempts=ServerTaskModel.attempts + 1,
+                )
+                .execution_options(synchronize_session=False)
+            ).rowcount
+            if claimed:
+                self.session.commit()
+                self._bump()
+                return self.schema.model_validate(self.session.get(ServerTaskModel, id, populate_existing=True))
+        self.session.rollback()
+        return None
+
+    def get_status(self, id: int) -> ServerTaskStatus | None:
+        status = self.session.scalar(select(ServerTaskModel.status).filter(ServerTaskModel.id == id))
+        return None if status is None else ServerTaskStatus(status)
+
+    def renew(self, id: int, worker: str, lease_until: datetime) -> bool:
+        """Extends the lease of a running task, fails when another worker took it over"""
+        stmt = (
+            update(ServerTaskModel)
+            .where(ServerTaskModel.id == id, ServerTaskModel.leased_by == worker)
+            .values(lease_until=lease_until)
+            .execution_options(synchronize_session=False)
+        )
+        renewed = bool(self.session.execute(stmt).rowcount)
+        self.session.commit()
+        return renewed
+
+    def release(self, id: int, worker: str, status: ServerTaskStatus, run_after: datetime | None = None) -> bool:
+        """Ends the lease of a task, with its final status or queued again to run after `run_after`"""
+        final = status != ServerTaskStatus.queued
+        stmt = (
+            update(ServerTaskModel)
+            .where(ServerTaskModel.id == id, ServerTaskModel.leased_by == worker)
+            .values(
+                status=status.value,
+                leased_by=None,
+                lease_until=None,
+                run_after=run_after,
+                completed_date=datetime.now() if final else None,
+            )
+            .execution_options(synchronize_session=False)
+        )
+        released = bool(self.session.execute(stmt).rowcount)
+        self.session.commit()
+        self._bump()
+        return released
+
+
+class RepositoryServerTaskLogLines(RepositoryGeneric[ServerTaskLogLine, ServerTaskLogLineModel]):
+    def last_seq(self, task_id: int) -> int:
+        """Returns the position of the last line of the log of a task, 0 when it is empty"""
+        return self.session.scalar(
+            select(func.coalesce(func.max(ServerTaskLogLineModel.seq), 0)).filter(ServerTaskLogLineModel.task_id == task_id)
+        )
+
+    def append_lines(self, lines: list[dict]) -> None:
+        """Appends lines to the logs of tasks in one batch, the existing lines are never rewritten"""
+        self.session.execute(insert(ServerTaskLogLineModel), lines)
+        self.session.commit()
+
+    def get_lines(self, task_id: int, offset: int = 0, limit: int = 500) -> list[ServerTaskLogLine]:
+        """Returns the lines of the log of a task after the position `offset`"""
+        stmt = (
+            select(ServerTaskLogLineModel)
+            .filter(ServerTaskLogLineModel.task_id == task_id, ServerTaskLogLineModel.seq > offset)
+            .order_by(ServerTaskLogLineModel.seq)
+            .limit(limit)
+        )
+        return [self.schema.model_validate(x) for x in self.session.scalars(stmt)]
@@ -24,15 +24,19 @@
 #
 
 import random
+import secrets
 import shutil
+from datetime import datetime
 
 from pydantic import UUID4
 from pydantic.v1.schema import schema
-from sqlalchemy import select
+from sqlalchemy import case, func, select, update
 
 from .repository_generic import RepositoryGeneric
 from ..models.users import User
+from ..table_versions import table_versions
 from ...backend.config import config
+from ...core.user_cache import user_cache
 from ...schema.user import UserModel
 
 
@@ -46,7 +50,10 @@ class RepositoryUsers(RepositoryGeneric[UserModel, User]):
                 return user_to_update
 
         entry.update_password(password)
+        entry.cache_key = self._new_cache_key()
         self.session.commit()
+        self._bump_table_versions()
+        user_cache.invalidate(entry.id)
 
         return self.schema.model_validate(entry)
 
@@ -61,7 +68,11 @@ class RepositoryUsers(RepositoryGeneric[UserModel, User]):
                 # do not update the default user in demo mode
                 return user_to_update
 
-        return super().update(match_value, new_data, schema=schema)
+        new_data = new_data if isinstance(new_data, dict) else new_data.model_dump()
+        new_data["cache_key"] = self._new_cache_key()
+        entry = super().update(match_value, new_data, schema=schema)
+        user_cache.invalidate(match_value)
+        return entry
 
     def delete(self, value: str | UUID4, match_key: str | None = None, schema = True) -> User | UserModel:
         if config['internal.demo']:
@@ -71,8 +82,63 @@ class RepositoryUsers(RepositoryGeneric[UserModel, User]):
                 return user_to_delete
 
         entry = super().delete(value, match_key, schema=schema)
+        user_cache.invalidate(entry.id)
         return entry
 
+    @staticmethod
+    def _new_cache_key() -> str:
+        # rotated on each update so that the cached copies of the user are dropped
+        return secrets.token_hex(8)
+
+    def get_cache_key(self, id: str | UUID4) -> str | None:
+        return self.session.scalar(select(User.cache_key).filter(User.id == id))
+
+    def record_login_failure(self, id: str | UUID4) -> int:
+        """
+        Counts a failed login in a single statement, so that concurrent failures are never lost, and locks
+        the user once the maximum number of attempts is reached. Returns the number of failed attempts.
+        """
+        attempts = func.coalesce(User.login_attemps, 0) + 1
+        lock = attempts >= config['application.security_max_login_attempts']
+        stmt = (
+            update(User)
+            .where(User.id == id)
+            .values(
+                login_attemps=attempts,
+                locked_at=case((lock, func.coalesce(User.locked_at, datetime.now())), else_=User.locked_at),
+                cache_key=case((lock, self._new_cache_key()), else_=User.cache_key),
+            )
+            .returning(User.login_attemps)
+            .execution_options(synchronize_session=False)
+        )
+        count = self.session.execute(stmt).scalar_one()
+        self.session.commit()
+        # only the columns of the users table change, its relations are left untouched
+        table_versions.bump(User.__tablename__)
+        if count >= config['application.security_max_login_attempts']:
+            user_cache.invalidate(id)
+        return count
+
+    def reset_login_attempts(self, id: str | UUID4) -> None:
+        """Clears the failed attempts after a successful login, without writing anything when there are none"""
+        stmt = (
+            update(User)
+            .where(User.id == id, User.login_attemps != 0)
+            .values(login_attemps=0)
+            .execution_options(synchronize_session=False)
+        )
+        if self.session.execute(stmt).rowcount:
+            self.session.commit()
+            table_versions.bump(User.__tablename__)
+        else:
+            self.session.rollback()
+
+    def update_login_dates(self, login_dates: dict[str, datetime]) -> None:
+        """Stores the login dates of several users in one batch"""
+        self.session.execute(update(User), [{"id": id, "login_date": date} for id, date in login_dates.items()])
+        self.session.commit()
+        table_versions.bump(User.__tablename__)
+
     def get_by_username(self, username: str, schema = True) -> User | UserModel | None:
         stmt = select(User).filter(User.username == username)
         dbuser = self.session.execute(stmt).scalars().one_or_none()
@@ -0,0 +1,44 @@
+#  Copyright (c) 2024.  stef.
+#
+#      ______                 _____
+#     / ____/___ ________  __/ ___/___  ______   _____  _____
+#    / __/ / __ `/ ___/ / / /\__ \/ _ \/ ___/ | / / _ \/ ___/
+#   / /___/ /_/ (__  ) /_/ /___/ /  __/ /   | |/ /  __/ /
+#  /_____/\__,_/____/\__, //____/\___/_/    |___/\___/_/
+#                   /____/
+#
+#  Apache License
+#  ================
+#
+#   Licensed under the Apache License, Version 2.0 (the "License");
+#   you may not use this file except in compliance with the License.
+#   You may obtain a copy of the License at
+#
+#   http://www.apache.org/licenses/LICENSE-2.0
+#
+#   Unless required by applicable law or agreed to in writing, software
+#   distributed under the License is distributed on an "AS IS" BASIS,
+#   WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#   See the License for the specific language governing permissions and
+#   limitations under the License.
+#
+
+from sqlalchemy import insert, select
+
+from .repository_generic import RepositoryGeneric
+from ..models.server import WebhookDeliveryModel, WebhooksModel
+from ...schema.server import ReadWebhook, WebhookDelivery
+
+
+class RepositoryWebhooks(RepositoryGeneric[ReadWebhook, WebhooksModel]):
+    def get_enabled(self) -> list[ReadWebhook]:
+        """Returns the enabled webhooks of all the groups"""
+        stmt = select(WebhooksModel).filter(WebhooksModel.enabled.is_(True))
+        return [self.schema.model_validate(x) for x in self.session.scalars(stmt)]
+
+
+class RepositoryWebhookDeliveries(RepositoryGeneric[WebhookDelivery, WebhookDeliveryModel]):
+    def record(self, deliveries: list[dict]) -> None:
+        """Records delivery attempts in one batch"""
+        self.session.execute(insert(WebhookDeliveryModel), deliveries)
+        self.session.commit()
@@ -0,0 +1,154 @@
+#  Copyright (c) 2024.  stef.
+#
+#      ______                 _____
+#     / ____/___ ________  __/ ___/___  ______   _____  _____
+#    / __/ / __ `/ ___/ / / /\__ \/ _ \/ ___/ | / / _ \/ ___/
+#   / /___/ /_/ (__  ) /_/ /___/ /  __/ /   | |/ /  __/ /
+#  /_____/\__,_/____/\__, //____/\___/_/    |___/\___/_/
+#                   /____/
+#
+#  Apache License
+#  ================
+#
+#   Licensed under the Apache License, Version 2.0 (the "License");
+#   you may not use this file except in compliance with the License.
+#   You may obtain a copy of the License at
+#
+#   http://www.apache.org/licenses/LICENSE-2.0
+#
+#   Unless required by applicable law or agreed to in writing, software
+#   distributed under the License is distributed on an "AS IS" BASIS,
+#   WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#   See the License for the specific language governing permissions and
+#   limitations under the License.
+#
+
+import threading
+import time
+from functools import lru_cache
+
+from sqlalchemy import Select, Table
+from sqlalchemy.orm import Mapper
+from sqlalchemy.sql import visitors
+
+from ..backend.config import config
+from ..core.shared_store import get_shared_store, shared_store_enabled
+from ..helper.shared_sqlite import SharedSqlite
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS table_versions (
+    name TEXT PRIMARY KEY,
+    version INTEGER NOT NULL
+);
+"""
+
+
+class TableVersions:
+    """
+    Version counters of the database tables.
+
+    Every write done through the repositories bumps the version of the written tables.
+    Caches store the versions of the tables they depend on alongside their entries and
+    compare them on lookup: an entry built before a write is never served after it.
+
+    Counters are kept in memory, or in the shared SQLite store when several workers
+    serve the application so that a write in one worker invalidates the others.
+    In memory they only count the writes of this process, so what is derived from the
+    tables is also read again after `ttl` seconds (see `is_fresh`): the writes of the
+    other workers are seen within that delay.
+    """
+
+    def __init__(self, shared: SharedSqlite | None = None, ttl: float = 5) -> None:
+        self._versions: dict[str, int] = {}
+        self._lock = threading.Lock()
+        self._shared = shared
+        self.ttl = ttl
+        if shared is not None:
+            shared.ensure_schema(SCHEMA)
+
+    @property
+    def shared(self) -> bool:
+        return self._shared is not None
+
+    def is_fresh(self, loaded_at: float) -> bool:
+        """
+        Returns whether data read at `loaded_at` (a `time.monotonic` value) can still be used while the
+        versions of its tables are unchanged, that is always when the versions are shared between the
+        workers, and for `ttl` seconds otherwise.
+        """
+        return self._shared is not None or time.monotonic() - loaded_at < self.ttl
+
+    def get(self, *tables: str) -> tuple[int, ...]:
+        if self._shared is None:
+            return tuple(self._versions.get(table, 0) for table in tables)
+
+        placeholders = ",".join("?" * len(tables))
+        rows = self._shared.execute(
+            f"SELECT name, version FROM table_versions WHERE name IN ({placeholders})", tables
+        ).fetchall()
+        found = dict(rows)
+        return tuple(found.get(table, 0) for table in tables)
+
+    def bump(self, *tables: str) -> None:
+        if self._shared is None:
+            with self._lock:
+                for table in tables:
+                    self._versions[table] = self._versions.get(table, 0) + 1
+            return
+
+        self._shared.executemany(
+            "INSERT INTO table_versions (name, version) VALUES (?, 1) "
+            "ON CONFLICT(name) DO UPDATE SET version = version + 1",
+            [(table,) for table in tables],
+        )
+
+
+@lru_cache(maxsize=None)
+def related_tables(model: type) -> tuple[str, ...]:
+    """
+    Returns the table of the model and the tables it is directly related to.
+
+    Loader options and cascades reach the related tables, so a write on a model
+    bumps them and a read on a model depends on them.
+    """
+    tables = {model.__tablename__}
+    for relationship in model.__mapper__.relationships:
+        tables.add(relationship.mapper.local_table.name)
+        if relationship.secondary is not None:
+            tables.add(relationship.secondary.name)
+    return tuple(sorted(tables))
+
+
+@lru_cache(maxsize=1)
+def _mappers_by_table() -> dict[str, Mapper]:
+    from .models.model_base import SqlAlchemyBase
+
+    return {mapper.local_table.name: mapper for mapper in SqlAlchemyBase.registry.mappers}
+
+
+def statement_tables(statement: Select) -> tuple[str, ...]:
+    """
+    Returns the tables a statement reads: the tables of its clauses (joins and subqueries included),
+    the tables its loader options load, and the tables directly related to all of them, which the
+    schemas may load lazily.
+    """
+    tables = {element.name for element in visitors.iterate(statement) if isinstance(element, Table)}
+    # loader options are not clauses of the statement, their paths alternate mappers and relationships
+    for option in getattr(statement, "_with_options", ()):
+        for load in getattr(option, "context", ()):
+            for token in load.path.path:
+                mapper = getattr(token, "mapper", None)
+                if mapper is not None:
+                    tables.add(mapper.local_table.name)
+                secondary = getattr(token, "secondary", None)
+                if secondary is not None:
+                    tables.add(secondary.name)
+
+    mappers = _mappers_by_table()
+    for table in list(tables):
+        if table in mappers:
+            tables.update(related_tables(mappers[table].class_))
+    return tuple(sorted(tables))
+
+
+table_versions = TableVersions(get_shared_store() if shared_store_enabled() else None, config['cache.versions_ttl'])
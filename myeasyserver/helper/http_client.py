@@ -0,0 +1,56 @@
+#  Copyright (c) 2024.  stef.
+#
+#      ______                 _____
+#     / ____/___ ________  __/ ___/___  ______   _____  _____
+#    / __/ / __ `/ ___/ / / /\__ \/ _ \/ ___/ | / / _ \/ ___/
+#   / /___/ /_/ (__  ) /_/ /___/ /  __/ /   | |/ /  __/ /
+#  /_____/\__,_/____/\__, //____/\___/_/    |___/\___/_/
+#                   /____/
+#
+#  Apache License
+#  ================
+#
+#   Licensed under the Apache License, Version 2.0 (the "License");
+#   you may not use this file except in compliance with the License.
+#   You may obtain a copy of the License at
+#
+#   http://www.apache.org/licenses/LICENSE-2.0
+#
+#   Unless required by applicable law or agreed to in writing, software
+#   distributed under the License is distributed on an "AS IS" BASIS,
+#   WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#   See the License for the specific language governing permissions and
+#   limitations under the License.
+#
+
+import httpx
+
+_clients: dict[tuple[str | bool, float], httpx.AsyncClient] = {}
+
+
+def get_http_client(verify: str | bool = True, timeout: float = 10) -> httpx.AsyncClient:
+    """
+    Returns the HTTP client shared by the services calling other servers.
+
+    Clients keep their connections alive between calls; one is created per TLS verification
+    setting (a CA bundle path or a boolean) and timeout.
+    """
+    key = (verify, timeout)
+    client = _clients.get(key)
+    if client is None or client.is_closed:
+        client = httpx.AsyncClient(
+            verify=verify,
+            timeout=timeout,
+            limits=httpx.Limits(max_connections=100, max_keepalive_connections=20, keepalive_expiry=60),
+            follow_redirects=True,
+        )
+        _clients[key] = client
+    return client
+
+
+async def close_http_clients() -> None:
+    """Closes the shared clients, called when the server stops"""
+    clients = list(_clients.values())
+    _clients.clear()
+    for client in clients:
+        await client.aclose()
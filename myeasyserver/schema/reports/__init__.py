@@ -1,7 +1,7 @@
 # This file is auto-generated by gen_schema_exports.py
-from .reports import ReportCategory, ReportCreate, ReportEntryCreate, ReportEntryOut, ReportOut, ReportSummary, ReportSummaryStatus
+from .reports import ReportCategory, ReportCreate, ReportEntryCreate, ReportEntryOut, ReportEntryPage, ReportSummary, ReportSummaryStatus
 
 
 __all__ = [
-    "ReportCategory","ReportCreate","ReportEntryCreate","ReportEntryOut","ReportOut","ReportSummary","ReportSummaryStatus",
+    "ReportCategory","ReportCreate","ReportEntryCreate","ReportEntryOut","ReportEntryPage","ReportSummary","ReportSummaryStatus",
 ]
@@ -26,12 +26,10 @@
 import datetime
 import enum
 
-from pydantic import ConfigDict, Field, BaseModel
+from pydantic import ConfigDict, Field
 from pydantic.types import UUID4
-from sqlalchemy.orm import joinedload
-from sqlalchemy.orm.interfaces import LoaderOption
 
-from myeasyserver.database.models.server import ReportModel
+from ..basic_model import BasicModel
 
 
 class ReportCategory(str, enum.Enum):
@@ -48,7 +46,7 @@ class ReportSummaryStatus(str, enum.Enum):
     partial = "partial"
 
 
-class ReportEntryCreate(BaseModel):
+class ReportEntryCreate(BasicModel):
     report_id: UUID4
     timestamp: datetime.datetime = Field(default_factory=datetime.datetime.utcnow)
     success: bool = True
@@ -61,7 +59,13 @@ class ReportEntryOut(ReportEntryCreate):
     model_config = ConfigDict(from_attributes=True)
 
 
-class ReportCreate(BaseModel):
+class ReportEntryPage(BasicModel):
+    """A page of entries, `next` is the cursor of the following page, None on the last one"""
+    items: list[ReportEntryOut]
+    next: str | None = None
+
+
+class ReportCreate(BasicModel):
     timestamp: datetime.datetime = Field(default_factory=datetime.datetime.utcnow)
     category: ReportCategory
     group_id: UUID4
@@ -71,12 +75,9 @@ class ReportCreate(BaseModel):
 
 class ReportSummary(ReportCreate):
     id: UUID4
-
-
-class ReportOut(ReportSummary):
-    entries: list[ReportEntryOut] = []
+    success_count: int = 0
+    failure_count: int = 0
+    total_count: int = 0
+    last_entry: datetime.datetime | None = None
     model_config = ConfigDict(from_attributes=True)
 
-    @classmethod
-    def loader_options(cls) -> list[LoaderOption]:
-        return [joinedload(ReportModel.entries)]
@@ -1,10 +1,11 @@
 # This file is auto-generated by gen_schema_exports.py
-from .webhook import CreateWebhook, ReadWebhook, SaveWebhook, WebhookType
-from .tasks import ServerTask, ServerTaskCreate, ServerTaskNames, ServerTaskStatus
+from .webhook import CreateWebhook, ReadWebhook, SaveWebhook, WebhookDelivery, WebhookType
+from .tasks import ServerTask, ServerTaskCreate, ServerTaskLogLine, ServerTaskNames, ServerTaskStatus
 from .events import EventNotifierOptions, EventNotifierOptionsOut, EventNotifierOptionsSave, EventNotifierOut, EventNotifierPrivate, EventNotifierSave, GroupEventNotifierCreate, GroupEventNotifierUpdate
 from .exports import DataExport
+from .jobs import MisfirePolicy, ScheduledJob, ScheduledJobCreate, SchedulerLease
 
 
 __all__ = [
-    "CreateWebhook","ReadWebhook","SaveWebhook","WebhookType","ServerTask","ServerTaskCreate","ServerTaskNames","ServerTaskStatus","EventNotifierOptions","EventNotifierOptionsOut","EventNotifierOptionsSave","EventNotifierOut","EventNotifierPrivate","EventNotifierSave","GroupEventNotifierCreate","GroupEventNotifierUpdate","DataExport",
+    "CreateWebhook","ReadWebhook","SaveWebhook","WebhookDelivery","WebhookType","ServerTask","ServerTaskCreate","ServerTaskLogLine","ServerTaskNames","ServerTaskStatus","EventNotifierOptions","EventNotifierOptionsOut","EventNotifierOptionsSave","EventNotifierOut","EventNotifierPrivate","EventNotifierSave","GroupEventNotifierCreate","GroupEventNotifierUpdate","DataExport","MisfirePolicy","ScheduledJob","ScheduledJobCreate","SchedulerLease",
 ]
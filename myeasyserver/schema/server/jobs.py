@@ -0,0 +1,67 @@
+#  Copyright (c) 2024.  stef.
+#
+#      ______                 _____
+#     / ____/___ ________  __/ ___/___  ______   _____  _____
+#    / __/ / __ `/ ___/ / / /\__ \/ _ \/ ___/ | / / _ \/ ___/
+#   / /___/ /_/ (__  ) /_/ /___/ /  __/ /   | |/ /  __/ /
+#  /_____/\__,_/____/\__, //____/\___/_/    |___/\___/_/
+#                   /____/
+#
+#  Apache License
+#  ================
+#
+#   Licensed under the Apache License, Version 2.0 (the "License");
+#   you may not use this file except in compliance with the License.
+#   You may obtain a copy of the License at
+#
+#   http://www.apache.org/licenses/LICENSE-2.0
+#
+#   Unless required by applicable law or agreed to in writing, software
+#   distributed under the License is distributed on an "AS IS" BASIS,
+#   WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#   See the License for the specific language governing permissions and
+#   limitations under the License.
+#
+
+import datetime
+import enum
+
+from pydantic import ConfigDict, BaseModel
+
+
+class MisfirePolicy(str, enum.Enum):
+    skip = "skip"  # wait for the next planned run
+    run_once = "run_once"  # run once as soon as possible, whatever the number of missed runs
+    catch_up = "catch_up"  # run once per missed run
+
+
+class ScheduledJobCreate(BaseModel):
+    job_id: str
+    func: str
+    arguments: str = "{}"
+    unit: str
+    interval: int
+    latest: int | None = None
+    at_time: str | None = None
+    at_time_zone: str | None = None
+    start_day: str | None = None
+    cancel_after: datetime.datetime | None = None
+    tags: str = "[]"
+    misfire_policy: MisfirePolicy = MisfirePolicy.run_once
+    executor: str | None = None
+    max_instances: int = 1
+    timeout: float | None = None
+    next_run: datetime.datetime | None = None
+    last_run: datetime.datetime | None = None
+
+
+class ScheduledJob(ScheduledJobCreate):
+    id: int
+    model_config = ConfigDict(from_attributes=True)
+
+
+class SchedulerLease(BaseModel):
+    name: str
+    holder: str
+    expires_at: datetime.datetime
+    model_config = ConfigDict(from_attributes=True)
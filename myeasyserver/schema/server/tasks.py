@@ -36,9 +36,11 @@ class ServerTaskNames(str, enum.Enum):
 
 
 class ServerTaskStatus(str, enum.Enum):
+    queued = "queued"
     running = "running"
     finished = "finished"
     failed = "failed"
+    dead = "dead"  # failed on each of its attempts, left for inspection
 
 
 class ServerTaskCreate(BaseModel):
@@ -47,6 +49,12 @@ class ServerTaskCreate(BaseModel):
     created_at: datetime.datetime = Field(default_factory=datetime.datetime.now)
     status: ServerTaskStatus = ServerTaskStatus.running
     log: str = ""
+    func: str | None = None
+    payload: bytes | None = None
+    priority: int = 0
+    run_after: datetime.datetime | None = None
+    attempts: int = 0
+    max_attempts: int = 3
 
     def set_running(self) -> None:
         self.status = ServerTaskStatus.running
@@ -57,11 +65,24 @@ class ServerTaskCreate(BaseModel):
     def set_failed(self) -> None:
         self.status = ServerTaskStatus.failed
 
-    def append_log(self, message: str) -> None:
-        # Prefix with Timestamp and append new line and join to log
-        self.log += f"{datetime.datetime.now()}: {message}\n"
-
 
 class ServerTask(ServerTaskCreate):
     id: int
+    completed_date: datetime.datetime | None = None
+    leased_by: str | None = None
+    lease_until: datetime.datetime | None = None
+    model_config = ConfigDict(from_attributes=True)
+
+    def append_log(self, message: str) -> None:
+        """Appends a line to the log of the task, stored in batches in server_task_log_lines"""
+        from ...services.scheduler.task_log import task_log_writer
+
+        task_log_writer.append(self.id, message)
+
+
+class ServerTaskLogLine(BaseModel):
+    task_id: int
+    seq: int
+    message: str
+    created_at: datetime.datetime | None = None
     model_config = ConfigDict(from_attributes=True)
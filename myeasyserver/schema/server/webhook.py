@@ -51,3 +51,14 @@ class SaveWebhook(CreateWebhook):
 class ReadWebhook(SaveWebhook):
     id: UUID4
     model_config = ConfigDict(from_attributes=True)
+
+
+class WebhookDelivery(BaseModel):
+    webhook_id: UUID4
+    fired_at: datetime.datetime
+    attempt: int
+    success: bool
+    status_code: int | None = None
+    error: str | None = None
+    duration: float
+    model_config = ConfigDict(from_attributes=True)
@@ -1,10 +1,10 @@
 # This file is auto-generated by gen_schema_exports.py
-from .auth import CredentialsRequest, CredentialsRequestForm, OIDCRequest, Token, TokenData, UnlockResults
+from .auth import CredentialsRequest, CredentialsRequestForm, OIDCRequest, RevokeToken, RevokedToken, Token, TokenData, UnlockResults
 from .user_passwords import ForgotPassword, PasswordResetToken, PrivatePasswordResetToken, ResetPassword, SavePasswordResetToken, ValidateResetToken
 from .user import ChangePassword, Createkey, GroupBase, GroupInDB, GroupSummary, UserKeyIn, UserKeyInDB, UserKeyOut, UpdateGroup, UserBase, UserIn, UserModel, UserSummary
 from .registration import CreateUserRegistration
 
 
 __all__ = [
-    "CredentialsRequest","CredentialsRequestForm","OIDCRequest","Token","TokenData","UnlockResults","ForgotPassword","PasswordResetToken","PrivatePasswordResetToken","ResetPassword","SavePasswordResetToken","ValidateResetToken","ChangePassword","Createkey","GroupBase","GroupInDB","GroupSummary","UserKeyIn","UserKeyInDB","UserKeyOut","UpdateGroup","UserBase","UserIn","UserModel","UserSummary","CreateUserRegistration",
+    "CredentialsRequest","CredentialsRequestForm","OIDCRequest","RevokeToken","RevokedToken","Token","TokenData","UnlockResults","ForgotPassword","PasswordResetToken","PrivatePasswordResetToken","ResetPassword","SavePasswordResetToken","ValidateResetToken","ChangePassword","Createkey","GroupBase","GroupInDB","GroupSummary","UserKeyIn","UserKeyInDB","UserKeyOut","UpdateGroup","UserBase","UserIn","UserModel","UserSummary","CreateUserRegistration",
 ]
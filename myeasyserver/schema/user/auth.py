@@ -1,7 +1,8 @@
+from datetime import datetime
 from typing import Annotated
 
 from fastapi import Form
-from pydantic import UUID4, StringConstraints
+from pydantic import UUID4, ConfigDict, StringConstraints
 
 from ..basic_model import BasicModel
 
@@ -16,6 +17,17 @@ class TokenData(BasicModel):
     username: Annotated[str, StringConstraints(to_lower=True, strip_whitespace=True)] | None = None  # type: ignore
 
 
+class RevokeToken(BasicModel):
+    token: str
+
+
+class RevokedToken(BasicModel):
+    jti: str
+    expires_at: datetime | None = None
+    user_id: UUID4 | None = None
+    model_config = ConfigDict(from_attributes=True)
+
+
 class UnlockResults(BasicModel):
     unlocked: int = 0
 
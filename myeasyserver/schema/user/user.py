@@ -40,6 +40,7 @@ class Createkey(UserKeyIn):
     Defines the structure of a user key when creating it in database
     """
     user_id: UUID4
+    prefix: str | None = None
     key: str
     model_config = ConfigDict(from_attributes=True)
 
@@ -166,7 +167,7 @@ class UserKeyOut(BasicModel):
     name: str
     user_id: UUID4
     id: UUID4
-    key: str
+    prefix: str | None = None
     integration_id: str = DEFAULT_INTEGRATION_ID
     created_at: datetime | None = None
     model_config = ConfigDict(from_attributes=True)
@@ -1,15 +1,25 @@
+import queue
 import smtplib
+import threading
+import time
 import typing
 from abc import ABC, abstractmethod
+from collections.abc import Iterator
+from contextlib import contextmanager
 from dataclasses import dataclass
 from email import message
 from email.utils import formatdate
+from functools import lru_cache
 from uuid import uuid4
 
 from html2text import html2text
 
+from ...backend.config import config
+from ...core.root_logger import get_logger
 from ...services.base_service import BaseService
 
+logger = get_logger("email")
+
 
 @dataclass(slots=True)
 class EmailOptions:
@@ -19,6 +29,7 @@ class EmailOptions:
     password: str | None = None
     tls: bool = False
     ssl: bool = False
+    timeout: float = 10
 
 
 @dataclass(slots=True)
@@ -35,7 +46,7 @@ class Message:
     mail_from_name: str
     mail_from_address: str
 
-    def send(self, to: str, smtp: EmailOptions) -> SMTPResponse:
+    def build(self, to: str) -> message.EmailMessage:
         msg = message.EmailMessage()
         msg["Subject"] = self.subject
         msg["From"] = f"{self.mail_from_name} <{self.mail_from_address}>"
@@ -53,22 +64,139 @@ class Message:
 
         msg["Message-ID"] = message_id
         msg["MIME-Version"] = "1.0"
+        return msg
 
-        if smtp.ssl:
-            with smtplib.SMTP_SSL(smtp.host, smtp.port) as server:
-                if smtp.username and smtp.password:
-                    server.login(smtp.username, smtp.password)
+    def send(self, to: str, smtp: "SMTPConnectionPool") -> SMTPResponse:
+        errors = smtp.send_messages([self.build(to)])[0]
+        return SMTPResponse(errors == {}, "Message Sent", errors=errors)
+
+
+class SMTPConnectionPool:
+    """
+    Bounded pool of authenticated SMTP sessions.
 
-                errors = server.send_message(msg)
+    Sessions are opened (with STARTTLS and login) once and reused for the following messages.
+    A session idle for more than `keepalive` seconds is checked with a NOOP before being reused,
+    and one idle for more than `idle_timeout` seconds is closed, before the server drops it.
+    """
+
+    def __init__(self, options: EmailOptions, size: int, idle_timeout: float, keepalive: float) -> None:
+        self.options = options
+        self.idle_timeout = idle_timeout
+        self.keepalive = keepalive
+        self._slots = threading.BoundedSemaphore(size)
+        # sessions with the time they were last used and last known to be alive
+        self._idle: list[tuple[smtplib.SMTP, float, float]] = []
+        self._lock = threading.Lock()
+
+    def _connect(self) -> smtplib.SMTP:
+        smtp = self.options
+        if smtp.ssl:
+            server = smtplib.SMTP_SSL(smtp.host, smtp.port, timeout=smtp.timeout)
         else:
-            with smtplib.SMTP(smtp.host, smtp.port) as server:
-                if smtp.tls:
-                    server.starttls()
-                if smtp.username and smtp.password:
-                    server.login(smtp.username, smtp.password)
-                errors = server.send_message(msg)
+            server = smtplib.SMTP(smtp.host, smtp.port, timeout=smtp.timeout)
+            if smtp.tls:
+                server.starttls()
+        if smtp.username and smtp.password:
+            server.login(smtp.username, smtp.password)
+        return server
 
-        return SMTPResponse(errors == {}, "Message Sent", errors=errors)
+    @staticmethod
+    def _healthy(server: smtplib.SMTP) -> bool:
+        try:
+            return server.noop()[0] == 250
+        except (smtplib.SMTPException, OSError):
+            return False
+
+    @staticmethod
+    def _discard(server: smtplib.SMTP) -> None:
+        try:
+            server.quit()
+        except (smtplib.SMTPException, OSError):
+            server.close()
+
+    def _acquire(self) -> smtplib.SMTP:
+        while True:
+            with self._lock:
+                if not self._idle:
+                    break
+                server, released_at, checked_at = self._idle.pop()
+            now = time.monotonic()
+            if now - released_at < self.idle_timeout and (now - checked_at < self.keepalive or self._healthy(server)):
+                return server
+            self._discard(server)
+        return self._connect()
+
+    def _release(self, server: smtplib.SMTP) -> None:
+        now = time.monotonic()
+        with self._lock:
+            self._idle.append((server, now, now))
+
+    @contextmanager
+    def session(self) -> Iterator[smtplib.SMTP]:
+        self._slots.acquire()
+        try:
+            server = self._acquire()
+            try:
+                yield server
+            except (smtplib.SMTPServerDisconnected, smtplib.SMTPResponseException, OSError):
+                # the state of the session is unknown, do not hand it to someone else
+                self._discard(server)
+                raise
+            self._release(server)
+        finally:
+            self._slots.release()
+
+    def send_messages(self, messages: list[message.EmailMessage]) -> list[dict]:
+        """
+        Sends the messages through one session and returns the refused recipients of each.
+        A message refused by the server does not stop the others, the session stays usable.
+        When the server closed the session, the messages not sent yet are sent again once
+        with a new one.
+        """
+        results: list[dict] = []
+        for attempt in range(2):
+            try:
+                with self.session() as server:
+                    while len(results) < len(messages):
+                        msg = messages[len(results)]
+                        try:
+                            results.append(server.send_message(msg))
+                        except smtplib.SMTPRecipientsRefused as e:
+                            results.append(e.recipients)
+                        except (smtplib.SMTPSenderRefused, smtplib.SMTPDataError) as e:
+                            # smtplib reset the transaction, the message is refused for all its recipients
+                            results.append({str(msg["To"]): (e.smtp_code, e.smtp_error)})
+                return results
+            except smtplib.SMTPServerDisconnected:
+                if attempt:
+                    raise
+                logger.warning("[SMTP] session closed by the server, reconnecting")
+        return results
+
+    def keep_alive(self) -> None:
+        """Closes the sessions idle for too long and checks the others which need it with a NOOP"""
+        with self._lock:
+            idle, self._idle = self._idle, []
+        now = time.monotonic()
+        kept = []
+        for server, released_at, checked_at in idle:
+            if now - released_at >= self.idle_timeout:
+                self._discard(server)
+            elif now - checked_at < self.keepalive:
+                kept.append((server, released_at, checked_at))
+            elif self._healthy(server):
+                kept.append((server, released_at, now))
+            else:
+                self._discard(server)
+        with self._lock:
+            self._idle.extend(kept)
+
+    def close(self) -> None:
+        with self._lock:
+            idle, self._idle = self._idle, []
+        for server, _, _ in idle:
+            self._discard(server)
 
 
 class ABCEmailSender(ABC):
@@ -76,43 +204,177 @@ class ABCEmailSender(ABC):
     def send(self, email_to: str, subject: str, html: str) -> bool: ...
 
 
+def _smtp_options() -> EmailOptions:
+    if not config["smtp.host"] or not config["smtp.port"]:
+        raise ValueError("smtp.host and smtp.port must be set in the config file.")
+    strategy = config["smtp.auth_strategy"].upper()
+    return EmailOptions(
+        config["smtp.host"],
+        int(config["smtp.port"]),
+        username=config["smtp.user"] or None,
+        password=config["smtp.password"] or None,
+        tls=strategy == "TLS",
+        ssl=strategy == "SSL",
+        timeout=config["smtp.timeout"],
+    )
+
+
+def _message(subject: str, html: str) -> Message:
+    if not config["smtp.from_email"] or not config["smtp.from_name"]:
+        raise ValueError("smtp.from_email and smtp.from_name must be set in the config file.")
+    return Message(
+        subject=subject,
+        html=html,
+        mail_from_name=config["smtp.from_name"],
+        mail_from_address=config["smtp.from_email"],
+    )
+
+
+@lru_cache(maxsize=1)
+def get_smtp_pool() -> SMTPConnectionPool:
+    return SMTPConnectionPool(
+        _smtp_options(),
+        config["smtp.pool_size"],
+        config["smtp.idle_timeout"],
+        config["smtp.keepalive"],
+    )
+
+
 class DefaultEmailSender(ABCEmailSender, BaseService):
     """
-    DefaultEmailSender is the default email sender for Myeasyserver. It uses the SMTP settings
-    from the config file to send emails via the python standard library. It supports
-    both TLS and SSL connections.
+    DefaultEmailSender sends the email in the calling thread through the pooled SMTP sessions,
+    with the smtp settings of the config file. It supports both TLS and SSL connections.
     """
 
     def send(self, email_to: str, subject: str, html: str) -> bool:
-        if self.settings.SMTP_FROM_EMAIL is None or self.settings.SMTP_FROM_NAME is None:
-            raise ValueError("SMTP_FROM_EMAIL and SMTP_FROM_NAME must be set in the config file.")
-
-        message = Message(
-            subject=subject,
-            html=html,
-            mail_from_name=self.settings.SMTP_FROM_NAME,
-            mail_from_address=self.settings.SMTP_FROM_EMAIL,
-        )
-
-        if self.settings.SMTP_HOST is None or self.settings.SMTP_PORT is None:
-            raise ValueError("SMTP_HOST, SMTP_PORT must be set in the config file.")
-
-        smtp_options = EmailOptions(
-            self.settings.SMTP_HOST,
-            int(self.settings.SMTP_PORT),
-            tls=self.settings.SMTP_AUTH_STRATEGY.upper() == "TLS" if self.settings.SMTP_AUTH_STRATEGY else False,
-            ssl=self.settings.SMTP_AUTH_STRATEGY.upper() == "SSL" if self.settings.SMTP_AUTH_STRATEGY else False,
-        )
-
-        if self.settings.SMTP_USER:
-            smtp_options.username = self.settings.SMTP_USER
-        if self.settings.SMTP_PASSWORD:
-            smtp_options.password = self.settings.SMTP_PASSWORD
-
-        response = message.send(to=email_to, smtp=smtp_options)
+        response = _message(subject, html).send(to=email_to, smtp=get_smtp_pool())
         self.logger.debug(f"send email result: {response}")
 
         if not response.success:
             self.logger.error(f"send email error: {response}")
 
         return response.success
+
+
+class QueuedEmailSender(ABCEmailSender):
+    """
+    Queues the emails and returns at once; they are sent by background threads, one per session
+    of the pool, by batches of `batch` messages sharing a session and at most `rate` messages
+    per second (0 for no limit). While idle, the threads keep the sessions of the pool alive.
+    """
+
+    def __init__(self, pool: SMTPConnectionPool, workers: int, batch: int, rate: float, queue_size: int) -> None:
+        self.pool = pool
+        self.workers = workers
+        self.batch = batch
+        self.interval = 1 / rate if rate > 0 else 0
+        self._queue: queue.Queue[message.EmailMessage | None] = queue.Queue(queue_size)
+        self._threads: list[threading.Thread] = []
+        self._lock = threading.Lock()
+        self._next_send = 0.0
+        self.sent = 0
+        self.failed = 0
+
+    def send(self, email_to: str, subject: str, html: str) -> bool:
+        return self.submit(_message(subject, html).build(email_to))
+
+    def submit(self, msg: message.EmailMessage) -> bool:
+        """Queues a message, returns False when the queue is full"""
+        self._start()
+        try:
+            self._queue.put_nowait(msg)
+            return True
+        except queue.Full:
+            logger.error(f"[SMTP] queue full, email to {msg['To']} dropped")
+            return False
+
+    def _start(self) -> None:
+        with self._lock:
+            if self._threads:
+                return
+            for number in range(self.workers):
+                thread = threading.Thread(target=self._work, name=f"email-sender-{number}", daemon=True)
+                thread.start()
+                self._threads.append(thread)
+
+    def _throttle(self, count: int) -> None:
+        if not self.interval:
+            return
+        with self._lock:
+            now = time.monotonic()
+            start = max(now, self._next_send)
+            self._next_send = start + count * self.interval
+        if start > now:
+            time.sleep(start - now)
+
+    def _next_batch(self) -> list[message.EmailMessage | None] | None:
+        try:
+            batch = [self._queue.get(timeout=self.pool.keepalive)]
+        except queue.Empty:
+            return None
+        while len(batch) < self.batch and batch[-1] is not None:
+            try:
+                batch.append(self._queue.get_nowait())
+            except queue.Empty:
+                break
+        return batch
+
+    def _work(self) -> None:
+        while True:
+            batch = self._next_batch()
+            if batch is None:
+                self.pool.keep_alive()
+                continue
+            stop = batch[-1] is None
+            messages = [msg for msg in batch if msg is not None]
+            if messages:
+                self._throttle(len(messages))
+                try:
+                    results = self.pool.send_messages(messages)
+                except Exception as e:
+                    logger.error(f"[SMTP] {len(messages)} emails not sent: {e}")
+                    self.failed += len(messages)
+                else:
+                    for msg, refused in zip(messages, results):
+                        if refused:
+                            logger.error(f"[SMTP] recipients refused for {msg['To']}: {refused}")
+                            self.failed += 1
+                        else:
+                            self.sent += 1
+            if stop:
+                return
+
+    def stop(self, grace: float) -> None:
+        """Sends the queued emails for at most `grace` seconds, then closes the sessions"""
+        with self._lock:
+            threads, self._threads = self._threads, []
+        for _ in threads:
+            try:
+                self._queue.put(None, timeout=grace)
+            except queue.Full:
+                break
+        deadline = time.monotonic() + grace
+        for thread in threads:
+            thread.join(max(0.0, deadline - time.monotonic()))
+        if self._queue.qsize():
+            logger.warning(f"[SMTP] {self._queue.qsize()} emails not sent at shutdown")
+        self.pool.close()
+
+    def stats(self) -> dict[str, typing.Any]:
+        return {
+            "queued": self._queue.qsize(),
+            "sent": self.sent,
+            "failed": self.failed,
+            "workers": len(self._threads),
+        }
+
+
+@lru_cache(maxsize=1)
+def get_email_sender() -> QueuedEmailSender:
+    return QueuedEmailSender(
+        get_smtp_pool(),
+        config["smtp.pool_size"],
+        config["smtp.batch"],
+        config["smtp.rate"],
+        config["smtp.queue_size"],
+    )
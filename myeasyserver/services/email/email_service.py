@@ -3,8 +3,9 @@ from pathlib import Path
 from jinja2 import Template
 from pydantic import BaseModel
 
-from .email_senders import ABCEmailSender, DefaultEmailSender
+from .email_senders import ABCEmailSender, get_email_sender
 from ..base_service import BaseService
+from ...backend.config import config
 from ...core.root_logger import get_logger
 
 CWD = Path(__file__).parent
@@ -30,15 +31,17 @@ class EmailService(BaseService):
     def __init__(self, sender: ABCEmailSender | None = None) -> None:
         self.templates_dir = CWD / "templates"
         self.default_template = self.templates_dir / "default.html"
-        self.sender: ABCEmailSender = sender or DefaultEmailSender()
+        # emails are queued and sent in the background unless another sender is given
+        self.sender: ABCEmailSender | None = sender
 
         super().__init__()
 
     def send_email(self, email_to: str, data: EmailTemplate) -> bool:
-        if not self.settings.SMTP_ENABLE:
+        if not config['smtp.enabled']:
             return False
 
-        return self.sender.send(email_to, data.subject, data.render_html(self.default_template))
+        sender = self.sender or get_email_sender()
+        return sender.send(email_to, data.subject, data.render_html(self.default_template))
 
     def send_forgot_password(self, address: str, reset_password_url: str) -> bool:
         forgot_password = EmailTemplate(
@@ -0,0 +1,11 @@
+from .event_bus_service import EventBusService, get_event_bus
+from .event_types import Event, EventDocumentData, EventTypes, EventUserSignupData
+
+__all__ = [
+    "EventBusService",
+    "get_event_bus",
+    "Event",
+    "EventDocumentData",
+    "EventTypes",
+    "EventUserSignupData",
+]
@@ -0,0 +1,232 @@
+#  Copyright (c) 2024.  stef.
+#
+#      ______                 _____
+#     / ____/___ ________  __/ ___/___  ______   _____  _____
+#    / __/ / __ `/ ___/ / / /\__ \/ _ \/ ___/ | / / _ \/ ___/
+#   / /___/ /_/ (__  ) /_/ /___/ /  __/ /   | |/ /  __/ /
+#  /_____/\__,_/____/\__, //____/\___/_/    |___/\___/_/
+#                   /____/
+#
+#  Apache License
+#  ================
+#
+#   Licensed under the Apache License, Version 2.0 (the "License");
+#   you may not use this file except in compliance with the License.
+#   You may obtain a copy of the License at
+#
+#   http://www.apache.org/licenses/LICENSE-2.0
+#
+#   Unless required by applicable law or agreed to in writing, software
+#   distributed under the License is distributed on an "AS IS" BASIS,
+#   WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#   See the License for the specific language governing permissions and
+#   limitations under the License.
+#
+
+import asyncio
+import threading
+import time
+from collections import defaultdict
+from functools import lru_cache
+from typing import Any, Optional
+
+from pydantic import UUID4
+
+from .event_types import Event, EventDocumentData, EventTypes
+from .publisher import ApprisePublisher
+from ...backend.config import config
+from ...core.root_logger import get_logger
+from ...database.db_session import session_context
+from ...database.models.server import EventNotifierModel, EventNotifierOptionsModel
+from ...database.repositories.all_repositories import get_repositories
+from ...database.table_versions import table_versions
+from ...schema.server import EventNotifierPrivate
+
+logger = get_logger("event_bus")
+
+NOTIFIER_TABLES = (EventNotifierModel.__tablename__, EventNotifierOptionsModel.__tablename__)
+
+
+class EventBusService:
+    """
+    In-process bus delivering the events to the notifiers of their group.
+
+    `dispatch` only puts the event on a queue, from any thread, so it costs the request nothing.
+    A task of the event loop takes the events by batches, looks their notifiers up in an index
+    by (group_id, event_type) and sends one notification per notifier URL with all its events,
+    `concurrency` URLs at a time.
+
+    The index is built from the enabled notifiers and rebuilt when the version of the notifier
+    tables changed, so a notifier saved in this worker, or in any worker when the versions are
+    shared, is taken into account on the next batch. Otherwise the index is also rebuilt every
+    `cache.versions_ttl` seconds to take in the changes made by the other workers.
+    """
+
+    def __init__(self, queue_size: int, batch: int, batch_delay: float, concurrency: int) -> None:
+        self.queue_size = queue_size
+        self.batch = batch
+        self.batch_delay = batch_delay
+        self.concurrency = concurrency
+        self.publisher = ApprisePublisher()
+        self._index: dict[tuple[UUID4, EventTypes], tuple[str, ...]] = {}
+        self._versions: Optional[tuple[int, ...]] = None
+        self._loaded_at = 0.0
+        self._index_lock = threading.Lock()
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._queue: Optional[asyncio.Queue] = None
+        self._limit: Optional[asyncio.Semaphore] = None
+        self._task: Optional[asyncio.Task] = None
+        self.dispatched = 0
+        self.dropped = 0
+        self.delivered = 0
+        self.failed = 0
+
+    @classmethod
+    def as_dependency(cls) -> "EventBusService":
+        return get_event_bus()
+
+    def dispatch(
+        self,
+        integration_id: str,
+        group_id: UUID4,
+        event_type: EventTypes,
+        document_data: EventDocumentData,
+        message: str = "",
+    ) -> None:
+        """Queues an event for its notifiers, from any thread, without waiting for the delivery"""
+        loop = self._loop
+        if loop is None or loop.is_closed():
+            return
+        event = Event(
+            integration_id=integration_id,
+            group_id=group_id,
+            event_type=event_type,
+            document_data=document_data,
+            message=message,
+        )
+        try:
+            running = asyncio.get_running_loop()
+        except RuntimeError:
+            running = None
+        if running is loop:
+            self._put(event)
+        else:
+            loop.call_soon_threadsafe(self._put, event)
+
+    def _put(self, event: Event) -> None:
+        try:
+            self._queue.put_nowait(event)
+            self.dispatched += 1
+        except asyncio.QueueFull:
+            self.dropped += 1
+            logger.warning(f"[EventBus] queue full, {event.event_type.value} event dropped")
+
+    def _current_index(self) -> dict[tuple[UUID4, EventTypes], tuple[str, ...]]:
+        with self._index_lock:
+            # versions are read before the notifiers: a change made meanwhile triggers another rebuild
+            versions = table_versions.get(*NOTIFIER_TABLES)
+            if versions == self._versions and table_versions.is_fresh(self._loaded_at):
+                return self._index
+            loaded_at = time.monotonic()
+
+            with session_context() as session:
+                notifiers = get_repositories(session).event_notifier.get_all(override_schema=EventNotifierPrivate)
+            index: dict[tuple[UUID4, EventTypes], list[str]] = defaultdict(list)
+            for notifier in notifiers:
+                if not notifier.enabled:
+                    continue
+                for event_type in EventTypes:
+                    if getattr(notifier.options, event_type.value, False):
+                        index[(notifier.group_id, event_type)].append(notifier.apprise_url)
+
+            previous = {url for urls in self._index.values() for url in urls}
+            self._index = {key: tuple(urls) for key, urls in index.items()}
+            self._versions = versions
+            self._loaded_at = loaded_at
+            self.publisher.forget(previous - {url for urls in self._index.values() for url in urls})
+            return self._index
+
+    async def _next_batch(self) -> list[Event]:
+        batch = [await self._queue.get()]
+        if self.batch_delay > 0:
+            # events dispatched together (a bulk import) are sent in a single notification
+            await asyncio.sleep(self.batch_delay)
+        while len(batch) < self.batch:
+            try:
+                batch.append(self._queue.get_nowait())
+            except asyncio.QueueEmpty:
+                break
+        return batch
+
+    async def _deliver(self, url: str, events: list[Event]) -> None:
+        if len(events) == 1:
+            title, body = events[0].title, events[0].body
+        else:
+            title = f"{len(events)} events"
+            body = "\n".join(f"{event.title}: {event.body}" for event in events)
+        async with self._limit:
+            try:
+                sent = await asyncio.to_thread(self.publisher.publish, url, title, body)
+            except Exception as e:
+                logger.error(f"[EventBus] notification failed: {e}")
+                sent = False
+        if sent:
+            self.delivered += len(events)
+        else:
+            self.failed += len(events)
+
+    async def _run(self) -> None:
+        while True:
+            batch = await self._next_batch()
+            try:
+                index = await asyncio.to_thread(self._current_index)
+            except Exception as e:
+                logger.error(f"[EventBus] could not load the notifiers, {len(batch)} events dropped: {e}")
+                self.failed += len(batch)
+                continue
+
+            deliveries: dict[str, list[Event]] = defaultdict(list)
+            for event in batch:
+                for url in index.get((event.group_id, event.event_type), ()):
+                    deliveries[url].append(event)
+            await asyncio.gather(*(self._deliver(url, events) for url, events in deliveries.items()))
+
+    def start(self) -> None:
+        """Starts the delivery on the running event loop"""
+        if self._task is not None:
+            return
+        self._loop = asyncio.get_running_loop()
+        self._queue = asyncio.Queue(self.queue_size)
+        self._limit = asyncio.Semaphore(self.concurrency)
+        self._task = self._loop.create_task(self._run())
+
+    async def stop(self) -> None:
+        """Stops the delivery, the events still queued are dropped"""
+        if self._task is None:
+            return
+        self._task.cancel()
+        await asyncio.gather(self._task, return_exceptions=True)
+        if self._queue.qsize():
+            logger.warning(f"[EventBus] {self._queue.qsize()} events not delivered at shutdown")
+        self._task = None
+        self._loop = None
+
+    def stats(self) -> dict[str, Any]:
+        return {
+            "queued": self._queue.qsize() if self._queue is not None else 0,
+            "dispatched": self.dispatched,
+            "dropped": self.dropped,
+            "delivered": self.delivered,
+            "failed": self.failed,
+            "subscriptions": len(self._index),
+        }
+
+
+@lru_cache(maxsize=1)
+def get_event_bus() -> EventBusService:
+    return EventBusService(
+        config['events.queue_size'],
+        config['events.batch'],
+        config['events.batch_delay'],
+        config['events.concurrency'],
+    )
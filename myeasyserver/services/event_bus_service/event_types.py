@@ -0,0 +1,96 @@
+#  Copyright (c) 2024.  stef.
+#
+#      ______                 _____
+#     / ____/___ ________  __/ ___/___  ______   _____  _____
+#    / __/ / __ `/ ___/ / / /\__ \/ _ \/ ___/ | / / _ \/ ___/
+#   / /___/ /_/ (__  ) /_/ /___/ /  __/ /   | |/ /  __/ /
+#  /_____/\__,_/____/\__, //____/\___/_/    |___/\___/_/
+#                   /____/
+#
+#  Apache License
+#  ================
+#
+#   Licensed under the Apache License, Version 2.0 (the "License");
+#   you may not use this file except in compliance with the License.
+#   You may obtain a copy of the License at
+#
+#   http://www.apache.org/licenses/LICENSE-2.0
+#
+#   Unless required by applicable law or agreed to in writing, software
+#   distributed under the License is distributed on an "AS IS" BASIS,
+#   WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#   See the License for the specific language governing permissions and
+#   limitations under the License.
+#
+
+import datetime
+import enum
+
+from pydantic import UUID4, BaseModel, Field
+
+
+class EventTypes(str, enum.Enum):
+    """
+    Events the notifiers can subscribe to, named after the options of `EventNotifierOptions`.
+    """
+
+    test_message = "test_message"
+    webhook_task = "webhook_task"
+
+    recipe_created = "recipe_created"
+    recipe_updated = "recipe_updated"
+    recipe_deleted = "recipe_deleted"
+
+    user_signup = "user_signup"
+
+    data_migrations = "data_migrations"
+    data_export = "data_export"
+    data_import = "data_import"
+
+    mealplan_entry_created = "mealplan_entry_created"
+
+    shopping_list_created = "shopping_list_created"
+    shopping_list_updated = "shopping_list_updated"
+    shopping_list_deleted = "shopping_list_deleted"
+
+    cookbook_created = "cookbook_created"
+    cookbook_updated = "cookbook_updated"
+    cookbook_deleted = "cookbook_deleted"
+
+    tag_created = "tag_created"
+    tag_updated = "tag_updated"
+    tag_deleted = "tag_deleted"
+
+    category_created = "category_created"
+    category_updated = "category_updated"
+    category_deleted = "category_deleted"
+
+
+class EventDocumentData(BaseModel):
+    def message(self) -> str:
+        return self.model_dump_json()
+
+
+class EventUserSignupData(EventDocumentData):
+    username: str
+    email: str
+
+    def message(self) -> str:
+        return f"User {self.username} ({self.email}) signed up"
+
+
+class Event(BaseModel):
+    integration_id: str
+    group_id: UUID4
+    event_type: EventTypes
+    document_data: EventDocumentData
+    message: str = ""
+    timestamp: datetime.datetime = Field(default_factory=datetime.datetime.utcnow)
+
+    @property
+    def title(self) -> str:
+        return self.event_type.value.replace("_", " ").capitalize()
+
+    @property
+    def body(self) -> str:
+        return self.message or self.document_data.message()
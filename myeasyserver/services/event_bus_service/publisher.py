@@ -0,0 +1,61 @@
+#  Copyright (c) 2024.  stef.
+#
+#      ______                 _____
+#     / ____/___ ________  __/ ___/___  ______   _____  _____
+#    / __/ / __ `/ ___/ / / /\__ \/ _ \/ ___/ | / / _ \/ ___/
+#   / /___/ /_/ (__  ) /_/ /___/ /  __/ /   | |/ /  __/ /
+#  /_____/\__,_/____/\__, //____/\___/_/    |___/\___/_/
+#                   /____/
+#
+#  Apache License
+#  ================
+#
+#   Licensed under the Apache License, Version 2.0 (the "License");
+#   you may not use this file except in compliance with the License.
+#   You may obtain a copy of the License at
+#
+#   http://www.apache.org/licenses/LICENSE-2.0
+#
+#   Unless required by applicable law or agreed to in writing, software
+#   distributed under the License is distributed on an "AS IS" BASIS,
+#   WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#   See the License for the specific language governing permissions and
+#   limitations under the License.
+#
+
+import threading
+
+import apprise
+
+from ...core.root_logger import get_logger
+
+logger = get_logger("event_bus")
+
+
+class ApprisePublisher:
+    """
+    Sends notifications to Apprise URLs. The Apprise object of each URL is kept, with the
+    connection its plugin may hold.
+    """
+
+    def __init__(self) -> None:
+        self._targets: dict[str, apprise.Apprise] = {}
+        self._lock = threading.Lock()
+
+    def _target(self, url: str) -> apprise.Apprise:
+        with self._lock:
+            target = self._targets.get(url)
+            if target is None:
+                target = apprise.Apprise()
+                target.add(url)
+                self._targets[url] = target
+            return target
+
+    def publish(self, url: str, title: str, body: str) -> bool:
+        return bool(self._target(url).notify(title=title, body=body))
+
+    def forget(self, urls: set[str]) -> None:
+        """Drops the targets of the URLs no notifier uses anymore"""
+        with self._lock:
+            for url in urls:
+                self._targets.pop(url, None)
@@ -0,0 +1,147 @@
+#  Copyright (c) 2024.  stef.
+#
+#      ______                 _____
+#     / ____/___ ________  __/ ___/___  ______   _____  _____
+#    / __/ / __ `/ ___/ / / /\__ \/ _ \/ ___/ | / / _ \/ ___/
+#   / /___/ /_/ (__  ) /_/ /___/ /  __/ /   | |/ /  __/ /
+#  /_____/\__,_/____/\__, //____/\___/_/    |___/\___/_/
+#                   /____/
+#
+#  Apache License
+#  ================
+#
+#   Licensed under the Apache License, Version 2.0 (the "License");
+#   you may not use this file except in compliance with the License.
+#   You may obtain a copy of the License at
+#
+#   http://www.apache.org/licenses/LICENSE-2.0
+#
+#   Unless required by applicable law or agreed to in writing, software
+#   distributed under the License is distributed on an "AS IS" BASIS,
+#   WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#   See the License for the specific language governing permissions and
+#   limitations under the License.
+#
+
+import os
+import statistics
+import time
+from typing import Callable
+
+# Argon2 memory costs tried, in KiB (256 MiB down to the 19 MiB recommended as a minimum by OWASP)
+ARGON2_MEMORY_COSTS = [262144, 131072, 65536, 32768, 19456]
+ARGON2_MAX_TIME_COST = 10
+BCRYPT_ROUNDS = range(10, 17)
+
+
+def _measure(hash_function: Callable[[str], str], samples: int = 3) -> float:
+    """Returns the median duration of a hash in milliseconds"""
+    durations = []
+    for _ in range(samples):
+        start = time.perf_counter()
+        hash_function("calibration password")
+        durations.append((time.perf_counter() - start) * 1000)
+    return statistics.median(durations)
+
+
+def _physical_memory() -> int | None:
+    """Returns the memory of the host in KiB or None if unknown"""
+    try:
+        return os.sysconf("SC_PAGE_SIZE") * os.sysconf("SC_PHYS_PAGES") // 1024
+    except (ValueError, OSError, AttributeError):
+        return None
+
+
+def calibrate_argon2(target_ms: float, parallelism: int, concurrent_hashes: int) -> tuple[int, int, float]:
+    """
+    Picks the Argon2 costs giving a hash duration close to `target_ms` on this host.
+
+    The memory cost is the largest candidate such that `concurrent_hashes` hashes fit in an
+    eighth of the memory and one pass stays below the target, then the time cost is raised as
+    long as the duration stays below the target.
+
+    :return: time cost, memory cost (KiB) and measured duration (ms)
+    """
+    # imported here: the hasher module reads the server configuration when it is loaded
+    from ..core.hasher import Argon2Hasher
+
+    memory = _physical_memory()
+    candidates = [
+        cost for cost in ARGON2_MEMORY_COSTS if memory is None or cost * concurrent_hashes <= memory // 8
+    ] or ARGON2_MEMORY_COSTS[-1:]
+
+    for memory_cost in candidates:
+        duration = _measure(Argon2Hasher(1, memory_cost, parallelism).hash)
+        if duration <= target_ms or memory_cost == candidates[-1]:
+            break
+
+    time_cost, best = 1, duration
+    while time_cost < ARGON2_MAX_TIME_COST:
+        duration = _measure(Argon2Hasher(time_cost + 1, memory_cost, parallelism).hash)
+        if duration > target_ms:
+            break
+        time_cost, best = time_cost + 1, duration
+    # the smallest memory cost is only acceptable with at least 2 passes, even on slow hosts
+    if time_cost < 2 and memory_cost <= ARGON2_MEMORY_COSTS[-1]:
+        time_cost = 2
+        best = _measure(Argon2Hasher(time_cost, memory_cost, parallelism).hash)
+    return time_cost, memory_cost, best
+
+
+def calibrate_bcrypt(target_ms: float) -> tuple[int, float]:
+    """
+    Picks the largest bcrypt rounds with a hash duration below `target_ms` on this host.
+
+    :return: rounds and measured duration (ms)
+    """
+    from ..core.hasher import BcryptHasher
+
+    rounds, best = BCRYPT_ROUNDS[0], _measure(BcryptHasher(BCRYPT_ROUNDS[0]).hash)
+    for candidate in BCRYPT_ROUNDS[1:]:
+        duration = _measure(BcryptHasher(candidate).hash)
+        if duration > target_ms:
+            break
+        rounds, best = candidate, duration
+    return rounds, best
+
+
+def calibrate_hasher(command, arguments, config):
+    """Benchmark the password hashers on this host and store the costs matching the target login latency
+
+    :param command: the command executed
+    :type command: str
+    :param arguments: `target_ms`: hash duration to reach in milliseconds, `dry_run`: do not store the result
+    :type arguments: dict
+    :param config: the configuration of the command line tool, the costs are written to its file
+    :type config: AppSettings
+    :return: the exit code
+    :rtype: int
+    """
+    target_ms = float(arguments.get('target_ms', 500))
+    dry_run = str(arguments.get('dry_run', False)).lower() in ('1', 'true', 'yes')
+    parallelism = min(os.cpu_count() or 1, 4)
+    conf_file = config.config.confFile
+    if not dry_run and conf_file is None:
+        print("No configuration file to write the costs to, give one with -C <file> or use dry_run=true")
+        return 1
+
+    print("Calibrating password hashers for %d ms per hash..." % target_ms)
+    time_cost, memory_cost, duration = calibrate_argon2(target_ms, parallelism, max(config['hashing.max_workers'], 1))
+    print("  argon2: time_cost=%d memory_cost=%d KiB parallelism=%d -> %.0f ms" % (time_cost, memory_cost, parallelism, duration))
+    rounds, duration = calibrate_bcrypt(target_ms)
+    print("  bcrypt: rounds=%d -> %.0f ms" % (rounds, duration))
+
+    if dry_run:
+        return 0
+
+    config['application.argon2_time_cost'] = time_cost
+    config['application.argon2_memory_cost'] = memory_cost
+    config['application.argon2_parallelism'] = parallelism
+    config['application.bcrypt_rounds'] = rounds
+    try:
+        config.writeto(conf_file)
+    except OSError as e:
+        print("Could not write the configuration to %s: %s" % (conf_file, e))
+        return 1
+    print("Configuration written to %s. Existing passwords are upgraded at the next login of their users." % conf_file)
+    return 0
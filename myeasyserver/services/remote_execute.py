@@ -1,11 +1,13 @@
 
-def remote_execute(command, arguments):
+def remote_execute(command, arguments, config):
     """Execute a command on the remote host
 
     :param command: the command to execute
     :type command: str
     :param arguments: the arguments to pass to the command
     :type command: str
+    :param config: the configuration of the command line tool
+    :type config: AppSettings
     :return: the output of the command
     :rtype: str
     """
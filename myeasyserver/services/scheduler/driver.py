@@ -0,0 +1,191 @@
+#  Copyright (c) 2024.  stef.
+#
+#      ______                 _____
+#     / ____/___ ________  __/ ___/___  ______   _____  _____
+#    / __/ / __ `/ ___/ / / /\__ \/ _ \/ ___/ | / / _ \/ ___/
+#   / /___/ /_/ (__  ) /_/ /___/ /  __/ /   | |/ /  __/ /
+#  /_____/\__,_/____/\__, //____/\___/_/    |___/\___/_/
+#                   /____/
+#
+#  Apache License
+#  ================
+#
+#   Licensed under the Apache License, Version 2.0 (the "License");
+#   you may not use this file except in compliance with the License.
+#   You may obtain a copy of the License at
+#
+#   http://www.apache.org/licenses/LICENSE-2.0
+#
+#   Unless required by applicable law or agreed to in writing, software
+#   distributed under the License is distributed on an "AS IS" BASIS,
+#   WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#   See the License for the specific language governing permissions and
+#   limitations under the License.
+#
+
+import asyncio
+import datetime
+from functools import lru_cache
+from traceback import format_exception
+from typing import Any, Callable, Optional
+
+from .timed_tasks import Scheduler, default_scheduler
+from ...backend.config import config
+from ...core import root_logger
+
+logger = root_logger.get_logger("jobs")
+
+
+class SchedulerDriver:
+    """
+    Runs the jobs of a scheduler from the event loop.
+
+    The loop sleeps until the next run of the scheduler and is woken up when jobs are added or
+    cancelled, instead of polling. The sleep is capped by `max_sleep` so that a change of the
+    wall clock is noticed. The lag is the delay between the planned run of the first due job
+    and the moment the loop actually ran it.
+
+    With a `leader` election, only the elected worker runs the jobs; the others try to get
+    elected every `max_sleep` seconds, and take over when the leader stops.
+    """
+
+    def __init__(self, scheduler: Scheduler, max_sleep: float, leader=None) -> None:
+        self.scheduler = scheduler
+        self.max_sleep = max_sleep
+        self.leader = leader
+        self._leading = False
+        self._elected: list[Callable[[], None]] = []
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._wakeup: Optional[asyncio.Event] = None
+        self._task: Optional[asyncio.Task] = None
+        self.ticks = 0
+        self.wakeups = 0
+        self.last_lag = 0.0
+        self.max_lag = 0.0
+        self.total_lag = 0.0
+        scheduler.add_listener(self.wake)
+
+    def wake(self) -> None:
+        """Interrupts the sleep of the loop, from any thread."""
+        loop = self._loop
+        if loop is None or loop.is_closed():
+            return
+        try:
+            running = asyncio.get_running_loop()
+        except RuntimeError:
+            running = None
+        if running is loop:
+            self._wakeup.set()
+        else:
+            loop.call_soon_threadsafe(self._wakeup.set)
+
+    @property
+    def leading(self) -> bool:
+        """Whether this worker is the one running the jobs"""
+        return self._leading
+
+    def on_elected(self, callback: Callable[[], None]) -> None:
+        """Registers a callback called each time this worker becomes the one running the jobs"""
+        self._elected.append(callback)
+
+    def _lead(self) -> bool:
+        leading = self.leader is None or self.leader.acquire()
+        if leading != self._leading:
+            self._leading = leading
+            if not leading:
+                logger.warning("Scheduler leadership lost")
+                return False
+            if self.leader is not None:
+                logger.info("Scheduler leadership acquired, running the jobs")
+            for callback in self._elected:
+                try:
+                    callback()
+                except Exception as exc:
+                    logger.error("".join(format_exception(type(exc), exc, exc.__traceback__)))
+        return leading
+
+    def _sleep_time(self) -> float:
+        longest = self.max_sleep
+        if self.leader is not None and self.leader.renew_interval is not None:
+            longest = min(longest, self.leader.renew_interval)
+        idle = self.scheduler.idle_seconds
+        if idle is None:
+            return longest
+        return max(0.0, min(idle, longest))
+
+    async def _sleep(self, seconds: float) -> None:
+        if seconds <= 0:
+            return
+        try:
+            await asyncio.wait_for(self._wakeup.wait(), seconds)
+            self.wakeups += 1
+        except asyncio.TimeoutError:
+            pass
+        self._wakeup.clear()
+
+    def _tick(self) -> None:
+        due = self.scheduler.next_run
+        if due is None:
+            return
+        now = datetime.datetime.now()
+        if due > now:
+            return
+        lag = (now - due).total_seconds()
+        self.ticks += 1
+        self.last_lag = lag
+        self.max_lag = max(self.max_lag, lag)
+        self.total_lag += lag
+        try:
+            self.scheduler.run_pending()
+        except Exception as exc:
+            logger.error("".join(format_exception(type(exc), exc, exc.__traceback__)))
+
+    async def _run(self) -> None:
+        while True:
+            if self._lead():
+                self._tick()
+                await self._sleep(self._sleep_time())
+            else:
+                await asyncio.sleep(self.max_sleep)
+
+    def start(self) -> None:
+        """Starts the loop on the running event loop."""
+        if self._task is not None and not self._task.done():
+            return
+        self._loop = asyncio.get_running_loop()
+        self._wakeup = asyncio.Event()
+        self._task = self._loop.create_task(self._run())
+
+    async def stop(self) -> None:
+        if self._task is None:
+            return
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+        self._task = None
+        self._loop = None
+        if self.leader is not None and self._leading:
+            self.leader.release()
+        self._leading = False
+
+    def stats(self) -> dict[str, Any]:
+        return {
+            "jobs": len(self.scheduler.jobs),
+            "running": self._task is not None and not self._task.done(),
+            "leader": self._leading,
+            "next_run": self.scheduler.next_run,
+            "ticks": self.ticks,
+            "wakeups": self.wakeups,
+            "last_lag": self.last_lag,
+            "max_lag": self.max_lag,
+            "mean_lag": self.total_lag / self.ticks if self.ticks else 0.0,
+        }
+
+
+@lru_cache(maxsize=1)
+def get_scheduler_driver() -> SchedulerDriver:
+    """Returns the driver of the default scheduler, where the jobs of the application are registered."""
+    from .leader import get_leader_election
+    return SchedulerDriver(default_scheduler, config['scheduler.max_sleep'], get_leader_election())
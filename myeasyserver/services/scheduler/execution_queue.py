@@ -1,94 +1,314 @@
 import asyncio
+import datetime
 import importlib
+import inspect
+import os
+import pickle
+import secrets
+import socket
+import time
+from functools import lru_cache
+from traceback import format_exception
+from typing import Any, Callable, Optional
 
-from sqlalchemy import create_engine, Column, Integer, String
-from sqlalchemy.orm import sessionmaker
-import json
-
-from .timed_tasks import run_pending
-from .worker import worker_every
+from .task_log import current_task_id, task_log_writer
+from .timed_tasks import ScheduleValueError
+from ...backend.config import config
 from ...core import root_logger
+from ...database.db_session import session_context
+from ...database.repositories.all_repositories import get_repositories
+from ...schema.server import ServerTask, ServerTaskCreate, ServerTaskNames, ServerTaskStatus
 
 logger = root_logger.get_logger("jobs")
 
-def serialize_function_call(method, *args, **kwargs):
+class TaskRegistry:
     """
-        Serialize a function call
+    Functions which may be run from a stored call, such as a queued task or a persisted job.
+
+    A function is registered under a stable id, its dotted path unless a name is given, when its
+    module is imported. A stored call references the id only: running it is a dictionary lookup,
+    and the functions which were not registered cannot be run by altering the stored calls.
     """
 
-    method_name = f"{method.__module__}.{method.__qualname__}"
+    def __init__(self) -> None:
+        self._functions: dict[str, Callable] = {}
+        self._ids: dict[Callable, str] = {}
 
-    call_details = {
-        'method_name': method_name,
-        'args': args,
-        'kwargs': kwargs
-    }
+    def register(self, func: Optional[Callable] = None, *, name: Optional[str] = None):
+        """Registers a function, used as `@task_registry.register` or `@task_registry.register(name=...)`"""
 
-    return json.dumps(call_details)
+        def decorator(func: Callable) -> Callable:
+            id = name or f"{func.__module__}.{func.__qualname__}"
+            registered = self._functions.get(id)
+            if registered is not None and registered is not func:
+                raise ScheduleValueError(f"Task id {id} is already registered")
+            self._functions[id] = func
+            self._ids[func] = id
+            return func
 
+        return decorator(func) if func is not None else decorator
 
-def deserialize_and_execute(serialized_call):
-    """
-        Deserialize and execute a function call
-    """
+    def id_of(self, func: Callable) -> str:
+        func = getattr(func, "func", func)  # unwrap a partial
+        try:
+            return self._ids[func]
+        except KeyError:
+            raise ScheduleValueError(f"{func.__qualname__} is not a registered task function")
+
+    def get(self, id: str) -> Callable:
+        try:
+            return self._functions[id]
+        except KeyError:
+            raise ScheduleValueError(f"Unknown task function {id}")
 
-    call_details = json.loads(serialized_call)
+    @staticmethod
+    def import_modules(modules: list[str]) -> None:
+        """Imports the modules defining task functions, so that they register at startup"""
+        for module in modules:
+            importlib.import_module(module)
 
-    method_name = call_details['method_name']
-    module_name, function_name = method_name.rsplit('.', 1)
 
-    module = importlib.import_module(module_name)
+task_registry = TaskRegistry()
 
-    method_to_call = getattr(module, function_name)
 
-    result = method_to_call(*call_details['args'], **call_details['kwargs'])
+def serialize_call(func: Callable, *args, **kwargs) -> tuple[str, bytes]:
+    """
+    Serializes a call to a registered function: its id and its arguments pickled with protocol 5,
+    which stores bytes and buffers as they are.
+    """
+    return task_registry.id_of(func), pickle.dumps((args, kwargs), protocol=5)
 
-    return result
 
-@worker_every(seconds=60, logger=logger)
-async def run_jobs():
+def deserialize_call(id: str, payload: bytes) -> tuple[Callable, tuple, dict]:
     """
-    Run jobs in time order. This method is called every minute.
-    Jobs a scheduled static tasks defined in the application
+    Returns the function and the arguments of a serialized call. The payload is unpickled: it must
+    come from serialize_call, through the database of the application.
     """
-    run_pending()
+    func = task_registry.get(id)
+    args, kwargs = pickle.loads(payload)
+    return func, args, kwargs
+
 
-@worker_every(seconds=1, logger=logger)
-async def run_tasks():
+def deserialize_and_execute(id: str, payload: bytes):
     """
-    Run tasks sequentially from the execution pipeline. This method is called every second.
-    Tasks are scheduled task that have to be executed immediately by the worker
+        Deserialize and execute a function call
     """
-    pass
+    func, args, kwargs = deserialize_call(id, payload)
+    return func(*args, **kwargs)
+
 
-async def run_jobs_from_db():
+class TaskQueue:
     """
-    Run jobs in time order. This method is called every second.
-    Tasks are stored in DB and will survive the restart of the application or from the system
-    they only are
+    Durable queue of tasks stored in the server_tasks table, run by a pool of `workers` coroutines
+    in each server process.
+
+    A worker leases the queued task with the highest priority for `lease` seconds and renews the
+    lease while the task runs, so that a task left by a stopped process is taken over once its
+    lease expired. A run whose lease was taken over, or could not be renewed before it expired, is
+    cancelled; a function run in a thread cannot be interrupted and only stops being awaited.
+    A failed task is queued again after a delay doubling from `retry_delay` up to `max_retry_delay`
+    seconds, and is left in the dead state after its last attempt.
+
+    Enqueueing wakes the workers of the process at once; the queue is also checked every `poll`
+    seconds for the tasks enqueued by other processes or whose retry delay elapsed.
     """
-    engine = create_engine('sqlite:///tasks.db', echo=True)  # Connexion à la base de données SQLite
-    #Base.metadata.create_all(engine)  # Créer la table des tâches si elle n'existe pas encore
-    Session = sessionmaker(bind=engine)
-    session = Session()
 
-    semaphore = asyncio.Semaphore(3)  # Limite à trois tâches en parallèle
-    tasks = []
+    def __init__(self, workers: int, lease: float, retry_delay: float, max_retry_delay: float, poll: float) -> None:
+        self.workers = workers
+        self.lease = datetime.timedelta(seconds=lease)
+        self.retry_delay = retry_delay
+        self.max_retry_delay = max_retry_delay
+        self.poll = poll
+        self.holder = f"{socket.gethostname()}:{os.getpid()}:{secrets.token_hex(4)}"
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._wakeup: Optional[asyncio.Event] = None
+        self._tasks: list[asyncio.Task] = []
+        self.finished = 0
+        self.retried = 0
+        self.dead = 0
+        self.lost = 0
+
+    def enqueue(
+        self,
+        func: Callable,
+        *args,
+        group_id,
+        name: ServerTaskNames = ServerTaskNames.default,
+        priority: int = 0,
+        max_attempts: int = 3,
+        delay: float = 0,
+        **kwargs,
+    ) -> ServerTask:
+        """
+        Stores a call to `func`, a registered function or coroutine function with picklable
+        arguments, and wakes a worker to run it.
+        """
+        func, payload = serialize_call(func, *args, **kwargs)
+        task = ServerTaskCreate(
+            group_id=group_id,
+            name=name,
+            status=ServerTaskStatus.queued,
+            func=func,
+            payload=payload,
+            priority=priority,
+            max_attempts=max_attempts,
+            run_after=datetime.datetime.now() + datetime.timedelta(seconds=delay) if delay else None,
+        )
+        with session_context() as session:
+            task = get_repositories(session).server_tasks.create(task)
+        if not delay:
+            self.wake()
+        return task
+
+    def wake(self) -> None:
+        """Wakes the waiting workers, from any thread"""
+        loop = self._loop
+        if loop is None or loop.is_closed():
+            return
+        try:
+            running = asyncio.get_running_loop()
+        except RuntimeError:
+            running = None
+        if running is loop:
+            self._wakeup.set()
+        else:
+            loop.call_soon_threadsafe(self._wakeup.set)
+
+    def _claim(self, worker: str) -> Optional[ServerTask]:
+        now = datetime.datetime.now()
+        with session_context() as session:
+            return get_repositories(session).server_tasks.claim(worker, now, now + self.lease)
+
+    def _renew(self, task: ServerTask, worker: str) -> bool:
+        with session_context() as session:
+            return get_repositories(session).server_tasks.renew(task.id, worker, datetime.datetime.now() + self.lease)
+
+    def _release(self, task: ServerTask, worker: str, status: ServerTaskStatus, message: str, run_after=None) -> None:
+        task_log_writer.end(task.id, message)
+        with session_context() as session:
+            get_repositories(session).server_tasks.release(task.id, worker, status, run_after)
+
+    async def _keep_lease(self, task: ServerTask, worker: str, run: asyncio.Future) -> None:
+        """Renews the lease of a running task, cancels the run when the lease is lost"""
+        lease = self.lease.total_seconds()
+        renewed_at = time.monotonic()
+        while True:
+            await asyncio.sleep(lease / 3)
+            started = time.monotonic()
+            try:
+                if await asyncio.to_thread(self._renew, task, worker):
+                    renewed_at = started
+                    continue
+                logger.warning(f"Task {task.id} lease taken over by another worker, run cancelled")
+            except Exception as exc:
+                if time.monotonic() - renewed_at + lease / 3 < lease:
+                    # still leased until the next try
+                    logger.error(f"Task {task.id} lease not renewed, trying again: {exc}")
+                    continue
+                logger.error(f"Task {task.id} lease about to expire, run cancelled: {exc}")
+            run.cancel()
+            return
+
+    @staticmethod
+    async def _call(task: ServerTask) -> None:
+        func, args, kwargs = deserialize_call(task.func, task.payload)
+        if inspect.iscoroutinefunction(func):
+            await func(*args, **kwargs)
+        else:
+            await asyncio.to_thread(func, *args, **kwargs)
+
+    async def _execute(self, task: ServerTask, worker: str) -> None:
+        if task.attempts > task.max_attempts:
+            # taken over from stopped workers more times than allowed
+            self.dead += 1
+            await asyncio.to_thread(self._release, task, worker, ServerTaskStatus.dead, "Too many attempts")
+            return
+
+        # the function of the task logs its progress with task_log.log_progress
+        current = current_task_id.set(task.id)
+        run = asyncio.ensure_future(self._call(task))
+        current_task_id.reset(current)
+        keeper = asyncio.create_task(self._keep_lease(task, worker, run))
+        try:
+            await run
+        except asyncio.CancelledError:
+            if not keeper.done():
+                # the worker is stopping, the task is taken over once its lease expired
+                raise
+            # the run is no longer ours, another worker may have taken the task over
+            self.lost += 1
+            await asyncio.to_thread(task_log_writer.end, task.id, "Lease lost, run cancelled")
+            return
+        except Exception as exc:
+            error = "".join(format_exception(type(exc), exc, exc.__traceback__))
+            logger.error(f"Task {task.id} ({task.func}) failed, attempt {task.attempts}/{task.max_attempts}\n{error}")
+            if task.attempts >= task.max_attempts:
+                self.dead += 1
+                status, run_after = ServerTaskStatus.dead, None
+            else:
+                self.retried += 1
+                delay = min(self.retry_delay * 2 ** (task.attempts - 1), self.max_retry_delay)
+                status, run_after = ServerTaskStatus.queued, datetime.datetime.now() + datetime.timedelta(seconds=delay)
+            message = f"Attempt {task.attempts} failed: {exc}"
+        else:
+            self.finished += 1
+            status, run_after, message = ServerTaskStatus.finished, None, "Finished"
+        finally:
+            keeper.cancel()
+        await asyncio.to_thread(self._release, task, worker, status, message, run_after)
+
+    async def _work(self, number: int) -> None:
+        worker = f"{self.holder}:{number}"
+        while True:
+            try:
+                task = await asyncio.to_thread(self._claim, worker)
+            except Exception as exc:
+                logger.error(f"Unable to claim a task: {exc}")
+                task = None
+            if task is None:
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(), self.poll)
+                except asyncio.TimeoutError:
+                    pass
+                self._wakeup.clear()
+                continue
+            try:
+                await self._execute(task, worker)
+            except Exception as exc:
+                logger.error("".join(format_exception(type(exc), exc, exc.__traceback__)))
 
-    # Récupérer les tâches depuis la base de données
-    #query = session.query(Jobs_in_base)
-    #for task_row in query:
-        #async with semaphore:
-            #task_instance = task(task_row.x, task_row.y)
-            #tasks.append(task_instance)
-            #await asyncio.ensure_future(task_instance)
+    def start(self) -> None:
+        """Starts the workers on the running event loop"""
+        if self._tasks:
+            return
+        self._loop = asyncio.get_running_loop()
+        self._wakeup = asyncio.Event()
+        self._tasks = [self._loop.create_task(self._work(number)) for number in range(self.workers)]
 
-    # Fermer la session
-    session.close()
+    async def stop(self) -> None:
+        """Stops the workers, the tasks they were running are taken over once their lease expires"""
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+        self._loop = None
 
-    # Attendre que toutes les tâches soient terminées
-    await asyncio.gather(*tasks)
+    def stats(self) -> dict[str, Any]:
+        return {
+            "workers": len(self._tasks),
+            "finished": self.finished,
+            "retried": self.retried,
+            "dead": self.dead,
+            "lost": self.lost,
+        }
 
 
-if __name__ == "__main__":
-    asyncio.run(run_tasks())
+@lru_cache(maxsize=1)
+def get_task_queue() -> TaskQueue:
+    return TaskQueue(
+        config['tasks.workers'],
+        config['tasks.lease'],
+        config['tasks.retry_delay'],
+        config['tasks.max_retry_delay'],
+        config['tasks.poll'],
+    )
@@ -0,0 +1,206 @@
+#  Copyright (c) 2024.  stef.
+#
+#      ______                 _____
+#     / ____/___ ________  __/ ___/___  ______   _____  _____
+#    / __/ / __ `/ ___/ / / /\__ \/ _ \/ ___/ | / / _ \/ ___/
+#   / /___/ /_/ (__  ) /_/ /___/ /  __/ /   | |/ /  __/ /
+#  /_____/\__,_/____/\__, //____/\___/_/    |___/\___/_/
+#                   /____/
+#
+#  Apache License
+#  ================
+#
+#   Licensed under the Apache License, Version 2.0 (the "License");
+#   you may not use this file except in compliance with the License.
+#   You may obtain a copy of the License at
+#
+#   http://www.apache.org/licenses/LICENSE-2.0
+#
+#   Unless required by applicable law or agreed to in writing, software
+#   distributed under the License is distributed on an "AS IS" BASIS,
+#   WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#   See the License for the specific language governing permissions and
+#   limitations under the License.
+#
+
+import asyncio
+import inspect
+import multiprocessing
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
+from traceback import format_exception
+from typing import Any, Optional
+
+from .timed_tasks import CancelJob, Job, default_scheduler
+from ...backend.config import config
+from ...core import root_logger
+
+logger = root_logger.get_logger("jobs")
+
+
+class JobRunner:
+    """
+    Runs the due jobs of a scheduler concurrently, so that a slow job does not delay the others.
+
+    A job runs with its executor: `thread` in a pool of `thread_workers` threads, `process` in a
+    forked process, which uses another core and can be killed, or `async` as a task of the event
+    loop. `inline` jobs keep running in the scheduler loop, one after the other. At most
+    `max_concurrent` jobs run at the same time, the others wait for a slot, and a run is skipped
+    while `max_instances` runs of the same job are in progress. A thread or async job returning
+    `CancelJob` is cancelled by the event loop once its run ends, as an inline job would be.
+
+    A run lasting longer than its timeout is cancelled: the process is terminated and the task
+    cancelled. A thread cannot be interrupted, it is reported as timed out and its job keeps
+    counting as running until the function returns.
+    """
+
+    def __init__(self, max_concurrent: int, thread_workers: int, default_executor: str, timeout: float) -> None:
+        self.max_concurrent = max_concurrent
+        self.default_executor = default_executor
+        self.timeout = timeout or None
+        self._threads = ThreadPoolExecutor(thread_workers, thread_name_prefix="job")
+        self._slots: Optional[asyncio.Semaphore] = None
+        self._tasks: set[asyncio.Task] = set()
+        self.running = 0
+        self.started = 0
+        self.completed = 0
+        self.failed = 0
+        self.timed_out = 0
+        self.skipped = 0
+
+    def _executor(self, job: Job) -> str:
+        return job.executor or self.default_executor
+
+    def accepts(self, job: Job) -> bool:
+        """Tells whether the job is run by the runner, or inline by the scheduler"""
+        if self._executor(job) == "inline":
+            return False
+        try:
+            asyncio.get_running_loop()
+        except RuntimeError:
+            # the scheduler is run outside of the event loop
+            return False
+        return True
+
+    def submit(self, job: Job) -> None:
+        if job._instances >= job.max_instances:
+            self.skipped += 1
+            logger.warning(f"Job {job} skipped, {job._instances} run(s) still in progress")
+            return
+        if self._slots is None:
+            self._slots = asyncio.Semaphore(self.max_concurrent)
+        job._instances += 1
+        task = asyncio.get_running_loop().create_task(self._run(job))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    async def _run(self, job: Job) -> None:
+        threads = []
+        try:
+            async with self._slots:
+                self.running += 1
+                self.started += 1
+                try:
+                    ret = await asyncio.wait_for(self._execute(job, threads), job.timeout or self.timeout)
+                    self.completed += 1
+                    if (isinstance(ret, CancelJob) or ret is CancelJob) and job.scheduler is not None:
+                        job.scheduler.cancel_job(job)
+                except asyncio.TimeoutError:
+                    self.timed_out += 1
+                    logger.error(f"Job {job} cancelled after {job.timeout or self.timeout} seconds")
+                except Exception as exc:
+                    self.failed += 1
+                    logger.error("".join(format_exception(type(exc), exc, exc.__traceback__)))
+                finally:
+                    self.running -= 1
+        finally:
+            if threads and not threads[0].done():
+                # the thread cannot be stopped, the run ends when the function returns
+                loop = asyncio.get_running_loop()
+                threads[0].add_done_callback(lambda _: loop.is_closed() or loop.call_soon_threadsafe(self._release, job))
+            else:
+                self._release(job)
+
+    @staticmethod
+    def _release(job: Job) -> None:
+        job._instances -= 1
+
+    async def _execute(self, job: Job, threads: list) -> Any:
+        executor = self._executor(job)
+        if executor == "async":
+            result = job.job_func()
+            if inspect.isawaitable(result):
+                result = await result
+            return result
+        if executor == "process":
+            # the return value stays in the child process
+            await self._run_process(job)
+            return None
+        future = self._threads.submit(job.job_func)
+        threads.append(future)
+        return await asyncio.wrap_future(future)
+
+    @staticmethod
+    async def _run_process(job: Job) -> None:
+        # forked, the job functions are closures which could not be sent to a spawned process
+        process = multiprocessing.get_context("fork").Process(
+            target=_run_in_child, args=(job.job_func,), name=f"job-{getattr(job.job_func, '__name__', 'job')}", daemon=True
+        )
+        process.start()
+        loop = asyncio.get_running_loop()
+        ended = loop.create_future()
+        # the sentinel becomes readable when the process ends
+        loop.add_reader(process.sentinel, lambda: ended.done() or ended.set_result(None))
+        try:
+            await ended
+        except asyncio.CancelledError:
+            process.terminate()
+            await loop.run_in_executor(None, process.join, 5)
+            if process.is_alive():
+                process.kill()
+            raise
+        finally:
+            loop.remove_reader(process.sentinel)
+        process.join()
+        if process.exitcode != 0:
+            raise RuntimeError(f"Job {job} process exited with code {process.exitcode}")
+
+    async def shutdown(self) -> None:
+        """Cancels the runs in progress or waiting for a slot"""
+        for task in list(self._tasks):
+            task.cancel()
+        if self._tasks:
+            await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._threads.shutdown(wait=False, cancel_futures=True)
+
+    def stats(self) -> dict[str, Any]:
+        return {
+            "max_concurrent": self.max_concurrent,
+            "running": self.running,
+            "waiting": len(self._tasks) - self.running,
+            "started": self.started,
+            "completed": self.completed,
+            "failed": self.failed,
+            "timed_out": self.timed_out,
+            "skipped": self.skipped,
+        }
+
+
+def _run_in_child(job_func) -> None:
+    # the pooled connections are the parent's, the child opens its own and leaves them open for the parent
+    from ...database.db_session import engine
+    engine.dispose(close=False)
+    job_func()
+
+
+@lru_cache(maxsize=1)
+def get_job_runner() -> JobRunner:
+    """Returns the runner of the default scheduler"""
+    runner = JobRunner(
+        config['scheduler.max_concurrent'],
+        config['scheduler.thread_workers'],
+        config['scheduler.default_executor'],
+        config['scheduler.job_timeout'],
+    )
+    default_scheduler.runner = runner
+    return runner
@@ -0,0 +1,249 @@
+#  Copyright (c) 2024.  stef.
+#
+#      ______                 _____
+#     / ____/___ ________  __/ ___/___  ______   _____  _____
+#    / __/ / __ `/ ___/ / / /\__ \/ _ \/ ___/ | / / _ \/ ___/
+#   / /___/ /_/ (__  ) /_/ /___/ /  __/ /   | |/ /  __/ /
+#  /_____/\__,_/____/\__, //____/\___/_/    |___/\___/_/
+#                   /____/
+#
+#  Apache License
+#  ================
+#
+#   Licensed under the Apache License, Version 2.0 (the "License");
+#   you may not use this file except in compliance with the License.
+#   You may obtain a copy of the License at
+#
+#   http://www.apache.org/licenses/LICENSE-2.0
+#
+#   Unless required by applicable law or agreed to in writing, software
+#   distributed under the License is distributed on an "AS IS" BASIS,
+#   WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#   See the License for the specific language governing permissions and
+#   limitations under the License.
+#
+
+import datetime
+import functools
+import json
+from functools import lru_cache
+from typing import Optional
+
+from sqlalchemy.exc import NoResultFound
+
+from .execution_queue import task_registry
+from .timed_tasks import Job, Scheduler, ScheduleValueError, default_scheduler
+from ...backend.config import config
+from ...core import root_logger
+from ...database.db_session import session_context
+from ...database.repositories.all_repositories import get_repositories
+from ...schema.server import MisfirePolicy
+
+logger = root_logger.get_logger("jobs")
+
+
+def _period(job: Job) -> Optional[datetime.timedelta]:
+    """Returns the fixed delay between two runs of the job, None if it is random"""
+    if job.latest is not None or job.unit not in ("seconds", "minutes", "hours", "days", "weeks"):
+        return None
+    return datetime.timedelta(**{job.unit: job.interval})
+
+
+class JobStore:
+    """
+    Keeps the jobs given an id with :meth:`Job.persist` in the database, with their next and last
+    runs, so that their schedule survives the restarts of the application.
+
+    Only the jobs due within `horizon` seconds are held by the scheduler. They are loaded from the
+    index on the next run every half horizon, so that a reload costs the number of jobs due soon,
+    not the number of stored jobs. Before running a job, its next run is moved in the database
+    with a compare-and-set on the planned run: when several processes share the database, only
+    one of them runs it.
+
+    A job whose planned run is older than `misfire_grace` seconds when it is loaded missed runs
+    while the application was stopped. The misfire policy of the job decides whether these runs
+    are skipped, run once or all run in a row.
+    """
+
+    def __init__(self, scheduler: Scheduler, horizon: float, misfire_policy: str, misfire_grace: float) -> None:
+        self.scheduler = scheduler
+        self.horizon = datetime.timedelta(seconds=horizon)
+        self.misfire_policy = MisfirePolicy(misfire_policy)
+        self.misfire_grace = datetime.timedelta(seconds=misfire_grace)
+        self._jobs: dict[str, Job] = {}  # stored jobs held by the scheduler
+        self._loaded_until: Optional[datetime.datetime] = None
+        self._loader: Optional[Job] = None
+        scheduler.store = self
+
+    @staticmethod
+    def _definition(job: Job) -> dict:
+        args = {"args": list(job.job_func.args), "kwargs": job.job_func.keywords}
+        try:
+            arguments = json.dumps(args)
+            tags = json.dumps(sorted(job.tags))
+        except TypeError as e:
+            raise ScheduleValueError(f"Arguments and tags of persisted jobs must be serializable: {e}")
+        return {
+            "job_id": job.job_id,
+            "func": task_registry.id_of(job.job_func),
+            "arguments": arguments,
+            "unit": job.unit,
+            "interval": job.interval,
+            "latest": job.latest,
+            "at_time": job.at_time.isoformat() if job.at_time is not None else None,
+            "at_time_zone": str(job.at_time_zone) if job.at_time_zone is not None else None,
+            "start_day": job.start_day,
+            "cancel_after": job.cancel_after,
+            "tags": tags,
+            "misfire_policy": job.misfire_policy,
+            "executor": job.executor,
+            "max_instances": job.max_instances,
+            "timeout": job.timeout,
+            "next_run": job.next_run,
+            "last_run": job.last_run,
+        }
+
+    def _build(self, row) -> Job:
+        job = Job(row.interval, self.scheduler)
+        job.unit = row.unit
+        job.latest = row.latest
+        if row.at_time is not None:
+            job.at_time = datetime.time.fromisoformat(row.at_time)
+        if row.at_time_zone is not None:
+            import pytz
+
+            job.at_time_zone = pytz.timezone(row.at_time_zone)
+        job.start_day = row.start_day
+        job.cancel_after = row.cancel_after
+        job.tags = set(json.loads(row.tags))
+        func = task_registry.get(row.func)
+        arguments = json.loads(row.arguments)
+        job.job_func = functools.partial(func, *arguments["args"], **arguments["kwargs"])
+        functools.update_wrapper(job.job_func, func)
+        job.next_run = row.next_run
+        job.last_run = row.last_run
+        job.job_id = row.job_id
+        job.misfire_policy = row.misfire_policy
+        job.executor = row.executor
+        job.max_instances = row.max_instances
+        job.timeout = row.timeout
+        return job
+
+    def _move(self, job: Job, next_run: datetime.datetime, last_run: Optional[datetime.datetime] = None) -> bool:
+        """Moves the next run of the job in the database, or reloads it when someone else moved it first"""
+        with session_context() as session:
+            repo = get_repositories(session).scheduled_jobs
+            if repo.move_next_run(job.job_id, job.next_run, next_run, last_run):
+                job.next_run = next_run
+                return True
+            stored, job.next_run = repo.get_next_run(job.job_id)
+        if not stored or job.next_run is None:
+            self._jobs.pop(job.job_id, None)
+            job.next_run = None
+        return False
+
+    def _misfire(self, job: Job, now: datetime.datetime) -> None:
+        if job.next_run is None or job.next_run >= now - self.misfire_grace:
+            return
+        logger.info(f"Job {job.job_id} missed its run of {job.next_run}, policy {job.misfire_policy}")
+        if job.misfire_policy == MisfirePolicy.skip:
+            planned = job.next_run
+            job._schedule_next_run()
+            next_run, job.next_run = job.next_run, planned
+            self._move(job, next_run)
+        elif job.misfire_policy == MisfirePolicy.run_once:
+            self._move(job, now)
+        # catch_up keeps the missed run, the following ones are claimed one period apart
+
+    def add(self, job: Job, job_id: str, misfire_policy: Optional[str] = None) -> None:
+        """Stores a job registered in the scheduler, resuming the schedule it had when already stored"""
+        previous = self._jobs.get(job_id)
+        if previous is not None and previous is not job:
+            self.scheduler.release(previous)
+        job.job_id = job_id
+        job.misfire_policy = MisfirePolicy(misfire_policy or self.misfire_policy).value
+        definition = self._definition(job)
+        with session_context() as session:
+            row = get_repositories(session).scheduled_jobs.save_definition(definition)
+        job.next_run, job.last_run = row.next_run, row.last_run
+        self._misfire(job, datetime.datetime.now())
+        self._jobs[job_id] = job
+        if job.next_run is not None and self.keep(job):
+            self.scheduler.reschedule(job)
+        else:
+            self.scheduler.release(job)
+
+    def keep(self, job: Job) -> bool:
+        """Tells whether the scheduler holds the job until its next run, or releases it until it comes closer"""
+        if self._loaded_until is None or job.next_run <= self._loaded_until:
+            return True
+        self._jobs.pop(job.job_id, None)
+        return False
+
+    def load(self) -> None:
+        """Hands the stored jobs due within the horizon to the scheduler"""
+        now = datetime.datetime.now()
+        until = now + self.horizon
+        with session_context() as session:
+            rows = get_repositories(session).scheduled_jobs.get_due(until)
+        for row in rows:
+            if row.job_id in self._jobs:
+                continue
+            try:
+                job = self._build(row)
+            except Exception as e:
+                logger.error(f"Unable to load the job {row.job_id} ({row.func}): {e}")
+                continue
+            self._misfire(job, now)
+            if job.next_run is None:
+                continue
+            self._jobs[row.job_id] = job
+            self.scheduler.add_job(job)
+        self._loaded_until = until
+
+    def claim(self, job: Job) -> Optional[datetime.datetime]:
+        """
+        Moves the next run of a due job in the database before it runs. Returns the next run once
+        claimed, or None when the run was claimed elsewhere; the next run of the job is then the
+        stored one, None if the job was deleted.
+        """
+        planned = job.next_run
+        now = datetime.datetime.now()
+        period = _period(job)
+        if job.misfire_policy == MisfirePolicy.catch_up and period is not None and planned + period <= now:
+            upcoming = planned + period
+        else:
+            job._schedule_next_run()
+            upcoming, job.next_run = job.next_run, planned
+        if self._move(job, upcoming, last_run=now):
+            job.next_run = planned
+            return upcoming
+        return None
+
+    def remove(self, job: Job) -> None:
+        if self._jobs.get(job.job_id) is job:
+            del self._jobs[job.job_id]
+        try:
+            with session_context() as session:
+                get_repositories(session).scheduled_jobs.delete(job.job_id)
+        except NoResultFound:
+            pass
+
+    def start(self) -> None:
+        """Loads the jobs due soon and keeps loading them as time goes"""
+        self.load()
+        if self._loader is None:
+            interval = max(1, int(self.horizon.total_seconds() // 2))
+            # the loader changes the queue of the scheduler, it must run in the scheduler loop
+            self._loader = self.scheduler.every(interval).seconds.do(self.load).run_with("inline").tag("job_store")
+
+
+@lru_cache(maxsize=1)
+def get_job_store() -> JobStore:
+    """Returns the store of the default scheduler, to be created before persisting jobs"""
+    return JobStore(
+        default_scheduler,
+        config['scheduler.horizon'],
+        config['scheduler.misfire_policy'],
+        config['scheduler.misfire_grace'],
+    )
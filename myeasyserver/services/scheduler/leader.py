@@ -0,0 +1,148 @@
+#  Copyright (c) 2024.  stef.
+#
+#      ______                 _____
+#     / ____/___ ________  __/ ___/___  ______   _____  _____
+#    / __/ / __ `/ ___/ / / /\__ \/ _ \/ ___/ | / / _ \/ ___/
+#   / /___/ /_/ (__  ) /_/ /___/ /  __/ /   | |/ /  __/ /
+#  /_____/\__,_/____/\__, //____/\___/_/    |___/\___/_/
+#                   /____/
+#
+#  Apache License
+#  ================
+#
+#   Licensed under the Apache License, Version 2.0 (the "License");
+#   you may not use this file except in compliance with the License.
+#   You may obtain a copy of the License at
+#
+#   http://www.apache.org/licenses/LICENSE-2.0
+#
+#   Unless required by applicable law or agreed to in writing, software
+#   distributed under the License is distributed on an "AS IS" BASIS,
+#   WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#   See the License for the specific language governing permissions and
+#   limitations under the License.
+#
+
+import datetime
+import fcntl
+import os
+import secrets
+import socket
+import threading
+import time
+from functools import lru_cache
+from typing import Optional
+
+from ...backend.config import config
+from ...core import root_logger
+from ...database.db_session import session_context
+from ...database.repositories.all_repositories import get_repositories
+from ...version import __software__
+
+logger = root_logger.get_logger("jobs")
+
+
+class FileLockElection:
+    """
+    Elects the worker holding an exclusive lock on `path`. The workers of a host share the file,
+    and the lock is released by the system when the leader exits, even when it crashes.
+    """
+
+    renew_interval: Optional[float] = None
+
+    def __init__(self, path: str) -> None:
+        self.path = path
+        self._file = None
+
+    def acquire(self) -> bool:
+        if self._file is not None:
+            return True
+        lockfile = open(self.path, "a")
+        try:
+            fcntl.lockf(lockfile, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except OSError:
+            lockfile.close()
+            return False
+        self._file = lockfile
+        return True
+
+    def release(self) -> None:
+        if self._file is None:
+            return
+        try:
+            fcntl.lockf(self._file, fcntl.LOCK_UN)
+        finally:
+            self._file.close()
+            self._file = None
+
+
+class LeaseElection:
+    """
+    Elects the worker holding a lease row of the database, for workers spread over several hosts.
+    The leader renews the lease every third of `ttl` from a thread of its own, so that a job
+    blocking the event loop does not let the lease expire; when it stops doing so, another worker
+    takes the lease once it expired. The row is only written when the lease is due for renewal.
+    """
+
+    def __init__(self, name: str, ttl: float) -> None:
+        self.name = name
+        self.ttl = datetime.timedelta(seconds=ttl)
+        self.renew_interval = ttl / 3
+        self.holder = f"{socket.gethostname()}:{os.getpid()}:{secrets.token_hex(4)}"
+        # monotonic times of the last renewal and of the end of the lease known to be held
+        self._renewed_at = float("-inf")
+        self._expires = 0.0
+        self._lock = threading.Lock()
+        self._stop: Optional[threading.Event] = None
+
+    def _write(self) -> bool:
+        started = time.monotonic()
+        now = datetime.datetime.now()
+        try:
+            with session_context() as session:
+                acquired = get_repositories(session).scheduler_leases.acquire(self.name, self.holder, now + self.ttl, now)
+        except Exception as e:
+            logger.error(f"Unable to acquire the scheduler lease: {e}")
+            # a lease held is kept until it expires
+            return started < self._expires
+        self._renewed_at = started
+        self._expires = started + self.ttl.total_seconds() if acquired else 0.0
+        return acquired
+
+    def acquire(self) -> bool:
+        with self._lock:
+            now = time.monotonic()
+            if now < self._expires and now - self._renewed_at < self.renew_interval:
+                return True
+            held = self._write()
+            if held and self._stop is None:
+                self._stop = threading.Event()
+                threading.Thread(target=self._renew, args=(self._stop,), name="scheduler-lease", daemon=True).start()
+            elif not held and self._stop is not None:
+                self._stop.set()
+                self._stop = None
+            return held
+
+    def _renew(self, stop: threading.Event) -> None:
+        while not stop.wait(self.renew_interval):
+            self.acquire()
+
+    def release(self) -> None:
+        with self._lock:
+            if self._stop is not None:
+                self._stop.set()
+                self._stop = None
+            self._expires = 0.0
+        with session_context() as session:
+            get_repositories(session).scheduler_leases.release(self.name, self.holder)
+
+
+@lru_cache(maxsize=1)
+def get_leader_election() -> FileLockElection | LeaseElection | None:
+    """Returns the election configured for the scheduler, None when every worker runs the jobs"""
+    if config['scheduler.leader'] == 'lock':
+        path = config['scheduler.lock_file'] or os.path.join(config.path.DATA_DIR, __software__ + "_scheduler.lock")
+        return FileLockElection(path)
+    if config['scheduler.leader'] == 'lease':
+        return LeaseElection("scheduler", config['scheduler.lease_ttl'])
+    return None
@@ -0,0 +1,189 @@
+#  Copyright (c) 2024.  stef.
+#
+#      ______                 _____
+#     / ____/___ ________  __/ ___/___  ______   _____  _____
+#    / __/ / __ `/ ___/ / / /\__ \/ _ \/ ___/ | / / _ \/ ___/
+#   / /___/ /_/ (__  ) /_/ /___/ /  __/ /   | |/ /  __/ /
+#  /_____/\__,_/____/\__, //____/\___/_/    |___/\___/_/
+#                   /____/
+#
+#  Apache License
+#  ================
+#
+#   Licensed under the Apache License, Version 2.0 (the "License");
+#   you may not use this file except in compliance with the License.
+#   You may obtain a copy of the License at
+#
+#   http://www.apache.org/licenses/LICENSE-2.0
+#
+#   Unless required by applicable law or agreed to in writing, software
+#   distributed under the License is distributed on an "AS IS" BASIS,
+#   WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#   See the License for the specific language governing permissions and
+#   limitations under the License.
+#
+
+import asyncio
+import threading
+from contextvars import ContextVar
+from datetime import datetime
+from typing import Optional
+
+from sqlalchemy.exc import DataError, IntegrityError
+
+from .worker import threaded_loop
+from ...backend.config import config
+from ...core import root_logger
+from ...database.db_session import session_context
+from ...database.repositories.all_repositories import get_repositories
+
+logger = root_logger.get_logger("jobs")
+
+# task run by the current worker, set by the task queue for the function of the task
+current_task_id: ContextVar[Optional[int]] = ContextVar("current_task_id", default=None)
+
+
+class TaskLogWriter:
+    """
+    Write-behind buffer of the log lines of the tasks.
+
+    A line is kept in memory and numbered when it is stored; the lines are appended to the
+    server_task_log_lines table in one batch when `max_pending` lines are waiting, every
+    `interval` seconds, and when a task ends. The streams tailing a log are woken up after each
+    batch. Called from the event loop, `append` leaves the database work to a thread.
+
+    A batch refused by the database is stored again line by line, and the lines it still refuses
+    are dropped. When the database cannot be reached, the lines are kept for the next batch, at
+    most `max_backlog` of them, the oldest being dropped beyond.
+    """
+
+    def __init__(self, max_pending: int, interval: float, max_backlog: int) -> None:
+        self.max_pending = max_pending
+        self.interval = interval
+        self.max_backlog = max(max_backlog, max_pending)
+        self._pending: list[dict] = []
+        self._next_seq: dict[int, int] = {}
+        self._flush_scheduled = False
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._waiters: set[tuple[asyncio.AbstractEventLoop, asyncio.Event]] = set()
+        self.dropped = 0
+
+    def _first_seq(self, task_id: int, pending: list[dict]) -> int:
+        with session_context() as session:
+            last = get_repositories(session).server_task_log_lines.last_seq(task_id)
+        # lines kept after a failed batch are numbered already
+        return max([last] + [line["seq"] for line in pending if line["task_id"] == task_id and line["seq"]]) + 1
+
+    def _add(self, task_id: int, message: str) -> bool:
+        """Keeps a line to store, returns whether a batch is to be stored"""
+        with self._lock:
+            self._pending.append({"task_id": task_id, "seq": None, "message": message, "created_at": datetime.now()})
+            self._drop_oldest()
+            due = len(self._pending) >= self.max_pending and not self._flush_scheduled
+            if due:
+                self._flush_scheduled = True
+            return due
+
+    def append(self, task_id: int, message: str) -> None:
+        if not self._add(task_id, message):
+            return
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            self.flush()
+        else:
+            loop.run_in_executor(None, self.flush)
+
+    def _drop_oldest(self) -> None:
+        excess = len(self._pending) - self.max_backlog
+        if excess > 0:
+            del self._pending[:excess]
+            self.dropped += excess
+            logger.warning(f"{excess} task log lines dropped, more than {self.max_backlog} waiting to be stored")
+
+    def _number(self, pending: list[dict]) -> None:
+        for line in pending:
+            if line["seq"] is None:
+                task_id = line["task_id"]
+                if task_id not in self._next_seq:
+                    # first line of this run, the log may hold the lines of previous attempts
+                    self._next_seq[task_id] = self._first_seq(task_id, pending)
+                line["seq"] = self._next_seq[task_id]
+                self._next_seq[task_id] += 1
+
+    @staticmethod
+    def _store(lines: list[dict]) -> None:
+        with session_context() as session:
+            get_repositories(session).server_task_log_lines.append_lines(lines)
+
+    def _keep(self, lines: list[dict]) -> None:
+        with self._lock:
+            self._pending = lines + self._pending
+            self._drop_oldest()
+
+    def flush(self) -> None:
+        # one batch at a time, so that the lines of a task are stored in order
+        with self._flush_lock:
+            with self._lock:
+                pending, self._pending = self._pending, []
+                self._flush_scheduled = False
+            if not pending:
+                return
+            try:
+                self._number(pending)
+                self._store(pending)
+            except (IntegrityError, DataError):
+                # some lines cannot be stored, for instance those of a deleted task: keep the others
+                self._store_each(pending)
+            except Exception as e:
+                logger.error(f"Failed to store {len(pending)} task log lines: {e}")
+                self._keep(pending)
+                return
+        self._notify()
+
+    def _store_each(self, pending: list[dict]) -> None:
+        for position, line in enumerate(pending):
+            try:
+                self._store([line])
+            except (IntegrityError, DataError) as e:
+                self.dropped += 1
+                logger.error(f"Task {line['task_id']} log line {line['seq']} dropped: {e}")
+            except Exception as e:
+                logger.error(f"Failed to store {len(pending) - position} task log lines: {e}")
+                self._keep(pending[position:])
+                return
+
+    def end(self, task_id: int, message: str) -> None:
+        """Appends the last line of a run of a task and stores its lines"""
+        self._add(task_id, message)
+        self.flush()
+        with self._lock:
+            self._next_seq.pop(task_id, None)
+
+    def subscribe(self) -> asyncio.Event:
+        """Returns an event set after each batch, for a stream tailing a log"""
+        event = asyncio.Event()
+        self._waiters.add((asyncio.get_running_loop(), event))
+        return event
+
+    def unsubscribe(self, event: asyncio.Event) -> None:
+        self._waiters = {waiter for waiter in self._waiters if waiter[1] is not event}
+
+    def _notify(self) -> None:
+        for loop, event in list(self._waiters):
+            if not loop.is_closed():
+                loop.call_soon_threadsafe(event.set)
+
+
+task_log_writer = TaskLogWriter(config['tasks.log_batch'], config['tasks.log_interval'], config['tasks.log_backlog'])
+threaded_loop(task_log_writer.flush, seconds=config['tasks.log_interval'], mode="delay", logger=logger)
+
+
+def log_progress(message: str) -> None:
+    """Appends a line to the log of the task being run, from the function of the task"""
+    task_id = current_task_id.get()
+    if task_id is None:
+        logger.debug(f"Progress outside of a task: {message}")
+        return
+    task_log_writer.append(task_id, message)
@@ -29,11 +29,13 @@ Usage:
 from collections.abc import Hashable
 import datetime
 import functools
+import heapq
+import itertools
 import logging
 import random
 import re
 import time
-from typing import Set, List, Optional, Callable, Union
+from typing import Dict, Set, List, Optional, Callable, Tuple, Union
 
 logger = logging.getLogger("schedule")
 
@@ -56,6 +58,9 @@ class IntervalError(ScheduleValueError):
     pass
 
 
+EXECUTORS = ("inline", "thread", "process", "async")
+
+
 class CancelJob:
     """
     Can be returned from a job to unschedule itself.
@@ -69,10 +74,98 @@ class Scheduler:
     Objects instantiated by the :class:`Scheduler <Scheduler>` are
     factories to create jobs, keep record of scheduled jobs and
     handle their execution.
+
+    Jobs are kept in a priority queue ordered by their next run so that
+    a tick only looks at the jobs which are due. Cancelled or rescheduled
+    jobs leave their outdated entries in the queue; they are skipped when
+    popped (lazy deletion) and the queue is rebuilt when they outnumber the
+    live ones. Tags are indexed for :meth:`get_jobs` and :meth:`clear`.
     """
 
     def __init__(self) -> None:
-        self.jobs: List[Job] = []
+        self._jobs: Dict[int, Job] = {}  # insertion ordered
+        self._queue: List[Tuple[datetime.datetime, int, Job]] = []
+        self._tags: Dict[Hashable, Dict[int, Job]] = {}
+        self._counter = itertools.count()
+        self._listeners: List[Callable[[], None]] = []
+        # persistent store of the jobs given an id with :meth:`Job.persist`,
+        # see :mod:`.job_store`
+        self.store = None
+        # runs the jobs concurrently, see :mod:`.executors`. Without it the
+        # jobs run inline, one after the other
+        self.runner = None
+
+    def add_listener(self, callback: Callable[[], None]) -> None:
+        """
+        Register a callback called when jobs are added or removed, so that a
+        loop sleeping until :attr:`next_run` can wake up.
+
+        :param callback: Function called without arguments
+        """
+        self._listeners.append(callback)
+
+    def _notify(self) -> None:
+        for callback in self._listeners:
+            callback()
+
+    @property
+    def jobs(self) -> List["Job"]:
+        """The scheduled jobs, in the order they were added"""
+        return list(self._jobs.values())
+
+    def add_job(self, job: "Job") -> None:
+        """
+        Register a configured job, called by :meth:`Job.do`.
+
+        :param job: The job to schedule
+        """
+        self._jobs[id(job)] = job
+        self._index_tags(job, job.tags)
+        self._push(job)
+        self._notify()
+
+    def reschedule(self, job: "Job") -> None:
+        """
+        Queue a registered job again after its next run was changed from
+        outside of the scheduler.
+
+        :param job: The job whose `next_run` changed
+        """
+        if self._jobs.get(id(job)) is job:
+            self._push(job)
+            self._notify()
+
+    def release(self, job: "Job") -> None:
+        """
+        Remove a job from the scheduler without removing it from the
+        persistent store, as opposed to :meth:`cancel_job`.
+
+        :param job: The job to release
+        """
+        self._remove(job)
+
+    def _index_tags(self, job: "Job", tags) -> None:
+        for tag in tags:
+            self._tags.setdefault(tag, {})[id(job)] = job
+
+    def _push(self, job: "Job") -> None:
+        job._queue_seq = next(self._counter)
+        heapq.heappush(self._queue, (job.next_run, job._queue_seq, job))
+        if len(self._queue) > 2 * len(self._jobs) + 64:
+            self._compact()
+
+    def _is_live(self, entry: Tuple[datetime.datetime, int, "Job"]) -> bool:
+        job = entry[2]
+        return self._jobs.get(id(job)) is job and job._queue_seq == entry[1]
+
+    def _compact(self) -> None:
+        self._queue = [entry for entry in self._queue if self._is_live(entry)]
+        heapq.heapify(self._queue)
+
+    def _peek(self) -> Optional[Tuple[datetime.datetime, int, "Job"]]:
+        while self._queue and not self._is_live(self._queue[0]):
+            heapq.heappop(self._queue)
+        return self._queue[0] if self._queue else None
 
     def run_pending(self) -> None:
         """
@@ -84,9 +177,19 @@ class Scheduler:
         in one hour increments then your job won't be run 60 times in
         between but only once.
         """
-        runnable_jobs = (job for job in self.jobs if job.should_run)
-        for job in sorted(runnable_jobs):
-            self._run_job(job)
+        now = datetime.datetime.now()
+        runnable_jobs = []
+        while (entry := self._peek()) is not None and entry[0] <= now:
+            heapq.heappop(self._queue)
+            runnable_jobs.append(entry[2])
+        for position, job in enumerate(runnable_jobs):
+            try:
+                self._run_job(job)
+            except Exception:
+                # keep the jobs which did not get their turn for the next tick
+                for pending in runnable_jobs[position + 1:]:
+                    self._push(pending)
+                raise
 
     def run_all(self, delay_seconds: int = 0) -> None:
         """
@@ -100,10 +203,10 @@ class Scheduler:
         """
         logger.debug(
             "Running *all* %i jobs with %is delay in between",
-            len(self.jobs),
+            len(self._jobs),
             delay_seconds,
         )
-        for job in self.jobs[:]:
+        for job in self.jobs:
             self._run_job(job)
             time.sleep(delay_seconds)
 
@@ -116,9 +219,9 @@ class Scheduler:
                     jobs to retrieve
         """
         if tag is None:
-            return self.jobs[:]
+            return self.jobs
         else:
-            return [job for job in self.jobs if tag in job.tags]
+            return list(self._tags.get(tag, {}).values())
 
     def clear(self, tag: Optional[Hashable] = None) -> None:
         """
@@ -130,10 +233,33 @@ class Scheduler:
         """
         if tag is None:
             logger.debug("Deleting *all* jobs")
-            del self.jobs[:]
+            if self.store is not None:
+                for job in self._jobs.values():
+                    if job.job_id is not None:
+                        self.store.remove(job)
+            self._jobs.clear()
+            self._queue.clear()
+            self._tags.clear()
+            self._notify()
         else:
             logger.debug('Deleting all jobs tagged "%s"', tag)
-            self.jobs[:] = (job for job in self.jobs if tag not in job.tags)
+            for job in self.get_jobs(tag):
+                self._remove(job)
+                if self.store is not None and job.job_id is not None:
+                    self.store.remove(job)
+
+    def _remove(self, job: "Job") -> bool:
+        if self._jobs.pop(id(job), None) is not job:
+            return False
+        for tag in job.tags:
+            tagged = self._tags.get(tag)
+            if tagged is not None:
+                tagged.pop(id(job), None)
+                if not tagged:
+                    del self._tags[tag]
+        # its entry in the queue is dropped when it reaches the top
+        self._notify()
+        return True
 
     def cancel_job(self, job: "Job") -> None:
         """
@@ -141,11 +267,11 @@ class Scheduler:
 
         :param job: The job to be unscheduled
         """
-        try:
-            logger.debug('Cancelling job "%s"', str(job))
-            self.jobs.remove(job)
-        except ValueError:
+        logger.debug('Cancelling job "%s"', str(job))
+        if not self._remove(job):
             logger.debug('Cancelling not-scheduled job "%s"', str(job))
+        if self.store is not None and job.job_id is not None:
+            self.store.remove(job)
 
     def every(self, interval: int = 1) -> "Job":
         """
@@ -158,9 +284,39 @@ class Scheduler:
         return job
 
     def _run_job(self, job: "Job") -> None:
-        ret = job.run()
+        upcoming = None
+        if self.store is not None and job.job_id is not None:
+            # claim the run in the store first so that no other process runs it too
+            try:
+                upcoming = self.store.claim(job)
+            except Exception:
+                self._push(job)
+                raise
+            if upcoming is None:
+                # the store gave the run planned elsewhere, or dropped the job
+                if job.next_run is None:
+                    self._remove(job)
+                else:
+                    self._push(job)
+                return
+        try:
+            ret = job.run()
+        except Exception:
+            # the job stays due and is tried again on the next tick
+            if self._jobs.get(id(job)) is job:
+                self._push(job)
+            raise
         if isinstance(ret, CancelJob) or ret is CancelJob:
             self.cancel_job(job)
+        elif self._jobs.get(id(job)) is job:
+            # the job computed its next run, queue it again
+            if upcoming is not None:
+                job.next_run = upcoming
+                if not self.store.keep(job):
+                    # loaded back from the store when its run comes closer
+                    self._remove(job)
+                    return
+            self._push(job)
 
     def get_next_run(
         self, tag: Optional[Hashable] = None
@@ -173,8 +329,9 @@ class Scheduler:
         :return: A :class:`~datetime.datetime` object
                  or None if no jobs scheduled
         """
-        if not self.jobs:
-            return None
+        if tag is None:
+            entry = self._peek()
+            return entry[0] if entry is not None else None
         jobs_filtered = self.get_jobs(tag)
         if not jobs_filtered:
             return None
@@ -247,6 +404,24 @@ class Job:
         self.tags: Set[Hashable] = set()  # unique set of tags for the job
         self.scheduler: Optional[Scheduler] = scheduler  # scheduler to register with
 
+        # sequence number of the entry of the job in the run queue of the scheduler
+        self._queue_seq: Optional[int] = None
+
+        # id of the job in the persistent store of the scheduler, None if not persisted
+        self.job_id: Optional[str] = None
+
+        # what to do with the runs missed while the application was stopped
+        self.misfire_policy: Optional[str] = None
+
+        # how the job runs: inline, thread, process or async, None for the default of the runner
+        self.executor: Optional[str] = None
+        # max number of runs of the job at the same time
+        self.max_instances: int = 1
+        # in seconds, runs lasting longer are cancelled. None for the default of the runner
+        self.timeout: Optional[float] = None
+        # number of runs in progress
+        self._instances: int = 0
+
     def __lt__(self, other) -> bool:
         """
         PeriodicJobs are sortable based on the scheduled time they
@@ -459,6 +634,37 @@ class Job:
         if not all(isinstance(tag, Hashable) for tag in tags):
             raise TypeError("Tags must be hashable")
         self.tags.update(tags)
+        if self.scheduler is not None and self._queue_seq is not None:
+            # already scheduled, keep the tag index of the scheduler up to date
+            self.scheduler._index_tags(self, tags)
+        return self
+
+    def run_with(
+        self,
+        executor: str,
+        max_instances: int = 1,
+        timeout: Optional[float] = None,
+    ):
+        """
+        Specify how the job runs when the scheduler has a runner.
+
+        :param executor: `inline` to run in the scheduler loop, `thread`,
+                         `process` to run in a forked process, or `async`
+                         for a coroutine function run on the event loop.
+        :param max_instances: A run is skipped while that many runs of the
+                              job are still in progress.
+        :param timeout: In seconds, runs lasting longer are cancelled.
+        :return: The invoked job instance
+        """
+        if executor not in EXECUTORS:
+            raise ScheduleValueError(
+                "Invalid executor (valid executors are %s)" % ", ".join(EXECUTORS)
+            )
+        if max_instances < 1:
+            raise ScheduleValueError("max_instances must be at least 1")
+        self.executor = executor
+        self.max_instances = max_instances
+        self.timeout = timeout
         return self
 
     def at(self, time_str: str, tz: Optional[str] = None):
@@ -653,7 +859,26 @@ class Job:
                 "Unable to a add job to schedule. "
                 "Job is not associated with an scheduler"
             )
-        self.scheduler.jobs.append(self)
+        self.scheduler.add_job(self)
+        return self
+
+    def persist(self, job_id: str, misfire_policy: Optional[str] = None):
+        """
+        Stores the job in the persistent store of the scheduler so that its
+        schedule survives restarts. The job function must be registered in
+        the task registry and its arguments must be serializable in JSON.
+
+        :param job_id: A unique and stable identifier of the job
+        :param misfire_policy: `skip`, `run_once` or `catch_up`, applied to the
+                               runs missed while stopped. Defaults to the
+                               configured policy.
+        :return: The invoked job instance
+        """
+        if self.scheduler is None or self.scheduler.store is None:
+            raise ScheduleError(
+                "Unable to persist the job, its scheduler has no job store"
+            )
+        self.scheduler.store.add(self, job_id, misfire_policy)
         return self
 
     @property
@@ -681,7 +906,13 @@ class Job:
             return CancelJob
 
         logger.debug("Running job %s", self)
-        ret = self.job_func()
+        runner = self.scheduler.runner if self.scheduler is not None else None
+        if runner is not None and runner.accepts(self):
+            # the result of a job run by an executor is not awaited
+            runner.submit(self)
+            ret = None
+        else:
+            ret = self.job_func()
         self.last_run = datetime.datetime.now()
         self._schedule_next_run()
 
@@ -829,8 +1060,12 @@ class Job:
 #: Default :class:`Scheduler <Scheduler>` object
 default_scheduler = Scheduler()
 
-#: Default :class:`Jobs <Job>` list
-jobs = default_scheduler.jobs  # todo: should this be a copy, e.g. jobs()?
+
+def jobs() -> List[Job]:
+    """Returns :attr:`jobs <Scheduler.jobs>` of the
+    :data:`default scheduler instance <default_scheduler>`.
+    """
+    return default_scheduler.jobs
 
 
 def every(interval: int = 1) -> Job:
@@ -28,6 +28,7 @@
 import asyncio
 import functools
 import logging
+import random
 import sys
 import typing
 from collections.abc import Callable, Coroutine
@@ -75,82 +76,230 @@ async def run_in_threadpool(
     return await anyio.to_thread.run_sync(func, *args)
 
 
-async def threaded_loop( func, *args,
-    seconds: float,
-    wait_first: float | bool = False,
-    logger: logging.Logger | None = None,
-    raise_exceptions: bool = False,
-    max_repetitions: int | None = None,
-    on_complete: NoArgsNoReturnAnyFuncT | None = None,
-    on_exception: ExcArgNoReturnAnyFuncT | None = None,
-    ** kwargs,
-
-) -> None:
+class PeriodicTask:
     """
-    This function call in a separated thread func which is periodically re-executed after its first call.
-    Func should return nothing. If necessary, this can be accomplished
-    by using `functools.partial` or otherwise wrapping the target function prior.
+    Calls `func` periodically on the event loop, a coroutine function directly and a function in
+    the thread pool.
 
-    Parameters
-    ----------
-    func: Callable or Coroutine
-       The function to call
-    args:
-        Positional arguments to pass to the decorated function
-    kwargs:
-        Keyword arguments to pass to the decorated function
-    seconds: float
-        The number of seconds to wait between repeated calls
-    wait_first: float | bool (default False)
-        If True, the function will wait for a single period of seconds before the first call
-        If a Float value is given, the function will wait that many seconds before the first call
-    logger: Optional[logging.Logger] (default None)
-        The logger to use to log any exceptions raised by calls to the decorated function.
-        If not provided, exceptions will not be logged by this function (though they may be handled by the event loop).
-    raise_exceptions: bool (default False)
-        If True, errors raised by the decorated function will be raised to the event loop's exception handler.
-        Note that if an error is raised, the repeated execution will stop.
-        Otherwise, exceptions are just logged and the execution continues to repeat.
-        See https://docs.python.org/3/library/asyncio-eventloop.html#asyncio.loop.set_exception_handler for more info.
-    max_repetitions: Optional[int] (default None)
-        The maximum number of times to call the repeated function. If `None`, the function is repeated forever.
-    on_complete: Optional[Callable[[], None]] (default None)
-        A function to call after the final repetition of the decorated function.
-    on_exception: Optional[Callable[[Exception], None]] (default None)
-        A function to call when an exception is raised by the decorated function.
+    In the `rate` mode the runs start every `seconds`, whatever their duration: a run still in
+    progress when the next one is due makes it skipped, and the missed periods are not run late.
+    In the `delay` mode each run starts `seconds` after the end of the previous one. A random
+    delay of up to `jitter` seconds is added to each wait, which spreads the tasks started together.
+
+    The duration of the runs and their lag, the delay between their planned and actual start,
+    are kept in `stats()`.
     """
 
-    async def loop()-> None:
-        if wait_first:
-            if isinstance(wait_first, bool):
-                timeout = seconds
-            else:
-                timeout = wait_first
-            await asyncio.sleep(timeout)
+    def __init__(
+        self,
+        func: NoArgsNoReturnAnyFuncT,
+        *args,
+        seconds: float,
+        mode: str = "rate",
+        jitter: float = 0,
+        wait_first: float | bool = False,
+        logger: logging.Logger | None = None,
+        raise_exceptions: bool = False,
+        max_repetitions: int | None = None,
+        on_complete: NoArgsNoReturnAnyFuncT | None = None,
+        on_exception: ExcArgNoReturnAnyFuncT | None = None,
+        **kwargs,
+    ) -> None:
+        if mode not in ("rate", "delay"):
+            raise ValueError(f"Invalid mode {mode}, expected rate or delay")
+        self.func = func
+        self.args = args
+        self.kwargs = kwargs
+        self.name = getattr(func, "__qualname__", repr(func))
+        self.seconds = seconds
+        self.mode = mode
+        self.jitter = jitter
+        self.wait_first = wait_first
+        self.logger = logger
+        self.raise_exceptions = raise_exceptions
+        self.max_repetitions = max_repetitions
+        self.on_complete = on_complete
+        self.on_exception = on_exception
+        self._task: asyncio.Task | None = None
+        self._run: asyncio.Task | None = None
+        self.runs = 0
+        self.failures = 0
+        self.skipped = 0
+        self.last_duration = 0.0
+        self.max_duration = 0.0
+        self.total_duration = 0.0
+        self.last_lag = 0.0
+        self.max_lag = 0.0
+
+    def _wait(self) -> float:
+        return self.seconds + (random.uniform(0, self.jitter) if self.jitter else 0)
+
+    async def _call(self, lag: float) -> None:
+        loop = asyncio.get_running_loop()
+        started = loop.time()
+        self.last_lag = lag
+        self.max_lag = max(self.max_lag, lag)
+        try:
+            await _handle_func(self.func, *self.args, **self.kwargs)
+        except Exception as exc:
+            self.failures += 1
+            if self.logger is not None:
+                self.logger.error("".join(format_exception(type(exc), exc, exc.__traceback__)))
+            if self.raise_exceptions:
+                raise exc
+            await _handle_exc(exc, self.on_exception, *self.args, **self.kwargs)
+        finally:
+            self.runs += 1
+            self.last_duration = loop.time() - started
+            self.max_duration = max(self.max_duration, self.last_duration)
+            self.total_duration += self.last_duration
+
+    async def _loop(self) -> None:
+        loop = asyncio.get_running_loop()
+        if self.wait_first:
+            first = self.seconds if isinstance(self.wait_first, bool) else self.wait_first
+        else:
+            first = 0
+        planned = loop.time() + first
         repetitions = 0
-        while max_repetitions is None or repetitions < max_repetitions:
+        while self.max_repetitions is None or repetitions < self.max_repetitions:
+            await asyncio.sleep(max(0.0, planned - loop.time()))
+            lag = loop.time() - planned
+            if self.mode == "delay":
+                await self._call(lag)
+                planned = loop.time() + self._wait()
+            else:
+                if self._run is not None and not self._run.done():
+                    self.skipped += 1
+                    if self.logger is not None:
+                        self.logger.warning(f"{self.name} still running, run skipped")
+                else:
+                    if self._run is not None and self._run.exception() is not None:
+                        # raise_exceptions: stop repeating
+                        raise self._run.exception()
+                    self._run = loop.create_task(self._call(lag))
+                planned += self._wait()
+                now = loop.time()
+                if planned < now:
+                    # runs missed while the loop was blocked are not run late
+                    missed = int((now - planned) // self.seconds) + 1
+                    self.skipped += missed
+                    planned += missed * self.seconds
+            repetitions += 1
+
+        if self._run is not None:
+            await self._run
+        if self.on_complete:
+            await _handle_func(self.on_complete, *self.args, **self.kwargs)
+
+    def start(self) -> None:
+        """Starts the task on the running event loop, does nothing if it runs already"""
+        if self._task is None or self._task.done():
+            self._task = asyncio.get_running_loop().create_task(self._loop())
+
+    async def stop(self, grace: float) -> None:
+        """Stops repeating and waits up to `grace` seconds for the run in progress before cancelling it"""
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+        if self._run is not None and not self._run.done():
             try:
-                await _handle_func(func, *args, **kwargs)
-            except Exception as exc:
-                if logger is not None:
-                    formatted_exception = "".join(format_exception(type(exc), exc, exc.__traceback__))
-                    logger.error(formatted_exception)
-                if raise_exceptions:
-                    raise exc
-                await _handle_exc(exc, on_exception, *args, **kwargs)
+                await asyncio.wait_for(asyncio.shield(self._run), grace)
+            except (asyncio.TimeoutError, Exception):
+                self._run.cancel()
+                await asyncio.gather(self._run, return_exceptions=True)
+        self._run = None
 
-            repetitions += 1
-            await asyncio.sleep(seconds)
+    def stats(self) -> dict[str, Any]:
+        return {
+            "mode": self.mode,
+            "seconds": self.seconds,
+            "running": self._task is not None and not self._task.done(),
+            "runs": self.runs,
+            "failures": self.failures,
+            "skipped": self.skipped,
+            "last_duration": self.last_duration,
+            "max_duration": self.max_duration,
+            "mean_duration": self.total_duration / self.runs if self.runs else 0.0,
+            "last_lag": self.last_lag,
+            "max_lag": self.max_lag,
+        }
+
+
+class PeriodicRunner:
+    """
+    Supervises the periodic tasks of the application: the tasks added before the event loop runs
+    are started with the lifespan of the server, and all of them are stopped gracefully with it.
+    """
+
+    def __init__(self) -> None:
+        self.tasks: list[PeriodicTask] = []
+        self._started = False
+
+    def add(self, task: PeriodicTask) -> PeriodicTask:
+        self.tasks.append(task)
+        if self._started:
+            task.start()
+        return task
+
+    def start(self) -> None:
+        self._started = True
+        for task in self.tasks:
+            task.start()
 
-        if on_complete:
-            await _handle_func(on_complete, *args, **kwargs)
+    async def stop(self, grace: float = 10) -> None:
+        self._started = False
+        await asyncio.gather(*(task.stop(grace) for task in self.tasks))
 
-    asyncio.ensure_future(loop())
+    def stats(self) -> dict[str, dict[str, Any]]:
+        return {task.name: task.stats() for task in self.tasks}
+
+
+periodic_runner = PeriodicRunner()
+
+
+def threaded_loop(
+    func,
+    *args,
+    seconds: float,
+    mode: str = "rate",
+    jitter: float = 0,
+    wait_first: float | bool = False,
+    logger: logging.Logger | None = None,
+    raise_exceptions: bool = False,
+    max_repetitions: int | None = None,
+    on_complete: NoArgsNoReturnAnyFuncT | None = None,
+    on_exception: ExcArgNoReturnAnyFuncT | None = None,
+    **kwargs,
+) -> PeriodicTask:
+    """
+    This function calls func periodically, see PeriodicTask for the parameters. The task is
+    supervised by the periodic runner: it starts at once when the event loop runs, with the
+    lifespan of the server otherwise, and stops with it.
+    """
+    task = PeriodicTask(
+        func,
+        *args,
+        seconds=seconds,
+        mode=mode,
+        jitter=jitter,
+        wait_first=wait_first,
+        logger=logger,
+        raise_exceptions=raise_exceptions,
+        max_repetitions=max_repetitions,
+        on_complete=on_complete,
+        on_exception=on_exception,
+        **kwargs,
+    )
+    return periodic_runner.add(task)
 
 
 def worker_every(
     *args,
     seconds: float,
+    mode: str = "rate",
+    jitter: float = 0,
     wait_first: float | bool = False,
     logger: logging.Logger | None = None,
     raise_exceptions: bool = False,
@@ -167,7 +316,13 @@ def worker_every(
     Parameters
     ----------
     seconds: float
-        The number of seconds to wait between repeated calls
+        The number of seconds between the start of two calls (rate mode) or between the end of a call and the start
+        of the next one (delay mode)
+    mode: str (default "rate")
+        "rate" keeps the period whatever the duration of the calls, a call still running when the next one is due
+        makes it skipped. "delay" waits `seconds` after each call.
+    jitter: float (default 0)
+        A random delay of up to `jitter` seconds added to each wait
     wait_first: float | bool (default False)
         If True, the function will wait for a single period of seconds before the first call
         If a Float value is given, the function will wait that many seconds before the first call
@@ -191,11 +346,23 @@ def worker_every(
         """
         Converts the decorated function into a repeated, periodically-called version of itself.
         """
-        is_coroutine = asyncio.iscoroutinefunction(func)
 
         @wraps(func) # keep the original function name and docstring
         async def wrapped() -> None:
-            threaded_loop(func, *args, seconds, wait_first, logger, raise_exceptions, max_repetitions, on_complete, on_exception, **kwargs)
+            threaded_loop(
+                func,
+                *args,
+                seconds=seconds,
+                mode=mode,
+                jitter=jitter,
+                wait_first=wait_first,
+                logger=logger,
+                raise_exceptions=raise_exceptions,
+                max_repetitions=max_repetitions,
+                on_complete=on_complete,
+                on_exception=on_exception,
+                **kwargs,
+            )
 
         return wrapped
 
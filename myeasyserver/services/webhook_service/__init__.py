@@ -0,0 +1,8 @@
+from .time_wheel import TimeWheel
+from .webhook_service import WebhookService, get_webhook_service
+
+__all__ = [
+    "TimeWheel",
+    "WebhookService",
+    "get_webhook_service",
+]
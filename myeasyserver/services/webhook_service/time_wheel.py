@@ -0,0 +1,77 @@
+#  Copyright (c) 2024.  stef.
+#
+#      ______                 _____
+#     / ____/___ ________  __/ ___/___  ______   _____  _____
+#    / __/ / __ `/ ___/ / / /\__ \/ _ \/ ___/ | / / _ \/ ___/
+#   / /___/ /_/ (__  ) /_/ /___/ /  __/ /   | |/ /  __/ /
+#  /_____/\__,_/____/\__, //____/\___/_/    |___/\___/_/
+#                   /____/
+#
+#  Apache License
+#  ================
+#
+#   Licensed under the Apache License, Version 2.0 (the "License");
+#   you may not use this file except in compliance with the License.
+#   You may obtain a copy of the License at
+#
+#   http://www.apache.org/licenses/LICENSE-2.0
+#
+#   Unless required by applicable law or agreed to in writing, software
+#   distributed under the License is distributed on an "AS IS" BASIS,
+#   WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#   See the License for the specific language governing permissions and
+#   limitations under the License.
+#
+
+from collections.abc import Iterator
+from datetime import time
+from typing import Generic, TypeVar
+
+T = TypeVar("T")
+
+SECONDS_PER_DAY = 86400
+
+
+class TimeWheel(Generic[T]):
+    """
+    Items firing every day at a time, indexed by the slot of `resolution` seconds holding that time.
+
+    Finding the items due between two ticks only visits the slots in between, whatever the
+    number of items, and slots without items take no room.
+    """
+
+    def __init__(self, resolution: int = 1) -> None:
+        self.resolution = resolution
+        self.size = -(-SECONDS_PER_DAY // resolution)
+        self._slots: dict[int, list[T]] = {}
+        self._count = 0
+
+    def __len__(self) -> int:
+        return self._count
+
+    def slot_of(self, at: time) -> int:
+        return (at.hour * 3600 + at.minute * 60 + at.second) // self.resolution
+
+    def add(self, item: T, at: time) -> None:
+        self._slots.setdefault(self.slot_of(at), []).append(item)
+        self._count += 1
+
+    def clear(self) -> None:
+        self._slots = {}
+        self._count = 0
+
+    def steps(self, after: int, until: int) -> int:
+        """Returns the number of slots from `after` to `until`, across midnight"""
+        return (until - after) % self.size
+
+    def due(self, after: int, until: int, max_steps: int | None = None) -> Iterator[T]:
+        """
+        Yields the items of the slots following `after` up to `until` included, across midnight.
+        More than `max_steps` slots in between, half a day by default, is a step of the clock
+        rather than elapsed time: nothing is due, so that a clock set back does not fire the day.
+        """
+        steps = self.steps(after, until)
+        if steps > (self.size // 2 if max_steps is None else max_steps):
+            return
+        for step in range(1, steps + 1):
+            yield from self._slots.get((after + step) % self.size, ())
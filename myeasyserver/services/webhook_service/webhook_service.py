@@ -0,0 +1,283 @@
+#  Copyright (c) 2024.  stef.
+#
+#      ______                 _____
+#     / ____/___ ________  __/ ___/___  ______   _____  _____
+#    / __/ / __ `/ ___/ / / /\__ \/ _ \/ ___/ | / / _ \/ ___/
+#   / /___/ /_/ (__  ) /_/ /___/ /  __/ /   | |/ /  __/ /
+#  /_____/\__,_/____/\__, //____/\___/_/    |___/\___/_/
+#                   /____/
+#
+#  Apache License
+#  ================
+#
+#   Licensed under the Apache License, Version 2.0 (the "License");
+#   you may not use this file except in compliance with the License.
+#   You may obtain a copy of the License at
+#
+#   http://www.apache.org/licenses/LICENSE-2.0
+#
+#   Unless required by applicable law or agreed to in writing, software
+#   distributed under the License is distributed on an "AS IS" BASIS,
+#   WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#   See the License for the specific language governing permissions and
+#   limitations under the License.
+#
+
+import asyncio
+import threading
+import time
+from datetime import datetime, timezone
+from functools import lru_cache
+from traceback import format_exception
+from typing import Any, Callable, Optional
+from urllib.parse import urlsplit
+
+import httpx
+
+from .time_wheel import SECONDS_PER_DAY, TimeWheel
+from ...backend.config import config
+from ...core.root_logger import get_logger
+from ...database.db_session import session_context
+from ...database.models.server import WebhooksModel
+from ...database.repositories.all_repositories import get_repositories
+from ...database.table_versions import table_versions
+from ...helper.http_client import get_http_client
+from ...schema.server import ReadWebhook
+
+logger = get_logger("webhooks")
+
+
+def store_deliveries(deliveries: list[dict]) -> None:
+    with session_context() as session:
+        get_repositories(session).webhook_deliveries.record(deliveries)
+
+
+class WebhookService:
+    """
+    Fires the enabled webhooks every day at their scheduled time (UTC).
+
+    The webhooks are kept in a time wheel rebuilt when the version of their table changed, or
+    every `cache.versions_ttl` seconds when the versions are per worker, and a loop of the event
+    loop wakes up at each slot to fire the webhooks of the slots elapsed since the previous one.
+    Only the worker running the scheduled jobs fires them (`is_leader`).
+
+    Deliveries are POST requests through a shared keep-alive client, `concurrency` at a time and
+    `per_host` at a time to the same host. Network errors, 429 and 5xx answers are retried up to
+    `max_attempts` times with an exponential backoff, an invalid URL is not. Each attempt is
+    recorded, by batches of `record_batch` or every `record_interval` seconds.
+    """
+
+    def __init__(
+        self,
+        resolution: int,
+        concurrency: int,
+        per_host: int,
+        max_attempts: int,
+        retry_delay: float,
+        record_batch: int,
+        record_interval: float,
+        client: Optional[Callable[[], httpx.AsyncClient]] = None,
+        record: Callable[[list[dict]], None] = store_deliveries,
+        is_leader: Callable[[], bool] = lambda: True,
+    ) -> None:
+        self.wheel: TimeWheel[ReadWebhook] = TimeWheel(resolution)
+        self.concurrency = concurrency
+        self.per_host = per_host
+        self.max_attempts = max_attempts
+        self.retry_delay = retry_delay
+        self.record_batch = record_batch
+        self.record_interval = record_interval
+        self.client = client or get_http_client
+        self.record = record
+        self.is_leader = is_leader
+        self._versions: Optional[tuple[int, ...]] = None
+        self._loaded_at = 0.0
+        self._refresh_lock = threading.Lock()
+        self._limit = asyncio.Semaphore(concurrency)
+        self._host_limits: dict[str, asyncio.Semaphore] = {}
+        self._pending: list[dict] = []
+        self._flushed_at = time.monotonic()
+        self._deliveries: set[asyncio.Task] = set()
+        self._task: Optional[asyncio.Task] = None
+        self.fired = 0
+        self.succeeded = 0
+        self.failed = 0
+        self.retried = 0
+
+    def refresh(self) -> None:
+        """Rebuilds the wheel from the enabled webhooks when their table was written"""
+        with self._refresh_lock:
+            # read before the webhooks: a change made meanwhile triggers another rebuild
+            versions = table_versions.get(WebhooksModel.__tablename__)
+            if versions == self._versions and table_versions.is_fresh(self._loaded_at):
+                return
+            loaded_at = time.monotonic()
+            with session_context() as session:
+                webhooks = get_repositories(session).webhooks.get_enabled()
+            wheel: TimeWheel[ReadWebhook] = TimeWheel(self.wheel.resolution)
+            for webhook in webhooks:
+                if webhook.url:
+                    wheel.add(webhook, webhook.scheduled_time)
+            self.wheel = wheel
+            self._versions = versions
+            self._loaded_at = loaded_at
+
+    def _host_limit(self, url: str) -> asyncio.Semaphore:
+        host = urlsplit(url).netloc
+        limit = self._host_limits.get(host)
+        if limit is None:
+            limit = self._host_limits[host] = asyncio.Semaphore(self.per_host)
+        return limit
+
+    async def _attempt(self, webhook: ReadWebhook, payload: dict) -> tuple[bool, bool, Optional[int], Optional[str]]:
+        """Posts the payload once, returns whether it succeeded, whether to retry, the status and the error"""
+        try:
+            host_limit = self._host_limit(webhook.url)
+        except ValueError as e:
+            return False, False, None, str(e) or type(e).__name__
+        async with self._limit, host_limit:
+            try:
+                response = await self.client().post(webhook.url, json=payload)
+            except httpx.InvalidURL as e:
+                return False, False, None, str(e) or type(e).__name__
+            except httpx.HTTPError as e:
+                return False, True, None, str(e) or type(e).__name__
+        if response.is_success:
+            return True, False, response.status_code, None
+        retry = response.status_code >= 500 or response.status_code == 429
+        return False, retry, response.status_code, response.reason_phrase
+
+    async def deliver(self, webhook: ReadWebhook, fired_at: Optional[datetime] = None) -> bool:
+        """Posts the webhook, retrying the failures which may be temporary, returns whether it was received"""
+        fired_at = fired_at or datetime.now(timezone.utc).replace(tzinfo=None)
+        payload = {
+            "id": str(webhook.id),
+            "name": webhook.name,
+            "group_id": str(webhook.group_id),
+            "webhook_type": webhook.webhook_type,
+            "scheduled_time": webhook.scheduled_time.isoformat(),
+            "fired_at": fired_at.isoformat(),
+        }
+        self.fired += 1
+        for attempt in range(1, self.max_attempts + 1):
+            start = time.perf_counter()
+            success, retry, status_code, error = await self._attempt(webhook, payload)
+            self._record({
+                "webhook_id": webhook.id,
+                "fired_at": fired_at,
+                "attempt": attempt,
+                "success": success,
+                "status_code": status_code,
+                "error": error,
+                "duration": time.perf_counter() - start,
+            })
+            if success:
+                self.succeeded += 1
+                return True
+            if not retry:
+                break
+            if attempt < self.max_attempts:
+                self.retried += 1
+                await asyncio.sleep(self.retry_delay * 2 ** (attempt - 1))
+        self.failed += 1
+        logger.warning(f"[Webhook] {webhook.name} not delivered to {webhook.url}: {error or status_code}")
+        return False
+
+    def _record(self, delivery: dict) -> None:
+        self._pending.append(delivery)
+        if len(self._pending) >= self.record_batch:
+            self._spawn(self.flush())
+
+    async def flush(self) -> None:
+        """Records the pending delivery attempts"""
+        self._flushed_at = time.monotonic()
+        if not self._pending:
+            return
+        deliveries, self._pending = self._pending, []
+        try:
+            await asyncio.to_thread(self.record, deliveries)
+        except Exception as e:
+            logger.error(f"[Webhook] {len(deliveries)} delivery records lost: {e}")
+
+    def _spawn(self, coroutine) -> None:
+        task = asyncio.get_running_loop().create_task(coroutine)
+        self._deliveries.add(task)
+        task.add_done_callback(self._deliveries.discard)
+
+    def _current_slot(self) -> tuple[int, float]:
+        """Returns the slot of the current time and the seconds until the next one"""
+        now = datetime.now(timezone.utc)
+        seconds = now.hour * 3600 + now.minute * 60 + now.second + now.microsecond / 1e6
+        resolution = self.wheel.resolution
+        return int(seconds // resolution) % self.wheel.size, resolution - seconds % resolution
+
+    async def _run(self) -> None:
+        last, delay = self._current_slot()
+        ticked_at = time.monotonic()
+        while True:
+            await asyncio.sleep(delay)
+            slot, delay = self._current_slot()
+            now = time.monotonic()
+            # the wall clock may be stepped (NTP), only the slots of the time really elapsed are due
+            max_steps = int((now - ticked_at) // self.wheel.resolution) + 1
+            ticked_at = now
+            if self.wheel.steps(last, slot) > max_steps:
+                logger.warning(f"[Webhook] clock stepped from slot {last} to {slot}, webhooks in between skipped")
+            elif self.is_leader():
+                try:
+                    await asyncio.to_thread(self.refresh)
+                    fired_at = datetime.now(timezone.utc).replace(tzinfo=None, microsecond=0)
+                    for webhook in self.wheel.due(last, slot, max_steps):
+                        self._spawn(self.deliver(webhook, fired_at))
+                except Exception as exc:
+                    logger.error("".join(format_exception(type(exc), exc, exc.__traceback__)))
+            last = slot
+            if self._pending and time.monotonic() - self._flushed_at >= self.record_interval:
+                self._spawn(self.flush())
+
+    def start(self) -> None:
+        """Starts firing the webhooks on the running event loop"""
+        if self._task is not None:
+            return
+        self._task = asyncio.get_running_loop().create_task(self._run())
+
+    async def stop(self) -> None:
+        """Stops firing, the deliveries in progress are cancelled and the attempts made are recorded"""
+        if self._task is None:
+            return
+        self._task.cancel()
+        tasks = [self._task, *self._deliveries]
+        for task in self._deliveries:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        self._task = None
+        await self.flush()
+
+    def stats(self) -> dict[str, Any]:
+        return {
+            "webhooks": len(self.wheel),
+            "in_progress": len(self._deliveries),
+            "fired": self.fired,
+            "succeeded": self.succeeded,
+            "failed": self.failed,
+            "retried": self.retried,
+            "pending_records": len(self._pending),
+        }
+
+
+@lru_cache(maxsize=1)
+def get_webhook_service() -> WebhookService:
+    from ..scheduler.driver import get_scheduler_driver
+
+    timeout = config['webhooks.timeout']
+    return WebhookService(
+        min(config['webhooks.resolution'], SECONDS_PER_DAY),
+        config['webhooks.concurrency'],
+        config['webhooks.per_host'],
+        config['webhooks.max_attempts'],
+        config['webhooks.retry_delay'],
+        config['webhooks.record_batch'],
+        config['webhooks.record_interval'],
+        client=lambda: get_http_client(timeout=timeout),
+        is_leader=lambda: get_scheduler_driver().leading,
+    )
@@ -0,0 +1,109 @@
+import asyncio
+
+import httpx
+from authlib.jose import JsonWebKey
+
+from myeasyserver.core.providers.jwks_manager import JWKSManager
+
+CONFIGURATION_URL = "https://idp.test/.well-known/openid-configuration"
+JWKS_URI = "https://idp.test/jwks"
+
+
+def public_key(kid: str) -> dict:
+    return JsonWebKey.generate_key("RSA", 2048, {"kid": kid}, is_private=True).as_dict(is_private=False)
+
+
+class StandIn:
+    """OpenID provider answering the discovery document and the keys, counting the requests"""
+
+    def __init__(self, *kids: str) -> None:
+        self.keys = [public_key(kid) for kid in kids]
+        self.requests: list[str] = []
+        self.delay = 0.0
+
+    async def handle(self, request: httpx.Request) -> httpx.Response:
+        self.requests.append(str(request.url))
+        await asyncio.sleep(self.delay)
+        if str(request.url) == CONFIGURATION_URL:
+            return httpx.Response(200, json={"jwks_uri": JWKS_URI})
+        if str(request.url) == JWKS_URI:
+            return httpx.Response(200, json={"keys": self.keys})
+        return httpx.Response(404)
+
+    def rotate(self, kid: str) -> None:
+        self.keys = [public_key(kid)]
+
+    def manager(self, min_refetch_interval: float = 0) -> JWKSManager:
+        client = httpx.AsyncClient(transport=httpx.MockTransport(self.handle))
+        return JWKSManager(CONFIGURATION_URL, lambda: client, ttl=3600, min_refetch_interval=min_refetch_interval)
+
+
+def kids(keys) -> set[str]:
+    return {key.as_dict()["kid"] for key in keys.keys}
+
+
+def test_first_call_fetches_the_keys():
+    async def scenario():
+        provider = StandIn("k1")
+        manager = provider.manager()
+        keys = await manager.get_keys("k1")
+        assert kids(keys) == {"k1"}
+        assert provider.requests == [CONFIGURATION_URL, JWKS_URI]
+        # known kid, fresh keys: no request
+        await manager.get_keys("k1")
+        assert len(provider.requests) == 2
+
+    asyncio.run(scenario())
+
+
+def test_unknown_kid_refetches_the_keys():
+    async def scenario():
+        provider = StandIn("k1")
+        manager = provider.manager()
+        await manager.get_keys("k1")
+        provider.rotate("k2")
+        keys = await manager.get_keys("k2")
+        assert kids(keys) == {"k2"}
+        assert provider.requests.count(JWKS_URI) == 2
+
+    asyncio.run(scenario())
+
+
+def test_unknown_kid_refetch_is_rate_limited():
+    async def scenario():
+        provider = StandIn("k1")
+        manager = provider.manager(min_refetch_interval=60)
+        await manager.get_keys("k1")
+        keys = await manager.get_keys("forged")
+        assert kids(keys) == {"k1"}
+        assert provider.requests.count(JWKS_URI) == 1
+
+    asyncio.run(scenario())
+
+
+def test_concurrent_calls_share_one_fetch():
+    async def scenario():
+        provider = StandIn("k1")
+        provider.delay = 0.05
+        manager = provider.manager(min_refetch_interval=60)
+        results = await asyncio.gather(*(manager.get_keys("k1") for _ in range(10)))
+        assert all(keys is not None and kids(keys) == {"k1"} for keys in results)
+        assert provider.requests == [CONFIGURATION_URL, JWKS_URI]
+
+    asyncio.run(scenario())
+
+
+def test_call_during_first_fetch_waits_for_it():
+    async def scenario():
+        provider = StandIn("k1")
+        provider.delay = 0.05
+        manager = provider.manager(min_refetch_interval=60)
+        first = asyncio.ensure_future(manager.get_keys("k1"))
+        await asyncio.sleep(0.01)
+        # the fetch is in progress, the refetch interval did not elapse
+        keys = await manager.get_keys("k1")
+        assert keys is not None and kids(keys) == {"k1"}
+        assert kids(await first) == {"k1"}
+        assert provider.requests == [CONFIGURATION_URL, JWKS_URI]
+
+    asyncio.run(scenario())
@@ -0,0 +1,101 @@
+import pytest
+
+ldap = pytest.importorskip("ldap")
+
+from myeasyserver.core.exceptions import LDAPPoolExhausted  # noqa: E402
+from myeasyserver.core.providers.ldap_pool import LDAPConnectionPool  # noqa: E402
+
+
+class StubConnection:
+    def __init__(self, number: int, healthy: bool = True) -> None:
+        self.number = number
+        self.healthy = healthy
+        self.unbound = False
+
+    def whoami_s(self) -> str:
+        if not self.healthy:
+            raise ldap.SERVER_DOWN({"desc": "closed"})
+        return "dn:cn=service"
+
+    def unbind_s(self) -> None:
+        self.unbound = True
+
+
+class StubFactory:
+    def __init__(self) -> None:
+        self.connections: list[StubConnection] = []
+
+    def __call__(self) -> StubConnection:
+        conn = StubConnection(len(self.connections))
+        self.connections.append(conn)
+        return conn
+
+
+def make_pool(factory: StubFactory, size: int = 2, check_after: float = 60) -> LDAPConnectionPool:
+    return LDAPConnectionPool("test", factory, size, timeout=0.1, check_after=check_after)
+
+
+def test_connection_is_reused():
+    factory = StubFactory()
+    pool = make_pool(factory)
+    assert pool.run(lambda conn: conn.number) == 0
+    assert pool.run(lambda conn: conn.number) == 0
+    assert len(factory.connections) == 1
+
+
+def test_idle_connection_failing_health_check_is_replaced():
+    factory = StubFactory()
+    pool = make_pool(factory, check_after=0)
+    pool.run(lambda conn: None)
+    factory.connections[0].healthy = False
+    assert pool.run(lambda conn: conn.number) == 1
+    assert factory.connections[0].unbound
+
+
+def test_idle_connection_passing_health_check_is_reused():
+    factory = StubFactory()
+    pool = make_pool(factory, check_after=0)
+    pool.run(lambda conn: None)
+    assert pool.run(lambda conn: conn.number) == 0
+    assert len(factory.connections) == 1
+
+
+def test_lost_connection_is_discarded_and_operation_retried():
+    factory = StubFactory()
+    pool = make_pool(factory)
+
+    def operation(conn):
+        if conn.number == 0:
+            raise ldap.SERVER_DOWN({"desc": "closed"})
+        return conn.number
+
+    assert pool.run(operation) == 1
+    assert factory.connections[0].unbound
+    assert pool.run(lambda conn: conn.number) == 1
+
+
+def test_server_answer_keeps_connection():
+    factory = StubFactory()
+    pool = make_pool(factory)
+
+    def operation(conn):
+        raise ldap.INVALID_CREDENTIALS({"desc": "invalid credentials"})
+
+    with pytest.raises(ldap.INVALID_CREDENTIALS):
+        pool.run(operation)
+    assert not factory.connections[0].unbound
+    assert pool.run(lambda conn: conn.number) == 0
+
+
+def test_exhausted_pool_times_out():
+    factory = StubFactory()
+    pool = make_pool(factory, size=1)
+
+    def nested(conn):
+        return pool.run(lambda other: other.number)
+
+    with pytest.raises(LDAPPoolExhausted):
+        pool.run(nested)
+    # the connection holding the slot was dropped, not retried as a lost one
+    assert len(factory.connections) == 1
+    assert factory.connections[0].unbound
@@ -0,0 +1,122 @@
+import asyncio
+import threading
+
+import pytest
+
+ldap = pytest.importorskip("ldap")
+
+from myeasyserver.core.providers import ldap_provider  # noqa: E402
+from myeasyserver.core.providers.ldap_pool import LDAPConnectionPool  # noqa: E402
+from myeasyserver.schema.user import CredentialsRequest  # noqa: E402
+
+USER_DN = "uid=jdoe,ou=people,dc=test"
+
+
+class StubDirectory:
+    """LDAP server holding one user, counting the searches and binds made through its connections"""
+
+    def __init__(self, password: str = "secret") -> None:
+        self.password = password
+        self.searches = 0
+        self.binds: list[tuple[str, str]] = []
+        self.threads: set[int] = set()
+
+    def connect(self) -> "StubConnection":
+        return StubConnection(self)
+
+
+class StubConnection:
+    def __init__(self, directory: StubDirectory) -> None:
+        self.directory = directory
+
+    def search_s(self, base, scope, search_filter, attributes=None):
+        self.directory.searches += 1
+        self.directory.threads.add(threading.get_ident())
+        if "jdoe" not in search_filter:
+            return []
+        return [(USER_DN, {"uid": [b"jdoe"], "cn": [b"John Doe"], "mail": [b"jdoe@test"]})]
+
+    def simple_bind_s(self, dn, password):
+        self.directory.binds.append((dn, password))
+        self.directory.threads.add(threading.get_ident())
+        if dn != USER_DN or password != self.directory.password:
+            raise ldap.INVALID_CREDENTIALS({"desc": "invalid credentials"})
+
+    def whoami_s(self):
+        return "dn:cn=service"
+
+    def unbind_s(self):
+        pass
+
+
+@pytest.fixture
+def directory(monkeypatch) -> StubDirectory:
+    directory = StubDirectory()
+    pools = (
+        LDAPConnectionPool("service", directory.connect, 2, timeout=1, check_after=60),
+        LDAPConnectionPool("user", directory.connect, 2, timeout=1, check_after=60),
+    )
+    monkeypatch.setattr(ldap_provider, "get_ldap_pools", lambda: pools)
+    ldap_provider._user_entries.clear()
+    ldap_provider._admin_results.clear()
+    yield directory
+    ldap_provider._user_entries.clear()
+    ldap_provider._admin_results.clear()
+
+
+def make_provider(username: str = "jdoe", password: str = "secret") -> ldap_provider.LDAPProvider:
+    return ldap_provider.LDAPProvider(None, CredentialsRequest(username=username, password=password))
+
+
+def existing_user(provider: ldap_provider.LDAPProvider, monkeypatch) -> object:
+    user = type("User", (), {"id": 1, "admin": False, "login_attemps": 0})()
+    monkeypatch.setattr(provider, "try_get_user", lambda username: user)
+    return user
+
+
+def test_search_finds_the_entry_and_caches_it(directory):
+    provider = make_provider()
+    entry = provider.find_user()
+    assert entry[0][0] == USER_DN
+    assert make_provider().find_user() == entry
+    assert directory.searches == 1
+
+
+def test_search_without_match_is_not_cached(directory):
+    assert make_provider("nobody").find_user() is None
+    assert make_provider("nobody").find_user() is None
+    assert directory.searches == 2
+
+
+def test_bind_checks_the_password_of_the_entry(directory, monkeypatch):
+    provider = make_provider()
+    user = existing_user(provider, monkeypatch)
+    assert provider.get_user() is user
+    assert directory.binds == [(USER_DN, "secret")]
+
+
+def test_failed_bind_drops_the_cached_entry(directory, monkeypatch):
+    provider = make_provider(password="wrong")
+    existing_user(provider, monkeypatch)
+    assert provider.get_user() is None
+    assert "jdoe" not in ldap_provider._user_entries
+    make_provider().find_user()
+    assert directory.searches == 2
+
+
+def test_authenticate_runs_the_ldap_calls_off_the_event_loop(directory, monkeypatch):
+    provider = make_provider(password="wrong")
+    monkeypatch.setattr(provider, "try_get_user", lambda username: None)
+
+    async def scenario():
+        # the wrong password falls back to the database credentials, unknown user here
+        monkeypatch.setattr(ldap_provider.CredentialsProvider, "authenticate", _no_user)
+        assert await provider.authenticate() is None
+        return threading.get_ident()
+
+    loop_thread = asyncio.run(scenario())
+    assert directory.threads and loop_thread not in directory.threads
+
+
+async def _no_user(self):
+    return None
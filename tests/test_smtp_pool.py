@@ -0,0 +1,125 @@
+import socket
+
+import pytest
+from aiosmtpd.controller import Controller
+
+from myeasyserver.services.email.email_senders import EmailOptions, Message, QueuedEmailSender, SMTPConnectionPool
+
+
+class StandIn:
+    """SMTP server refusing the recipients starting with `bad`, keeping the recipients of the messages received"""
+
+    def __init__(self) -> None:
+        self.received: list[list[str]] = []
+
+    async def handle_RCPT(self, server, session, envelope, address, rcpt_options):
+        if address.startswith("bad"):
+            return "550 no such user"
+        envelope.rcpt_tos.append(address)
+        return "250 OK"
+
+    async def handle_DATA(self, server, session, envelope):
+        self.received.append(list(envelope.rcpt_tos))
+        return "250 OK"
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+@pytest.fixture
+def smtp_server():
+    stand_in = StandIn()
+    controller = Controller(stand_in, hostname="127.0.0.1", port=free_port())
+    controller.start()
+    yield stand_in, controller.port
+    controller.stop()
+
+
+def make_pool(port: int, idle_timeout: float = 60, keepalive: float = 30) -> tuple[SMTPConnectionPool, list]:
+    pool = SMTPConnectionPool(EmailOptions("127.0.0.1", port, timeout=5), 2, idle_timeout, keepalive)
+    connections = []
+    connect = pool._connect
+
+    def counting_connect():
+        server = connect()
+        connections.append(server)
+        return server
+
+    pool._connect = counting_connect
+    return pool, connections
+
+
+def email(to: str):
+    return Message("Subject", "<p>Hello</p>", "Server", "server@test").build(to)
+
+
+def test_refused_recipient_does_not_stop_the_batch(smtp_server):
+    stand_in, port = smtp_server
+    pool, connections = make_pool(port)
+    results = pool.send_messages([email("one@test"), email("bad@test"), email("two@test")])
+    assert results[0] == {} and results[2] == {}
+    assert results[1] == {"bad@test": (550, b"no such user")}
+    assert stand_in.received == [["one@test"], ["two@test"]]
+    # the session was kept and is reused
+    assert len(connections) == 1
+    pool.send_messages([email("three@test")])
+    assert len(connections) == 1
+    pool.close()
+
+
+def test_closed_session_is_replaced_and_messages_sent_again(smtp_server):
+    stand_in, port = smtp_server
+    pool, connections = make_pool(port)
+    pool.send_messages([email("one@test")])
+    # the server dropped the idle session
+    connections[0].close()
+    assert pool.send_messages([email("two@test")]) == [{}]
+    assert stand_in.received == [["one@test"], ["two@test"]]
+    assert len(connections) == 2
+    pool.close()
+
+
+def test_session_idle_for_too_long_is_not_reused(smtp_server):
+    _, port = smtp_server
+    pool, connections = make_pool(port, idle_timeout=0)
+    pool.send_messages([email("one@test")])
+    pool.send_messages([email("two@test")])
+    assert len(connections) == 2
+    pool.close()
+
+
+def test_session_is_checked_after_keepalive(smtp_server):
+    _, port = smtp_server
+    pool, connections = make_pool(port, keepalive=0)
+    pool.send_messages([email("one@test")])
+    pool.send_messages([email("two@test")])
+    # the NOOP succeeded, the session was reused
+    assert len(connections) == 1
+    connections[0].close()
+    pool.send_messages([email("three@test")])
+    # the NOOP failed, the session was replaced before sending
+    assert len(connections) == 2
+    pool.close()
+
+
+def test_keep_alive_closes_expired_sessions(smtp_server):
+    _, port = smtp_server
+    pool, connections = make_pool(port, idle_timeout=0)
+    pool.send_messages([email("one@test")])
+    pool.keep_alive()
+    assert pool._idle == []
+    assert connections[0].sock is None
+
+
+def test_queued_sender_counts_refused_messages(smtp_server):
+    stand_in, port = smtp_server
+    pool, _ = make_pool(port)
+    sender = QueuedEmailSender(pool, workers=1, batch=10, rate=0, queue_size=10)
+    for to in ("one@test", "bad@test", "two@test"):
+        assert sender.submit(email(to))
+    sender.stop(5)
+    assert (sender.sent, sender.failed) == (2, 1)
+    assert stand_in.received == [["one@test"], ["two@test"]]
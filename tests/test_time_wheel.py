@@ -0,0 +1,33 @@
+from datetime import time
+
+from myeasyserver.services.webhook_service.time_wheel import TimeWheel
+
+
+def make_wheel() -> TimeWheel[str]:
+    wheel: TimeWheel[str] = TimeWheel(1)
+    wheel.add("early", time(0, 0, 50))
+    wheel.add("morning", time(0, 1, 40))
+    wheel.add("late", time(23, 59, 59))
+    return wheel
+
+
+def test_due_yields_the_slots_in_between():
+    wheel = make_wheel()
+    assert list(wheel.due(99, 100)) == ["morning"]
+    assert list(wheel.due(100, 101)) == []
+
+
+def test_due_crosses_midnight():
+    wheel = make_wheel()
+    assert list(wheel.due(86398, 50)) == ["late", "early"]
+
+
+def test_clock_stepped_back_fires_nothing():
+    wheel = make_wheel()
+    assert list(wheel.due(100, 99)) == []
+
+
+def test_catch_up_is_bounded():
+    wheel = make_wheel()
+    assert list(wheel.due(0, 100, max_steps=2)) == []
+    assert list(wheel.due(0, 100, max_steps=100)) == ["early", "morning"]
@@ -0,0 +1,97 @@
+import asyncio
+import uuid
+from datetime import time
+from types import SimpleNamespace
+
+import httpx
+
+from myeasyserver.services.webhook_service.webhook_service import WebhookService
+
+
+def make_webhook(url: str = "http://hooks.example/notify") -> SimpleNamespace:
+    return SimpleNamespace(
+        id=uuid.uuid4(),
+        name="notify",
+        group_id=uuid.uuid4(),
+        webhook_type="mealplan",
+        scheduled_time=time(8, 30),
+        url=url,
+    )
+
+
+def make_service(statuses: list[int], record_batch: int = 100) -> tuple[WebhookService, list[httpx.Request], list]:
+    """Service posting to a transport answering `statuses` in turn, recording the batches in the returned list"""
+    requests: list[httpx.Request] = []
+    batches: list[list[dict]] = []
+    answers = iter(statuses)
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        requests.append(request)
+        return httpx.Response(next(answers))
+
+    client = httpx.AsyncClient(transport=httpx.MockTransport(handler))
+    service = WebhookService(60, 4, 2, 3, 0.001, record_batch, 60, client=lambda: client, record=batches.append)
+    return service, requests, batches
+
+
+def test_retries_server_errors_and_throttling():
+    service, requests, batches = make_service([503, 429, 200])
+
+    async def run():
+        delivered = await service.deliver(make_webhook())
+        await service.flush()
+        return delivered
+
+    assert asyncio.run(run())
+    assert len(requests) == 3
+    [batch] = batches
+    assert [(d["attempt"], d["success"], d["status_code"]) for d in batch] == [
+        (1, False, 503),
+        (2, False, 429),
+        (3, True, 200),
+    ]
+    assert service.stats()["retried"] == 2
+
+
+def test_client_error_is_not_retried():
+    service, requests, batches = make_service([404])
+
+    async def run():
+        delivered = await service.deliver(make_webhook())
+        await service.flush()
+        return delivered
+
+    assert not asyncio.run(run())
+    assert len(requests) == 1
+    assert [d["status_code"] for d in batches[0]] == [404]
+
+
+def test_invalid_url_is_not_retried():
+    service, requests, batches = make_service([])
+
+    async def run():
+        delivered = await service.deliver(make_webhook("http://hooks\x00.example/"))
+        await service.flush()
+        return delivered
+
+    assert not asyncio.run(run())
+    assert requests == []
+    [batch] = batches
+    assert len(batch) == 1
+    assert not batch[0]["success"] and batch[0]["status_code"] is None and batch[0]["error"]
+    assert service.stats()["failed"] == 1
+
+
+def test_attempts_are_recorded_by_batches():
+    service, requests, batches = make_service([200] * 5, record_batch=2)
+
+    async def run():
+        for _ in range(5):
+            await service.deliver(make_webhook())
+            # let the flush spawned on a full batch run before the next delivery
+            await asyncio.gather(*service._deliveries)
+        assert len(service._pending) == 1
+        await service.flush()
+
+    asyncio.run(run())
+    assert [len(batch) for batch in batches] == [2, 2, 1]